@@ -0,0 +1,224 @@
+"""Benchmark de arranque en frío e invocaciones en caliente de lambda_function.
+
+- Init: importa lambda_function en intérpretes nuevos y mide cuánto tarda.
+- Caliente: reproduce sobres representativos con sb.lambda_handler() en modo
+  FakeS3Adapter y en modo S3 con un cliente de S3 simulado (sin red).
+
+Reporta p50/p95/p99 por intent y compara contra una línea base guardada;
+sale con código 1 si algún p95 empeora más que la tolerancia.
+
+Uso:
+    python herramientas/benchmark_lambda.py [--iteraciones 50] [--libros 200]
+        [--modos fake,s3-simulado] [--lazy] [--latencia-s3-ms 0]
+        [--sobres archivo.jsonl] [--baseline herramientas/baselines/benchmark_lambda.json]
+        [--guardar-baseline] [--tolerancia 0.25]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+HERRAMIENTAS_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(HERRAMIENTAS_DIR, "..", "lambda")
+BASELINE_DEFAULT = os.path.join(HERRAMIENTAS_DIR, "baselines", "benchmark_lambda.json")
+USER_ID = "amzn1.ask.account.BENCHMARK"
+BUCKET = "benchmark"
+
+MODOS = {
+    "fake": {"USE_FAKE_S3": "true"},
+    "s3-simulado": {"USE_FAKE_S3": "false", "S3_PERSISTENCE_BUCKET": BUCKET},
+}
+
+
+def _env(modo, lazy):
+    env = dict(os.environ, LAZY_IMPORTS="true" if lazy else "false", **MODOS[modo])
+    env.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    return env
+
+
+# ==============================
+# Arranque en frío
+# ==============================
+def medir_init(modo, lazy, repeticiones):
+    codigo = "import time; t = time.perf_counter(); import lambda_function; print(time.perf_counter() - t)"
+    muestras = []
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, "-c", codigo], cwd=LAMBDA_DIR, env=_env(modo, lazy),
+                                capture_output=True, text=True, check=True).stdout
+        muestras.append(float(salida.strip().splitlines()[-1]) * 1000)
+    return muestras
+
+
+# ==============================
+# Invocaciones en caliente
+# ==============================
+def documento_sintetico(libros):
+    return {
+        "libros_disponibles": [
+            {"id": f"L{i:07d}", "titulo": f"Libro de prueba {i}", "autor": f"Autor {i % 50}",
+             "tipo": "novela", "fecha_agregado": "2025-01-01T00:00:00", "total_prestamos": 0,
+             "estado": "disponible"}
+            for i in range(libros)
+        ],
+        "prestamos_activos": [],
+        "historial_prestamos": [],
+        "estadisticas": {"total_libros": libros, "total_prestamos": 0, "total_devoluciones": 0},
+        "historial_conversaciones": [],
+        "configuracion": {"limite_prestamos": 10, "dias_prestamo": 7},
+        "usuario_frecuente": False,
+    }
+
+
+def escenario(iteracion, libros):
+    """Secuencia representativa de una sesión; deja el documento como estaba"""
+    import sobres
+    objetivo = f"Libro de prueba {(iteracion * 7) % max(libros, 1)}"
+    nuevo = f"Libro nuevo {iteracion}"
+    yield sobres.launch(USER_ID)
+    yield sobres.intent("ListarLibrosIntent", USER_ID)
+    yield sobres.intent("BuscarLibroIntent", USER_ID, {"titulo": objetivo})
+    yield sobres.intent("PrestarLibroIntent", USER_ID, {"titulo": objetivo, "nombre_persona": "Ana"})
+    yield sobres.intent("ConsultarPrestamosIntent", USER_ID)
+    yield sobres.intent("DevolverLibroIntent", USER_ID, {"titulo": objetivo})
+    yield sobres.intent("ConsultarDevueltosIntent", USER_ID)
+    yield sobres.intent("AgregarLibroIntent", USER_ID, {"titulo": nuevo, "autor": "Autor X", "tipo": "ensayo"})
+    yield sobres.intent("EliminarLibroIntent", USER_ID, {"titulo": nuevo})
+
+
+def sembrar(lambda_function, user_id, documento):
+    """Guarda un documento inicial a través del persistence adapter configurado"""
+    import sobres
+    from ask_sdk_core.serialize import DefaultSerializer
+    from ask_sdk_model import RequestEnvelope
+    envelope = DefaultSerializer().deserialize(json.dumps(sobres.launch(user_id)), RequestEnvelope)
+    lambda_function.persistence_adapter.save_attributes(envelope, documento)
+
+
+def trabajador(modo, args):
+    """Corre dentro de un intérprete nuevo, con el entorno del modo ya puesto"""
+    sys.path.insert(0, LAMBDA_DIR)
+    sys.path.insert(0, HERRAMIENTAS_DIR)
+    import sobres
+    cliente = None
+    if modo == "s3-simulado":
+        from s3_simulado import ClienteS3Simulado
+        from database import clientes_aws
+        cliente = ClienteS3Simulado(latencia_ms=args.latencia_s3_ms)
+        clientes_aws._CLIENTES["s3"] = cliente
+    import lambda_function
+
+    sembrar(lambda_function, USER_ID, documento_sintetico(args.libros))
+    if args.sobres:
+        secuencias = [list(sobres.leer_jsonl(args.sobres))] * args.iteraciones
+    else:
+        secuencias = [list(escenario(i, args.libros)) for i in range(args.iteraciones)]
+
+    muestras = {}
+    for numero, secuencia in enumerate(secuencias):
+        session_attributes = {}
+        for envelope in secuencia:
+            envelope = dict(envelope, session=dict(envelope["session"], attributes=session_attributes))
+            inicio = time.perf_counter()
+            respuesta = lambda_function.lambda_handler(envelope, None)
+            transcurrido = (time.perf_counter() - inicio) * 1000
+            session_attributes = respuesta.get("sessionAttributes") or {}
+            if numero >= args.calentamiento:
+                muestras.setdefault(sobres.nombre_de(envelope), []).append(transcurrido)
+    resultado = {"muestras": muestras}
+    if cliente is not None:
+        resultado["llamadas_s3"] = cliente.llamadas
+    print(json.dumps(resultado))
+
+
+def medir_caliente(modo, args):
+    comando = [sys.executable, os.path.abspath(__file__), "--_trabajador", modo,
+               "--iteraciones", str(args.iteraciones), "--libros", str(args.libros),
+               "--calentamiento", str(args.calentamiento), "--latencia-s3-ms", str(args.latencia_s3_ms)]
+    if args.sobres:
+        comando += ["--sobres", os.path.abspath(args.sobres)]
+    salida = subprocess.run(comando, cwd=LAMBDA_DIR, env=_env(modo, args.lazy),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+# ==============================
+# Reporte
+# ==============================
+def percentil(muestras, p):
+    ordenadas = sorted(muestras)
+    rango = max(0, min(len(ordenadas) - 1, int(round(p / 100 * len(ordenadas) + 0.5)) - 1))
+    return ordenadas[rango]
+
+
+def resumen(muestras):
+    return {"n": len(muestras), "p50": percentil(muestras, 50),
+            "p95": percentil(muestras, 95), "p99": percentil(muestras, 99)}
+
+
+def comparar(resultados, baseline, tolerancia):
+    regresiones = []
+    for clave, actual in resultados.items():
+        previo = baseline.get(clave)
+        if previo and actual["p95"] > previo["p95"] * (1 + tolerancia):
+            regresiones.append((clave, previo["p95"], actual["p95"]))
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iteraciones", type=int, default=50)
+    parser.add_argument("--libros", type=int, default=200)
+    parser.add_argument("--calentamiento", type=int, default=1, help="iteraciones iniciales que no se miden")
+    parser.add_argument("--modos", default=",".join(MODOS))
+    parser.add_argument("--lazy", action="store_true", help="medir con LAZY_IMPORTS=true")
+    parser.add_argument("--latencia-s3-ms", type=float, default=0)
+    parser.add_argument("--repeticiones-init", type=int, default=5)
+    parser.add_argument("--sobres", help="JSONL con sobres a reproducir en lugar del escenario sintético")
+    parser.add_argument("--baseline", default=BASELINE_DEFAULT)
+    parser.add_argument("--guardar-baseline", action="store_true")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    parser.add_argument("--_trabajador", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._trabajador:
+        trabajador(args._trabajador, args)
+        return 0
+
+    resultados = {}
+    for modo in args.modos.split(","):
+        resultados[f"init/{modo}"] = resumen(medir_init(modo, args.lazy, args.repeticiones_init))
+        caliente = medir_caliente(modo, args)
+        for intent, muestras in sorted(caliente["muestras"].items()):
+            resultados[f"{modo}/{intent}"] = resumen(muestras)
+        if "llamadas_s3" in caliente:
+            print(f"Llamadas a S3 ({modo}): {caliente['llamadas_s3']}")
+
+    print(f"\n{'escenario':<45} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for clave, r in resultados.items():
+        print(f"{clave:<45} {r['n']:>5} {r['p50']:>9.2f} {r['p95']:>9.2f} {r['p99']:>9.2f}")
+
+    if args.guardar_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as archivo:
+            json.dump(resultados, archivo, indent=2, sort_keys=True)
+        print(f"\nLínea base guardada en {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nSin línea base; usa --guardar-baseline para crearla")
+        return 0
+    with open(args.baseline, encoding="utf-8") as archivo:
+        regresiones = comparar(resultados, json.load(archivo), args.tolerancia)
+    if not regresiones:
+        print(f"\nSin regresiones contra la línea base (tolerancia {args.tolerancia:.0%})")
+        return 0
+    print(f"\n⚠️  Regresiones de p95 (tolerancia {args.tolerancia:.0%}):")
+    for clave, previo, actual in regresiones:
+        print(f"  {clave}: {previo:.2f} ms -> {actual:.2f} ms")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""Generador de carga con bibliotecas grandes (10^3 a 10^6 libros).
+
+Construye documentos de usuario sintéticos con libros, préstamos activos e
+historial, los siembra en _FAKE_STORE (o en el S3 simulado) y manda tráfico
+mezclado de Listar, Buscar, Prestar, Devolver y ConsultarPrestamos a través de
+lambda_function.lambda_handler. Por request registra latencia, memoria asignada
+(pico de tracemalloc) y tamaño del documento serializado.
+
+Uso:
+    python herramientas/carga_biblioteca.py [--libros 1000,10000,100000]
+        [--requests 200] [--modo fake|s3-simulado] [--semilla 7]
+        [--fraccion-prestados 0.05] [--historial-por-libro 0.2]
+        [--tamano-cada 10] [--sin-asignaciones] [--perfil] [--salida registros.jsonl]
+"""
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+HERRAMIENTAS_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(HERRAMIENTAS_DIR, "..", "lambda")
+
+ADJETIVOS = ["rojo", "perdido", "infinito", "secreto", "último", "dorado", "silencioso", "eterno",
+             "oscuro", "breve", "salvaje", "invisible"]
+SUSTANTIVOS = ["jardín", "río", "laberinto", "viaje", "espejo", "invierno", "faro", "camino",
+               "bosque", "reino", "puerto", "mapa"]
+TIPOS = ["novela", "ensayo", "poesía", "cuento", "historia", "ciencia"]
+PERSONAS = ["Ana", "Luis", "Marta", "Jorge", "Sofía", "Pedro"]
+
+# Peso de cada intent en la mezcla de tráfico
+MEZCLA = {
+    "ListarLibrosIntent": 30,
+    "BuscarLibroIntent": 30,
+    "PrestarLibroIntent": 15,
+    "DevolverLibroIntent": 15,
+    "ConsultarPrestamosIntent": 10,
+}
+
+
+# ==============================
+# Documentos sintéticos
+# ==============================
+def titulo_sintetico(i):
+    return f"El {SUSTANTIVOS[i % len(SUSTANTIVOS)]} {ADJETIVOS[(i // len(SUSTANTIVOS)) % len(ADJETIVOS)]} {i}"
+
+
+def _epoch(fecha):
+    return int(fecha.timestamp())
+
+
+def generar_documento(libros, fraccion_prestados=0.05, historial_por_libro=0.2, semilla=7):
+    """Documento con la misma forma que DatabaseManager.initial_data()"""
+    azar = random.Random(semilla)
+    ahora = datetime.now()
+    catalogo = [
+        {"id": f"L{i:07d}", "titulo": titulo_sintetico(i), "autor": f"Autor {i % 997}",
+         "tipo": TIPOS[i % len(TIPOS)], "fecha_agregado": _epoch(ahora - timedelta(days=i % 900)),
+         "total_prestamos": 0, "estado": "disponible"}
+        for i in range(libros)
+    ]
+
+    prestados = azar.sample(range(libros), int(libros * fraccion_prestados))
+    prestamos = []
+    for n, i in enumerate(prestados):
+        libro = catalogo[i]
+        libro["estado"] = "prestado"
+        libro["total_prestamos"] += 1
+        inicio = ahora - timedelta(days=azar.randint(0, 14))
+        prestamos.append({"id": f"P{n:08d}", "libro_id": libro["id"], "titulo": libro["titulo"],
+                          "persona": azar.choice(PERSONAS), "fecha_prestamo": _epoch(inicio),
+                          "fecha_limite": _epoch(inicio + timedelta(days=7)), "estado": "activo"})
+
+    historial = []
+    for n in range(int(libros * historial_por_libro)):
+        libro = catalogo[azar.randrange(libros)]
+        libro["total_prestamos"] += 1
+        inicio = ahora - timedelta(days=azar.randint(15, 700))
+        historial.append({"id": f"H{n:08d}", "libro_id": libro["id"], "titulo": libro["titulo"],
+                          "persona": azar.choice(PERSONAS), "fecha_prestamo": _epoch(inicio),
+                          "fecha_limite": _epoch(inicio + timedelta(days=7)),
+                          "fecha_devolucion": _epoch(inicio + timedelta(days=azar.randint(1, 10))),
+                          "estado": "devuelto"})
+
+    return {
+        "libros_disponibles": catalogo,
+        "prestamos_activos": prestamos,
+        "historial_prestamos": historial,
+        "estadisticas": {"total_libros": libros, "total_prestamos": len(prestamos) + len(historial),
+                         "total_devoluciones": len(historial)},
+        "historial_conversaciones": [],
+        "configuracion": {"limite_prestamos": 10, "dias_prestamo": 7},
+        "usuario_frecuente": True,
+    }
+
+
+class Trafico:
+    """Genera sobres con la mezcla de intents, siguiendo qué títulos están prestados
+    para que Prestar y Devolver apunten casi siempre a libros válidos"""
+
+    def __init__(self, user_id, documento, semilla=7):
+        self.user_id = user_id
+        self.azar = random.Random(semilla)
+        self.total = len(documento["libros_disponibles"])
+        self.prestados = [p["titulo"] for p in documento["prestamos_activos"]]
+        self._prestados = set(self.prestados)
+        self.intents = list(MEZCLA)
+        self.pesos = [MEZCLA[i] for i in self.intents]
+
+    def _titulo_disponible(self):
+        while True:
+            titulo = titulo_sintetico(self.azar.randrange(self.total))
+            if titulo not in self._prestados:
+                return titulo
+
+    def siguiente(self):
+        import sobres
+        nombre = self.azar.choices(self.intents, self.pesos)[0]
+        if nombre == "DevolverLibroIntent" and not self.prestados:
+            nombre = "PrestarLibroIntent"
+
+        slots = {}
+        if nombre == "ListarLibrosIntent":
+            slots = {"filtro_tipo": self.azar.choice([None, None, "disponibles", "prestados"])}
+        elif nombre == "BuscarLibroIntent":
+            slots = {"titulo": titulo_sintetico(self.azar.randrange(self.total))}
+        elif nombre == "PrestarLibroIntent":
+            titulo = self._titulo_disponible()
+            self.prestados.append(titulo)
+            self._prestados.add(titulo)
+            slots = {"titulo": titulo, "nombre_persona": self.azar.choice(PERSONAS)}
+        elif nombre == "DevolverLibroIntent":
+            titulo = self.prestados.pop(self.azar.randrange(len(self.prestados)))
+            self._prestados.discard(titulo)
+            slots = {"titulo": titulo}
+        return sobres.intent(nombre, self.user_id, slots)
+
+
+# ==============================
+# Ejecución
+# ==============================
+def preparar_entorno(modo):
+    """Configura el entorno antes de importar lambda_function; devuelve el cliente S3 simulado si aplica"""
+    sys.path.insert(0, LAMBDA_DIR)
+    sys.path.insert(0, HERRAMIENTAS_DIR)
+    from benchmark_lambda import MODOS
+    os.environ.update(MODOS[modo])
+    # Las líneas EMF por request ensuciarían el reporte
+    os.environ.setdefault("ENABLE_TRACING", "false")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    if modo == "s3-simulado":
+        from s3_simulado import ClienteS3Simulado
+        from database import clientes_aws
+        cliente = clientes_aws._CLIENTES["s3"] = ClienteS3Simulado()
+        return cliente
+    return None
+
+
+def sembrar(lambda_function, modo, user_id, documento):
+    if modo == "fake":
+        from database.database import _FAKE_STORE
+        _FAKE_STORE[user_id] = documento
+    else:
+        from benchmark_lambda import sembrar as sembrar_por_adapter
+        sembrar_por_adapter(lambda_function, user_id, documento)
+
+
+def tamano_documento(lambda_function, modo, user_id):
+    """Bytes del documento tal como quedó persistido"""
+    if modo == "fake":
+        from database.database import _FAKE_STORE
+        valor = _FAKE_STORE.get(user_id, {})
+        if isinstance(valor, bytes):
+            return len(valor)
+        return len(json.dumps(valor, default=str).encode("utf-8"))
+    from benchmark_lambda import BUCKET
+    from database import clientes_aws
+    return len(clientes_aws._CLIENTES["s3"].objetos.get((BUCKET, user_id), b""))
+
+
+def correr_tamano(lambda_function, args, libros, registros):
+    from database.database import DatabaseManager
+    user_id = f"amzn1.ask.account.CARGA{libros}"
+    inicio = time.perf_counter()
+    documento = generar_documento(libros, args.fraccion_prestados, args.historial_por_libro, args.semilla)
+    trafico = Trafico(user_id, documento, args.semilla)
+    sembrar(lambda_function, args.modo, user_id, documento)
+    del documento
+    print(f"\n📚 {libros} libros: documento generado y sembrado en {time.perf_counter() - inicio:.1f} s")
+
+    perfil = cProfile.Profile() if args.perfil else None
+    medir_asignaciones = not args.sin_asignaciones
+    if medir_asignaciones:
+        tracemalloc.start()
+
+    tamano = tamano_documento(lambda_function, args.modo, user_id)
+    for n in range(args.requests):
+        envelope = trafico.siguiente()
+        if medir_asignaciones:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        if perfil:
+            perfil.enable()
+        t0 = time.perf_counter()
+        lambda_function.lambda_handler(envelope, None)
+        latencia = (time.perf_counter() - t0) * 1000
+        if perfil:
+            perfil.disable()
+        pico = tracemalloc.get_traced_memory()[1] - base if medir_asignaciones else None
+        if args.tamano_cada and n % args.tamano_cada == 0:
+            tamano = tamano_documento(lambda_function, args.modo, user_id)
+        registros.append({"libros": libros, "intent": envelope["request"]["intent"]["name"],
+                          "latencia_ms": latencia, "asignado_pico_bytes": pico, "documento_bytes": tamano})
+
+    if medir_asignaciones:
+        tracemalloc.stop()
+    DatabaseManager.clear_cache_by_user_id(user_id)
+    return perfil
+
+
+def reportar(registros, libros):
+    from benchmark_lambda import percentil
+    print(f"{'intent':<28} {'n':>5} {'p50 ms':>10} {'p95 ms':>10} {'máx ms':>10} {'pico KiB':>10} {'doc KiB':>10}")
+    por_intent = {}
+    for r in registros:
+        if r["libros"] == libros:
+            por_intent.setdefault(r["intent"], []).append(r)
+    for intent, filas in sorted(por_intent.items()):
+        latencias = [f["latencia_ms"] for f in filas]
+        picos = [f["asignado_pico_bytes"] for f in filas if f["asignado_pico_bytes"] is not None]
+        pico = f"{percentil(picos, 50) / 1024:>10.0f}" if picos else f"{'-':>10}"
+        print(f"{intent:<28} {len(filas):>5} {percentil(latencias, 50):>10.2f} {percentil(latencias, 95):>10.2f} "
+              f"{max(latencias):>10.2f} {pico} {filas[-1]['documento_bytes'] / 1024:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--libros", default="1000,10000,100000", help="tamaños de biblioteca separados por coma")
+    parser.add_argument("--requests", type=int, default=200, help="requests por tamaño")
+    parser.add_argument("--modo", choices=["fake", "s3-simulado"], default="fake")
+    parser.add_argument("--semilla", type=int, default=7)
+    parser.add_argument("--fraccion-prestados", type=float, default=0.05)
+    parser.add_argument("--historial-por-libro", type=float, default=0.2)
+    parser.add_argument("--tamano-cada", type=int, default=10,
+                        help="serializa el documento para medir su tamaño cada N requests (0 = solo al inicio)")
+    parser.add_argument("--sin-asignaciones", action="store_true", help="no usar tracemalloc")
+    parser.add_argument("--perfil", action="store_true", help="muestra las funciones más costosas por tamaño")
+    parser.add_argument("--salida", help="escribe cada request medido como una línea JSONL")
+    args = parser.parse_args()
+
+    preparar_entorno(args.modo)
+    import lambda_function
+
+    registros = []
+    for libros in (int(n) for n in args.libros.split(",")):
+        perfil = correr_tamano(lambda_function, args, libros, registros)
+        reportar(registros, libros)
+        if perfil:
+            pstats.Stats(perfil).sort_stats("cumulative").print_stats(15)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            for r in registros:
+                archivo.write(json.dumps(r) + "\n")
+        print(f"\nRegistros escritos en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
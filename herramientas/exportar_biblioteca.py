@@ -0,0 +1,107 @@
+"""Exporta libros, préstamos activos e historial de un usuario a JSONL o CSV.
+
+El documento se lee una vez (archivo JSON local, objeto del usuario en S3 o
+una biblioteca sintética sembrada en el FakeS3Adapter) y los registros se
+escriben en streaming. JSONL: un solo archivo (o la salida estándar), una
+línea por registro con su "seccion". CSV: un archivo por sección en el
+directorio de salida. Al terminar reporta registros, MiB y throughput por
+la salida de errores.
+
+Uso:
+    python herramientas/exportar_biblioteca.py --documento usuario.json [--salida respaldo.jsonl]
+    python herramientas/exportar_biblioteca.py --bucket BUCKET --usuario USER_ID --formato csv --salida dir/
+        [--codec json+zlib] [--fragmentado]
+    python herramientas/exportar_biblioteca.py --sintetico 100000 [--codec json+zlib] --salida /dev/null
+        [--secciones libros_disponibles,historial_prestamos] [--iso]
+"""
+import argparse
+import os
+import sys
+import time
+
+HERRAMIENTAS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERRAMIENTAS_DIR, "..", "lambda"))
+sys.path.insert(0, HERRAMIENTAS_DIR)
+os.environ.setdefault("ENABLE_TRACING", "false")
+
+from importar_libros import DocumentoLocal, DocumentoS3  # noqa: E402
+from utility.exportacion import SECCIONES, exportar_csv, exportar_jsonl  # noqa: E402
+
+USER_ID = "amzn1.ask.account.EXPORTACION"
+
+
+def documento_sintetico(libros, codec):
+    """Siembra una biblioteca generada en el FakeS3Adapter y la lee de vuelta,
+    como la vería la skill con ese codec"""
+    from carga_biblioteca import generar_documento
+    from database.codec import obtener_codec
+    from database.database import FakeS3Adapter
+    adaptador = FakeS3Adapter(obtener_codec(codec))
+    adaptador.guardar_condicional(USER_ID, generar_documento(libros))
+    return adaptador.leer(USER_ID)
+
+
+def exportar(documento, formato, salida, secciones, iso):
+    """Devuelve (registros, caracteres) escritos"""
+    if formato == "jsonl":
+        if salida == "-":
+            return exportar_jsonl(documento, sys.stdout, secciones, iso)
+        with open(salida, "w", encoding="utf-8") as archivo:
+            return exportar_jsonl(documento, archivo, secciones, iso)
+
+    os.makedirs(salida, exist_ok=True)
+    total = caracteres = 0
+    for seccion in secciones:
+        with open(os.path.join(salida, f"{seccion}.csv"), "w", encoding="utf-8", newline="") as archivo:
+            total += exportar_csv(documento, seccion, archivo, iso)
+            caracteres += archivo.tell()
+    return total, caracteres
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documento", help="documento JSON local del usuario")
+    parser.add_argument("--bucket")
+    parser.add_argument("--usuario")
+    parser.add_argument("--sintetico", type=int, metavar="LIBROS", help="biblioteca generada en el FakeS3Adapter")
+    parser.add_argument("--codec", default=os.getenv("PERSISTENCE_CODEC", "json"))
+    parser.add_argument("--fragmentado", action="store_true", help="formato de ShardedS3Adapter")
+    parser.add_argument("--formato", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--salida", default="-", help="archivo JSONL, '-' (stdout) o directorio para CSV")
+    parser.add_argument("--secciones", default=",".join(SECCIONES))
+    parser.add_argument("--iso", action="store_true", help="fechas en ISO 8601 en lugar de segundos epoch")
+    args = parser.parse_args()
+
+    secciones = [s for s in args.secciones.split(",") if s]
+    desconocidas = set(secciones) - set(SECCIONES)
+    if desconocidas:
+        parser.error(f"secciones desconocidas: {', '.join(sorted(desconocidas))}")
+    if args.formato == "csv" and args.salida == "-":
+        parser.error("CSV necesita un directorio en --salida")
+
+    inicio = time.perf_counter()
+    if args.sintetico:
+        documento = documento_sintetico(args.sintetico, args.codec)
+    elif args.documento:
+        documento = DocumentoLocal(args.documento).cargar()
+    elif args.bucket and args.usuario:
+        documento = DocumentoS3(args.bucket, args.usuario, args.codec, args.fragmentado).cargar()
+    else:
+        parser.error("hace falta --documento, --bucket y --usuario, o --sintetico")
+    if documento is None:
+        print("El usuario no tiene documento guardado", file=sys.stderr)
+        return 1
+    lectura = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    total, caracteres = exportar(documento, args.formato, args.salida, secciones, args.iso)
+    duracion = time.perf_counter() - inicio
+    mib = caracteres / (1024 * 1024)
+    print(f"Registros: {total}  {mib:.1f} MiB  lectura {lectura * 1000:.0f} ms  "
+          f"exportación {duracion * 1000:.0f} ms  ({total / duracion:,.0f} registros/s, "
+          f"{mib / duracion:.1f} MiB/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Importa libros en masa desde un CSV (p. ej. un export de Goodreads) o un JSONL.
+
+El archivo se lee en streaming; los libros inválidos o con un título que ya
+está en la biblioteca se saltan. El documento del usuario se escribe una sola
+vez al final: un archivo JSON local (--documento) o el objeto del usuario en S3
+(--bucket/--usuario, con escritura condicional: si otro proceso lo modificó
+mientras tanto, no se pisa y hay que volver a correr la importación). Con
+--fragmentado no hay escritura condicional: gana la última escritura, así que
+conviene importar cuando el usuario no esté usando la skill.
+
+Uso:
+    python herramientas/importar_libros.py libros.csv --documento usuario.json
+    python herramientas/importar_libros.py libros.jsonl --bucket BUCKET --usuario USER_ID
+        [--codec json+zlib] [--fragmentado] [--formato csv|jsonl] [--simular]
+"""
+import argparse
+import json
+import os
+import sys
+
+HERRAMIENTAS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERRAMIENTAS_DIR, "..", "lambda"))
+os.environ.setdefault("ENABLE_TRACING", "false")
+
+from database.database import ConflictoDeEscritura, DatabaseManager  # noqa: E402
+from utility.importacion import importar_archivo  # noqa: E402
+
+
+class DocumentoLocal:
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    def cargar(self):
+        if not os.path.exists(self.ruta):
+            return None
+        with open(self.ruta, encoding="utf-8") as archivo:
+            return json.load(archivo)
+
+    def guardar(self, documento):
+        # Se reemplaza de una vez: nunca queda un archivo a medio escribir
+        temporal = self.ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(documento, archivo, ensure_ascii=False)
+        os.replace(temporal, self.ruta)
+
+
+class DocumentoS3:
+    def __init__(self, bucket, user_id, codec, fragmentado):
+        from database.almacen import AlmacenS3
+        from database.codec import CodecS3Adapter, obtener_codec
+        from database.fragmentos import ShardedS3Adapter
+        almacen = AlmacenS3(bucket)
+        self.user_id = user_id
+        self.fragmentado = fragmentado
+        self.adaptador = ShardedS3Adapter(almacen) if fragmentado else CodecS3Adapter(almacen, obtener_codec(codec))
+        self.etag = None
+
+    def cargar(self):
+        if self.fragmentado:
+            # Solo se reescriben los fragmentos que la importación tocó
+            return self.adaptador.cargar_documento(self.user_id) or None
+        contenido, self.etag, _ = self.adaptador.almacen.leer_con_etag(self.adaptador._clave(self.user_id))
+        return self.adaptador.codec.decodificar(contenido) if contenido else None
+
+    def guardar(self, documento):
+        """Escritura condicional al ETag leído en cargar(); en formato
+        fragmentado, incondicional (gana la última escritura): ShardedS3Adapter
+        no tiene escritura condicional y la importación reescribe el catálogo y
+        la base aunque otro proceso los haya cambiado desde cargar()"""
+        if self.fragmentado:
+            self.adaptador.guardar_documento(self.user_id, documento)
+        else:
+            self.adaptador.guardar_condicional(self.user_id, documento, etag=self.etag, nuevo=self.etag is None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archivo")
+    parser.add_argument("--formato", choices=["csv", "jsonl"])
+    parser.add_argument("--documento", help="documento JSON local del usuario")
+    parser.add_argument("--bucket")
+    parser.add_argument("--usuario")
+    parser.add_argument("--codec", default=os.getenv("PERSISTENCE_CODEC", "json"))
+    parser.add_argument("--fragmentado", action="store_true", help="formato de ShardedS3Adapter")
+    parser.add_argument("--simular", action="store_true", help="no escribe nada")
+    args = parser.parse_args()
+
+    if args.documento:
+        destino = DocumentoLocal(args.documento)
+    elif args.bucket and args.usuario:
+        destino = DocumentoS3(args.bucket, args.usuario, args.codec, args.fragmentado)
+    else:
+        parser.error("hace falta --documento o --bucket y --usuario")
+
+    documento = destino.cargar() or DatabaseManager.initial_data()
+    resumen = importar_archivo(documento, args.archivo, args.formato)
+    print(f"Importados: {resumen['importados']}  duplicados: {resumen['duplicados']}  "
+          f"inválidos: {resumen['invalidos']}")
+    for numero, motivo in resumen["errores"]:
+        print(f"  línea {numero}: {motivo}")
+    if args.simular or not resumen["importados"]:
+        return 0
+
+    try:
+        destino.guardar(documento)
+    except ConflictoDeEscritura as e:
+        print(f"No se guardó: {e}. Vuelve a correr la importación.")
+        return 1
+    print(f"Biblioteca guardada: {len(documento['libros_disponibles'])} libros")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Compara los codecs de persistencia sobre documentos sintéticos (o uno real).
+
+Para cada codec disponible reporta bytes, ahorro contra JSON legado y tiempos
+de codificación y decodificación. Los codecs cuya dependencia opcional
+(msgpack, cbor2, zstandard) no está instalada se omiten.
+
+Uso:
+    python herramientas/reporte_codec.py [--libros 1000,10000,100000]
+        [--codecs json,json+zlib,msgpack+zlib,msgpack+zstd,cbor+zlib]
+        [--documento usuario.json] [--repeticiones 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+HERRAMIENTAS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERRAMIENTAS_DIR, "..", "lambda"))
+sys.path.insert(0, HERRAMIENTAS_DIR)
+
+from database.codec import Codec  # noqa: E402
+
+CODECS = "json,json+zlib,msgpack,msgpack+zlib,msgpack+zstd,cbor+zlib"
+
+
+def medir(codec, documento, repeticiones):
+    codificar, decodificar = [], []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        contenido = codec.codificar(documento)
+        codificar.append((time.perf_counter() - inicio) * 1000)
+        inicio = time.perf_counter()
+        codec.decodificar(contenido)
+        decodificar.append((time.perf_counter() - inicio) * 1000)
+    return len(contenido), min(codificar), min(decodificar)
+
+
+def reportar(nombre, documento, codecs, repeticiones):
+    print(f"\n📦 {nombre}")
+    print(f"{'codec':<16} {'KiB':>10} {'ahorro':>8} {'codificar ms':>13} {'decodificar ms':>15}")
+    referencia = None
+    for nombre_codec in codecs:
+        try:
+            codec = Codec(nombre_codec)
+        except ImportError as e:
+            print(f"{nombre_codec:<16} (no disponible: {e})")
+            continue
+        tamano, t_codificar, t_decodificar = medir(codec, documento, repeticiones)
+        if referencia is None:
+            referencia = len(json.dumps(documento).encode("utf-8"))
+        print(f"{nombre_codec:<16} {tamano / 1024:>10.1f} {1 - tamano / referencia:>8.1%} "
+              f"{t_codificar:>13.2f} {t_decodificar:>15.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--libros", default="1000,10000,100000")
+    parser.add_argument("--codecs", default=CODECS)
+    parser.add_argument("--documento", help="documento JSON real en lugar de los sintéticos")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+    codecs = args.codecs.split(",")
+
+    if args.documento:
+        with open(args.documento, encoding="utf-8") as archivo:
+            reportar(args.documento, json.load(archivo), codecs, args.repeticiones)
+        return 0
+
+    from carga_biblioteca import generar_documento
+    for libros in (int(n) for n in args.libros.split(",")):
+        reportar(f"{libros} libros", generar_documento(libros), codecs, args.repeticiones)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
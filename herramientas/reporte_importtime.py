@@ -0,0 +1,68 @@
+"""Compara el costo de importar lambda_function.py (fase de init de Lambda)
+con y sin LAZY_IMPORTS, usando `python -X importtime` en intérpretes nuevos.
+
+Uso:
+    python herramientas/reporte_importtime.py [--repeticiones 5] [--top 15] [--s3]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda")
+LINEA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def medir(lazy, fake_s3=True):
+    """Importa lambda_function en un intérprete nuevo y devuelve
+    (microsegundos totales, {modulo: microsegundos propios})"""
+    env = dict(os.environ,
+               USE_FAKE_S3="true" if fake_s3 else "false",
+               LAZY_IMPORTS="true" if lazy else "false")
+    env.setdefault("S3_PERSISTENCE_BUCKET", "bucket-de-prueba")
+    env.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import lambda_function"],
+                          cwd=LAMBDA_DIR, env=env, capture_output=True, text=True, check=True)
+    propios = {}
+    total = 0
+    for linea in proc.stderr.splitlines():
+        m = LINEA.match(linea)
+        if not m:
+            continue
+        propio, acumulado, sangria, modulo = int(m.group(1)), int(m.group(2)), m.group(3), m.group(4)
+        propios[modulo] = propio
+        if len(sangria) == 1:
+            # Imports de primer nivel: su acumulado ya incluye a sus dependencias
+            total += acumulado
+    return total, propios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--s3", action="store_true", help="medir el modo S3 real en vez de FakeS3")
+    args = parser.parse_args()
+
+    resultados = {}
+    for lazy in (False, True):
+        muestras = [medir(lazy, fake_s3=not args.s3) for _ in range(args.repeticiones)]
+        resultados[lazy] = (statistics.median(t for t, _ in muestras), muestras[-1][1])
+
+    ansioso, perezoso = resultados[False][0], resultados[True][0]
+    print(f"Init (mediana de {args.repeticiones}, modo {'S3' if args.s3 else 'FakeS3'}):")
+    print(f"  LAZY_IMPORTS=false  {ansioso / 1000:8.1f} ms")
+    print(f"  LAZY_IMPORTS=true   {perezoso / 1000:8.1f} ms")
+    print(f"  ahorro              {(ansioso - perezoso) / 1000:8.1f} ms ({100 * (1 - perezoso / ansioso):.0f}%)")
+
+    solo_ansioso = set(resultados[False][1]) - set(resultados[True][1])
+    diferidos = sorted(solo_ansioso, key=lambda m: resultados[False][1][m], reverse=True)
+    print(f"\nMódulos que ya no se importan en init ({len(diferidos)}), top {args.top} por costo propio:")
+    for modulo in diferidos[:args.top]:
+        print(f"  {resultados[False][1][modulo] / 1000:7.2f} ms  {modulo}")
+
+
+if __name__ == "__main__":
+    main()
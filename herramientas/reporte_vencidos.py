@@ -0,0 +1,271 @@
+"""Reporte nocturno de préstamos vencidos de todos los usuarios del bucket.
+
+Lista los documentos de usuario de S3_PERSISTENCE_BUCKET (un objeto por
+usuario, con cualquier codec, o el formato fragmentado, del que solo se lee
+el fragmento de préstamos), los descarga con un pool de hilos y los
+decodifica y analiza con un pool de procesos. Nunca hay más de --en-vuelo
+documentos en memoria.
+
+Cada usuario analizado se agrega enseguida al archivo de salida (JSONL), que
+es a la vez el reporte y el checkpoint: si el job se corta, volver a correrlo
+con la misma --salida salta los usuarios ya reportados, reintenta los que
+fallaron y usa la misma hora de corte que la primera corrida.
+
+Uso:
+    python herramientas/reporte_vencidos.py --salida vencidos.jsonl [--bucket BUCKET]
+        [--hilos 16] [--procesos 4] [--en-vuelo 64] [--codec json+zlib] [--ahora EPOCH]
+    python herramientas/reporte_vencidos.py --directorio /tmp/bucket --sembrar 500 --salida vencidos.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+HERRAMIENTAS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERRAMIENTAS_DIR, "..", "lambda"))
+sys.path.insert(0, HERRAMIENTAS_DIR)
+os.environ.setdefault("ENABLE_TRACING", "false")
+
+from utility.vencimientos import resumen_vencimientos  # noqa: E402
+
+PREFIJO_FRAGMENTADO = "usuarios/"
+FRAGMENTO_PRESTAMOS = "/prestamos.json"
+FSYNC_CADA = 200
+
+
+# ==============================
+# Usuarios del bucket
+# ==============================
+def usuarios(almacen):
+    """Genera (user_id, clave, fragmentado). Los usuarios ya migrados al formato
+    fragmentado se leen de ahí aunque conserven el objeto legado"""
+    fragmentados = set()
+    for clave in almacen.listar(PREFIJO_FRAGMENTADO):
+        if clave.endswith(FRAGMENTO_PRESTAMOS):
+            user_id = clave[len(PREFIJO_FRAGMENTADO):-len(FRAGMENTO_PRESTAMOS)]
+            fragmentados.add(user_id)
+            yield user_id, clave, True
+    for clave in almacen.listar():
+        # Las claves con "/" son fragmentos o archivos de conversaciones
+        if "/" not in clave and clave not in fragmentados:
+            yield clave, clave, False
+
+
+# ==============================
+# Análisis (corre en el pool de procesos)
+# ==============================
+def analizar(user_id, contenido, fragmentado, codec, ahora):
+    """Decodifica un documento (o el fragmento de préstamos) y resume sus vencidos"""
+    if fragmentado:
+        prestamos = json.loads(contenido)
+    else:
+        from database.codec import obtener_codec
+        prestamos = (obtener_codec(codec).decodificar(contenido) or {}).get("prestamos_activos", [])
+    prestamos = [p for p in prestamos or () if isinstance(p, dict)]
+    resumen = resumen_vencimientos(prestamos, ahora, urgentes=None)
+    return {
+        "usuario": user_id,
+        "prestamos": resumen["total"],
+        "vencidos": resumen["vencidos"],
+        "por_vencer": resumen["por_vencer"],
+        "detalle": [{"id": p.get("id"), "titulo": p.get("titulo"), "persona": p.get("persona"),
+                     "dias_vencido": -dias}
+                    for p, dias in resumen["urgentes"]],
+    }
+
+
+# ==============================
+# Checkpoint
+# ==============================
+def _termina_en_linea(ruta):
+    with open(ruta, "rb") as archivo:
+        archivo.seek(-1, os.SEEK_END)
+        return archivo.read(1) == b"\n"
+
+
+class Bitacora:
+    """Archivo JSONL de resultados: una cabecera con la hora de corte y una
+    línea por usuario. Al reabrirlo recupera los usuarios ya reportados"""
+
+    def __init__(self, ruta, ahora):
+        self.ruta = ruta
+        self.hechos = set()
+        self.ahora = ahora
+        self._pendientes_fsync = 0
+        cabecera = None
+        if os.path.exists(ruta):
+            with open(ruta, encoding="utf-8") as archivo:
+                for linea in archivo:
+                    try:
+                        registro = json.loads(linea)
+                    except ValueError:
+                        # Última línea cortada por una caída: se reescribe
+                        continue
+                    if cabecera is None:
+                        cabecera = registro
+                    elif "error" not in registro:
+                        self.hechos.add(registro["usuario"])
+        self._archivo = open(ruta, "a", encoding="utf-8")
+        if self._archivo.tell() and not _termina_en_linea(ruta):
+            self._archivo.write("\n")
+        if cabecera is None:
+            self._escribir({"reporte": "vencidos", "ahora": ahora})
+        else:
+            self.ahora = cabecera["ahora"]
+
+    def _escribir(self, registro):
+        self._archivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        self._archivo.flush()
+        self._pendientes_fsync += 1
+        if self._pendientes_fsync >= FSYNC_CADA:
+            os.fsync(self._archivo.fileno())
+            self._pendientes_fsync = 0
+
+    def registrar(self, registro):
+        self._escribir(registro)
+        if "error" not in registro:
+            self.hechos.add(registro["usuario"])
+
+    def cerrar(self):
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self._archivo.close()
+
+
+# ==============================
+# Job
+# ==============================
+def correr(almacen, bitacora, codec, hilos, procesos, en_vuelo):
+    """Descarga con `hilos`, analiza con `procesos` (0: en el mismo proceso) y
+    registra cada usuario. Devuelve las métricas de la corrida"""
+    metricas = {"analizados": 0, "saltados": 0, "errores": 0, "bytes": 0}
+    analisis = ProcessPoolExecutor(procesos) if procesos else ThreadPoolExecutor(1)
+    lecturas, analizando = {}, {}
+    pendientes = usuarios(almacen)
+
+    def llenar():
+        for user_id, clave, fragmentado in pendientes:
+            if user_id in bitacora.hechos:
+                metricas["saltados"] += 1
+                continue
+            lecturas[descargas.submit(almacen.leer, clave)] = (user_id, fragmentado)
+            if len(lecturas) + len(analizando) >= en_vuelo:
+                return
+
+    with ThreadPoolExecutor(hilos) as descargas, analisis:
+        llenar()
+        while lecturas or analizando:
+            listos, _ = wait(list(lecturas) + list(analizando), return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                if futuro in lecturas:
+                    user_id, fragmentado = lecturas.pop(futuro)
+                    try:
+                        contenido = futuro.result()
+                    except Exception as e:
+                        metricas["errores"] += 1
+                        bitacora.registrar({"usuario": user_id, "error": f"lectura: {type(e).__name__}: {e}"})
+                        continue
+                    if contenido is None:
+                        # Se borró entre el listado y la lectura
+                        continue
+                    metricas["bytes"] += len(contenido)
+                    analizando[analisis.submit(analizar, user_id, contenido, fragmentado, codec,
+                                               bitacora.ahora)] = user_id
+                else:
+                    user_id = analizando.pop(futuro)
+                    try:
+                        bitacora.registrar(futuro.result())
+                        metricas["analizados"] += 1
+                    except Exception as e:
+                        metricas["errores"] += 1
+                        bitacora.registrar({"usuario": user_id, "error": f"análisis: {type(e).__name__}: {e}"})
+            llenar()
+    return metricas
+
+
+def totales(ruta):
+    """Resumen del reporte completo (esta corrida y las anteriores)"""
+    resultado = {"usuarios": 0, "con_vencidos": 0, "prestamos": 0, "vencidos": 0, "errores": 0}
+    ultimos = {}
+    with open(ruta, encoding="utf-8") as archivo:
+        next(archivo, None)
+        for linea in archivo:
+            try:
+                registro = json.loads(linea)
+            except ValueError:
+                continue
+            # Un usuario que falló y luego se reportó cuenta una sola vez
+            ultimos[registro["usuario"]] = registro
+    for registro in ultimos.values():
+        if "error" in registro:
+            resultado["errores"] += 1
+            continue
+        resultado["usuarios"] += 1
+        resultado["con_vencidos"] += registro["vencidos"] > 0
+        resultado["prestamos"] += registro["prestamos"]
+        resultado["vencidos"] += registro["vencidos"]
+    return resultado
+
+
+def sembrar(almacen, cantidad, codec):
+    """Usuarios sintéticos en el almacén: uno de cada tres en formato fragmentado"""
+    from carga_biblioteca import generar_documento
+    from database.codec import CodecS3Adapter, obtener_codec
+    from database.fragmentos import ShardedS3Adapter
+    plano = CodecS3Adapter(almacen, obtener_codec(codec))
+    fragmentado = ShardedS3Adapter(almacen)
+    for n in range(cantidad):
+        documento = generar_documento(50 + n % 400, fraccion_prestados=0.1, semilla=n)
+        user_id = f"amzn1.ask.account.REPORTE{n:06d}"
+        if n % 3 == 2:
+            fragmentado.guardar_documento(user_id, documento)
+        else:
+            plano.guardar_condicional(user_id, documento)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--salida", required=True, help="reporte JSONL; también es el checkpoint")
+    parser.add_argument("--bucket", default=os.getenv("S3_PERSISTENCE_BUCKET"))
+    parser.add_argument("--directorio", help="directorio local en lugar del bucket")
+    parser.add_argument("--sembrar", type=int, metavar="USUARIOS", help="con --directorio, usuarios sintéticos")
+    parser.add_argument("--codec", default=os.getenv("PERSISTENCE_CODEC", "json"))
+    parser.add_argument("--hilos", type=int, default=16)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--en-vuelo", type=int, default=64)
+    parser.add_argument("--ahora", type=int, help="hora de corte (epoch); por omisión, la de inicio")
+    args = parser.parse_args()
+
+    if args.directorio:
+        from database.almacen import AlmacenDirectorio
+        almacen = AlmacenDirectorio(args.directorio)
+        if args.sembrar:
+            sembrar(almacen, args.sembrar, args.codec)
+    elif args.bucket:
+        from database.almacen import AlmacenS3
+        almacen = AlmacenS3(args.bucket)
+    else:
+        parser.error("hace falta --bucket (o S3_PERSISTENCE_BUCKET) o --directorio")
+
+    bitacora = Bitacora(args.salida, args.ahora or int(time.time()))
+    inicio = time.perf_counter()
+    try:
+        metricas = correr(almacen, bitacora, args.codec, args.hilos, args.procesos, max(args.en_vuelo, 1))
+    finally:
+        bitacora.cerrar()
+    duracion = time.perf_counter() - inicio
+
+    print(f"Corrida: {metricas['analizados']} usuarios analizados, {metricas['saltados']} ya reportados, "
+          f"{metricas['errores']} errores, {metricas['bytes'] / (1024 * 1024):.1f} MiB en {duracion:.1f} s "
+          f"({metricas['analizados'] / duracion if duracion else 0:,.0f} usuarios/s)")
+    resumen = totales(args.salida)
+    print(f"Reporte: {resumen['usuarios']} usuarios, {resumen['con_vencidos']} con vencidos, "
+          f"{resumen['vencidos']} de {resumen['prestamos']} préstamos vencidos, "
+          f"{resumen['errores']} usuarios con error")
+    return 1 if resumen["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Cliente de S3 simulado (en memoria) con la interfaz de boto3 que usan
+S3Adapter y AlmacenS3, para correr la skill en modo S3 sin red"""
+import hashlib
+import io
+import time
+
+from botocore.exceptions import ClientError
+
+
+class ClienteS3Simulado:
+    def __init__(self, latencia_ms=0):
+        self.objetos = {}
+        self.latencia = latencia_ms / 1000
+        self.llamadas = {"get_object": 0, "get_object_304": 0, "put_object": 0, "delete_object": 0}
+
+    def _esperar(self, operacion):
+        self.llamadas[operacion] += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    @staticmethod
+    def _no_existe(operacion):
+        return ClientError({"Error": {"Code": "NoSuchKey", "Message": "No existe"}}, operacion)
+
+    @staticmethod
+    def etag(contenido):
+        return f'"{hashlib.md5(contenido).hexdigest()}"'
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None, **kwargs):
+        self._esperar("get_object")
+        if (Bucket, Key) not in self.objetos:
+            raise self._no_existe("GetObject")
+        contenido = self.objetos[(Bucket, Key)]
+        etag = self.etag(contenido)
+        if IfNoneMatch is not None and IfNoneMatch == etag:
+            self.llamadas["get_object_304"] += 1
+            raise ClientError({"Error": {"Code": "304", "Message": "Not Modified"}}, "GetObject")
+        return {"Body": io.BytesIO(contenido), "ETag": etag}
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, **kwargs):
+        self._esperar("put_object")
+        actual = self.objetos.get((Bucket, Key))
+        if (IfMatch is not None and (actual is None or self.etag(actual) != IfMatch)) or \
+                (IfNoneMatch == "*" and actual is not None):
+            raise ClientError({"Error": {"Code": "PreconditionFailed", "Message": "At least one of the "
+                                         "pre-conditions you specified did not hold"}}, "PutObject")
+        contenido = self.objetos[(Bucket, Key)] = Body.encode("utf-8") if isinstance(Body, str) else bytes(Body)
+        return {"ETag": self.etag(contenido)}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self._esperar("delete_object")
+        self.objetos.pop((Bucket, Key), None)
+        return {}
+
+    def get_paginator(self, operacion):
+        cliente = self
+
+        class _Paginador:
+            def paginate(self, Bucket, Prefix=""):
+                claves = sorted(k for b, k in cliente.objetos if b == Bucket and k.startswith(Prefix))
+                yield {"Contents": [{"Key": k} for k in claves]}
+        return _Paginador()
@@ -0,0 +1,158 @@
+"""Simulador local de escrituras concurrentes sobre FakeS3Adapter.
+
+Varios "contenedores" (cada uno con su propio DatabaseManager y su propio cache
+en memoria) comparten el mismo _FAKE_STORE. Las operaciones (agregar, prestar,
+devolver) se intercalan: con probabilidad --intercalar, mientras un contenedor
+aplica su operación, otro completa la suya y escribe primero. Al final se
+comprueba que el efecto de cada operación confirmada siga en el documento.
+
+Con escrituras condicionales (por omisión) no debe perderse ninguna; con
+--sin-condicion se ve cuántas borra la última escritura.
+
+Uso:
+    python herramientas/simulador_conflictos.py [--contenedores 3] [--operaciones 200]
+        [--intercalar 0.3] [--semilla 7] [--sin-condicion]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import uuid
+
+HERRAMIENTAS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERRAMIENTAS_DIR, "..", "lambda"))
+sys.path.insert(0, HERRAMIENTAS_DIR)
+os.environ.setdefault("ENABLE_TRACING", "false")
+
+from ask_sdk_core.attributes_manager import AttributesManager  # noqa: E402
+from ask_sdk_core.handler_input import HandlerInput  # noqa: E402
+from ask_sdk_core.serialize import DefaultSerializer  # noqa: E402
+from ask_sdk_model import RequestEnvelope  # noqa: E402
+
+import sobres  # noqa: E402
+from database.codec import Codec  # noqa: E402
+from database.database import FakeS3Adapter, _CacheLRU, _DatabaseManagerImpl  # noqa: E402
+
+USER_ID = "amzn1.ask.account.CONFLICTOS"
+
+# Los reintentos se cuentan en las métricas; el aviso por cada uno sobra aquí
+logging.getLogger("database.database").setLevel(logging.ERROR)
+
+
+class FakeS3AdapterIncondicional(FakeS3Adapter):
+    """Escribe siempre, como antes de las escrituras condicionales"""
+    guardar_condicional = None
+
+
+class Contenedor:
+    def __init__(self, nombre, adaptador):
+        self.nombre = nombre
+        self.adaptador = adaptador
+        self.manager = _DatabaseManagerImpl(enable_ddb_cache=False, cache=_CacheLRU(), adaptador=adaptador)
+
+    def handler_input(self):
+        envelope = DefaultSerializer().deserialize(json.dumps(sobres.launch(USER_ID)), RequestEnvelope)
+        return HandlerInput(request_envelope=envelope,
+                            attributes_manager=AttributesManager(envelope, persistence_adapter=self.adaptador))
+
+
+class Simulador:
+    def __init__(self, contenedores, intercalar, azar):
+        self.contenedores = contenedores
+        self.intercalar = intercalar
+        self.azar = azar
+        self.confirmadas = []
+
+    def operacion(self, contenedor, profundidad=0):
+        tipo = self.azar.choice(["agregar", "prestar", "devolver"])
+        intentos = []
+
+        def aplicar(user_data):
+            intentos.append(1)
+            efecto = getattr(self, f"_{tipo}")(user_data)
+            # Solo en el primer intento: otro contenedor gana la carrera
+            if len(intentos) == 1 and profundidad == 0 and self.azar.random() < self.intercalar:
+                otro = self.azar.choice([c for c in self.contenedores if c is not contenedor])
+                self.operacion(otro, profundidad + 1)
+            return efecto
+
+        efecto = contenedor.manager.ejecutar_transaccion(contenedor.handler_input(), aplicar, reintentos=5)
+        if efecto is not None:
+            self.confirmadas.append((tipo, efecto))
+
+    def _agregar(self, user_data):
+        titulo = f"Libro {uuid.uuid4().hex[:8]}"
+        user_data["libros_disponibles"].append({"id": titulo, "titulo": titulo, "estado": "disponible"})
+        user_data["estadisticas"]["total_libros"] += 1
+        return titulo
+
+    def _prestar(self, user_data):
+        disponibles = [l for l in user_data["libros_disponibles"] if l["estado"] == "disponible"]
+        if not disponibles:
+            return None
+        libro = self.azar.choice(disponibles)
+        libro["estado"] = "prestado"
+        prestamo_id = f"P{uuid.uuid4().hex[:8]}"
+        user_data["prestamos_activos"].append({"id": prestamo_id, "libro_id": libro["id"]})
+        return prestamo_id
+
+    def _devolver(self, user_data):
+        prestamos = user_data["prestamos_activos"]
+        if not prestamos:
+            return None
+        prestamo = prestamos.pop(self.azar.randrange(len(prestamos)))
+        for libro in user_data["libros_disponibles"]:
+            if libro["id"] == prestamo["libro_id"]:
+                libro["estado"] = "disponible"
+        user_data["historial_prestamos"].append(prestamo)
+        return prestamo["id"]
+
+    def perdidas(self, documento):
+        titulos = {l["titulo"] for l in documento["libros_disponibles"]}
+        activos = {p["id"] for p in documento["prestamos_activos"]}
+        devueltos = {p["id"] for p in documento["historial_prestamos"]}
+        perdidas = []
+        for tipo, efecto in self.confirmadas:
+            presente = {"agregar": efecto in titulos,
+                        "prestar": efecto in activos or efecto in devueltos,
+                        "devolver": efecto in devueltos}[tipo]
+            if not presente:
+                perdidas.append((tipo, efecto))
+        return perdidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contenedores", type=int, default=3)
+    parser.add_argument("--operaciones", type=int, default=200)
+    parser.add_argument("--intercalar", type=float, default=0.3)
+    parser.add_argument("--semilla", type=int, default=7)
+    parser.add_argument("--sin-condicion", action="store_true", help="escrituras incondicionales (antes)")
+    args = parser.parse_args()
+
+    # Con bytes codificados cada lectura es una copia, como en S3
+    clase = FakeS3AdapterIncondicional if args.sin_condicion else FakeS3Adapter
+    adaptador = clase(Codec("json+zlib"))
+    contenedores = [Contenedor(f"c{n}", adaptador) for n in range(args.contenedores)]
+    simulador = Simulador(contenedores, args.intercalar, random.Random(args.semilla))
+
+    for _ in range(args.operaciones):
+        simulador.operacion(simulador.azar.choice(contenedores))
+
+    hi = contenedores[0].handler_input()
+    documento = adaptador.get_attributes(hi.request_envelope)
+    perdidas = simulador.perdidas(documento)
+    conflictos = sum(c.manager.metricas["conflictos"] for c in contenedores)
+    reintentos = sum(c.manager.metricas["reintentos"] for c in contenedores)
+    print(f"Operaciones confirmadas: {len(simulador.confirmadas)}")
+    print(f"Conflictos detectados:   {conflictos} (reintentos: {reintentos})")
+    print(f"Actualizaciones perdidas: {len(perdidas)}")
+    consistente = documento["estadisticas"]["total_libros"] == len(documento["libros_disponibles"])
+    print(f"total_libros consistente: {'sí' if consistente else 'no'}")
+    return 1 if perdidas or not consistente else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Sobres (request envelopes) sintéticos de Alexa para benchmarks y pruebas de carga"""
+import json
+import uuid
+
+APPLICATION_ID = "amzn1.ask.skill.benchmark"
+
+
+def sobre(request, user_id, session_attributes=None, nuevo=False):
+    return {
+        "version": "1.0",
+        "session": {
+            "new": nuevo,
+            "sessionId": f"amzn1.echo-api.session.{user_id}",
+            "application": {"applicationId": APPLICATION_ID},
+            "attributes": session_attributes or {},
+            "user": {"userId": user_id},
+        },
+        "context": {
+            "System": {
+                "application": {"applicationId": APPLICATION_ID},
+                "user": {"userId": user_id},
+                "device": {"deviceId": "amzn1.ask.device.benchmark", "supportedInterfaces": {}},
+                "apiEndpoint": "https://api.amazonalexa.com",
+            }
+        },
+        "request": request,
+    }
+
+
+def _request(tipo, **extra):
+    request = {
+        "type": tipo,
+        "requestId": f"amzn1.echo-api.request.{uuid.uuid4()}",
+        "timestamp": "2025-09-28T23:05:41Z",
+        "locale": "es-MX",
+    }
+    request.update(extra)
+    return request
+
+
+def launch(user_id, session_attributes=None):
+    return sobre(_request("LaunchRequest"), user_id, session_attributes, nuevo=True)
+
+
+def intent(nombre, user_id, slots=None, session_attributes=None):
+    slots = {
+        slot: {"name": slot, "value": valor, "confirmationStatus": "NONE"}
+        for slot, valor in (slots or {}).items() if valor is not None
+    }
+    request = _request("IntentRequest", intent={"name": nombre, "confirmationStatus": "NONE", "slots": slots})
+    return sobre(request, user_id, session_attributes)
+
+
+def nombre_de(envelope):
+    """Nombre corto para reportes: el intent, o el tipo de request"""
+    request = envelope["request"]
+    return request.get("intent", {}).get("name") or request["type"]
+
+
+def leer_jsonl(ruta):
+    """Lee sobres de un archivo JSONL; cada línea puede ser el sobre completo o
+    {"sobre": {...}} con metadatos adicionales"""
+    with open(ruta, encoding="utf-8") as archivo:
+        for linea in archivo:
+            if linea.strip():
+                datos = json.loads(linea)
+                yield datos.get("sobre", datos)
@@ -0,0 +1,87 @@
+"""Verifica que los contadores mantenidos de estadisticas no se desvíen.
+
+Sin argumentos, siembra una biblioteca sintética en el almacén falso, corre
+operaciones al azar (agregar, prestar, devolver, eliminar) por lambda_handler
+y al final recuenta desde cero y compara con lo mantenido. Con documentos
+JSON (p. ej. descargados de S3) solo los recuenta y compara.
+
+Uso:
+    python herramientas/verificar_contadores.py [--libros 500] [--operaciones 300] [--semilla 7]
+    python herramientas/verificar_contadores.py usuario1.json [usuario2.json ...]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+HERRAMIENTAS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERRAMIENTAS_DIR, "..", "lambda"))
+sys.path.insert(0, HERRAMIENTAS_DIR)
+os.environ.setdefault("ENABLE_TRACING", "false")
+os.environ["USE_FAKE_S3"] = "true"
+
+USER_ID = "amzn1.ask.account.CONTADORES"
+
+
+def verificar_documentos(rutas):
+    from utility.contadores import verificar_contadores
+    con_deriva = 0
+    for ruta in rutas:
+        with open(ruta, encoding="utf-8") as archivo:
+            deriva = verificar_contadores(json.load(archivo), corregir=False)
+        print(f"{ruta}: {'deriva en ' + ', '.join(deriva) if deriva else 'sin deriva'}")
+        con_deriva += bool(deriva)
+    return 1 if con_deriva else 0
+
+
+def simular(libros, operaciones, semilla):
+    import sobres
+    from carga_biblioteca import generar_documento
+    from database.database import _FAKE_STORE
+    from lambda_function import lambda_handler
+    from utility.contadores import verificar_contadores
+
+    azar = random.Random(semilla)
+    _FAKE_STORE[USER_ID] = generar_documento(libros, semilla=semilla)
+    for n in range(operaciones):
+        documento = _FAKE_STORE[USER_ID]
+        tipo = azar.choice(["agregar", "prestar", "devolver", "eliminar"])
+        catalogo = documento["libros_disponibles"]
+        if tipo == "agregar" or not catalogo:
+            sobre = sobres.intent("AgregarLibroIntent", USER_ID,
+                                  {"titulo": f"Libro verificado {n}", "autor": f"Autor {azar.randrange(5)}",
+                                   "tipo": "ensayo"})
+        elif tipo == "devolver" and documento["prestamos_activos"]:
+            prestamo = azar.choice(documento["prestamos_activos"])
+            sobre = sobres.intent("DevolverLibroIntent", USER_ID, {"id_prestamo": prestamo["id"]})
+        elif tipo == "eliminar":
+            sobre = sobres.intent("EliminarLibroIntent", USER_ID, {"titulo": azar.choice(catalogo)["titulo"]})
+        else:
+            sobre = sobres.intent("PrestarLibroIntent", USER_ID,
+                                  {"titulo": azar.choice(catalogo)["titulo"], "nombre_persona": "Ana"})
+        lambda_handler(sobre, None)
+
+    documento = _FAKE_STORE[USER_ID]
+    contadores = documento["estadisticas"]["contadores"]
+    print(f"Operaciones: {operaciones}; libros: {len(documento['libros_disponibles'])}, "
+          f"disponibles: {contadores['disponibles']}, prestados: {contadores['prestados']}")
+    deriva = verificar_contadores(documento, corregir=False)
+    print(f"Deriva: {', '.join(deriva) if deriva else 'ninguna'}")
+    return 1 if deriva else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("documentos", nargs="*")
+    parser.add_argument("--libros", type=int, default=500)
+    parser.add_argument("--operaciones", type=int, default=300)
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args()
+    if args.documentos:
+        return verificar_documentos(args.documentos)
+    return simular(args.libros, args.operaciones, args.semilla)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,26 @@ import os
 # Feature flags & configuración
 # ==============================
 USE_FAKE_S3 = os.getenv("USE_FAKE_S3", "false").lower() == "true"
+USE_SHARDED_S3 = os.getenv("USE_SHARDED_S3", "false").lower() == "true"
+# json (legado) | json+zlib | msgpack+zlib | msgpack+zstd | cbor+zlib ...
+PERSISTENCE_CODEC = os.getenv("PERSISTENCE_CODEC", "json")
+LAZY_IMPORTS = os.getenv("LAZY_IMPORTS", "false").lower() == "true"
 ENABLE_DDB_CACHE = os.getenv("ENABLE_DDB_CACHE", "false").lower() == "true"
 CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "86400"))
-LIBROS_POR_PAGINA = 10
\ No newline at end of file
+LIBROS_POR_PAGINA = 10
+
+# Índice de búsqueda por usuario
+INDICE_MIN_LIBROS = int(os.getenv("INDICE_MIN_LIBROS", "50"))
+# Puntaje mínimo (0 a 1) para aceptar un título parecido al pedido por voz
+SIMILITUD_MINIMA = float(os.getenv("SIMILITUD_MINIMA", "0.72"))
+
+# Ventana de historial_conversaciones que se queda en el documento
+HISTORIAL_CONVERSACIONES_MAX = int(os.getenv("HISTORIAL_CONVERSACIONES_MAX", "20"))
+
+# Trazas por request como CloudWatch Embedded Metric Format. Apagadas por
+# defecto: cada request escribiría una línea EMF en el log y publicaría
+# métricas propias en CloudWatch, ambas con costo. Para medir, definir
+# ENABLE_TRACING=true en las variables de entorno de la Lambda; las métricas
+# quedan en el namespace METRICS_NAMESPACE
+ENABLE_TRACING = os.getenv("ENABLE_TRACING", "false").lower() == "true"
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "BibliotecaSkill")
@@ -0,0 +1,168 @@
+import hashlib
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# ==============================
+# Almacenes de objetos (bytes por clave)
+# ==============================
+class PrecondicionFallida(Exception):
+    """Una escritura condicional no se hizo: el objeto cambió (If-Match) o ya existía (If-None-Match)"""
+
+
+class AlmacenMemoria:
+    """Almacén de objetos en memoria, con la misma interfaz que AlmacenS3"""
+    def __init__(self):
+        self.objetos = {}
+        self.etags = {}
+
+    def leer(self, clave):
+        return self.objetos.get(clave)
+
+    def leer_con_etag(self, clave, si_no_coincide=None):
+        etag = self.etags.get(clave)
+        if clave not in self.objetos:
+            return None, None, True
+        if si_no_coincide is not None and si_no_coincide == etag:
+            return None, etag, False
+        return self.objetos[clave], etag, True
+
+    def escribir(self, clave, contenido, si_coincide=None, solo_si_no_existe=False):
+        if si_coincide is not None and self.etags.get(clave) != si_coincide:
+            raise PrecondicionFallida(clave)
+        if si_coincide is None and solo_si_no_existe and clave in self.objetos:
+            raise PrecondicionFallida(clave)
+        self.objetos[clave] = contenido
+        # Como S3 en PUT simples: el MD5 del contenido, entre comillas
+        etag = self.etags[clave] = f'"{hashlib.md5(contenido).hexdigest()}"'
+        return etag
+
+    def borrar(self, clave):
+        self.objetos.pop(clave, None)
+        self.etags.pop(clave, None)
+
+    def listar(self, prefijo=""):
+        return sorted(clave for clave in self.objetos if clave.startswith(prefijo))
+
+
+class AlmacenDirectorio:
+    """Almacén de objetos sobre un directorio local, con la misma interfaz que
+    AlmacenS3: cada clave es un archivo (los "/" de la clave son subdirectorios).
+    Sirve para probar herramientas sin bucket; las escrituras condicionales
+    solo son atómicas dentro de un mismo proceso"""
+    def __init__(self, raiz):
+        self.raiz = os.path.abspath(raiz)
+
+    def _ruta(self, clave):
+        return os.path.join(self.raiz, *clave.split("/"))
+
+    @staticmethod
+    def _etag(contenido):
+        return f'"{hashlib.md5(contenido).hexdigest()}"'
+
+    def leer(self, clave):
+        return self.leer_con_etag(clave)[0]
+
+    def leer_con_etag(self, clave, si_no_coincide=None):
+        try:
+            with open(self._ruta(clave), "rb") as archivo:
+                contenido = archivo.read()
+        except FileNotFoundError:
+            return None, None, True
+        etag = self._etag(contenido)
+        if si_no_coincide is not None and si_no_coincide == etag:
+            return None, etag, False
+        return contenido, etag, True
+
+    def escribir(self, clave, contenido, si_coincide=None, solo_si_no_existe=False):
+        ruta = self._ruta(clave)
+        if si_coincide is not None and self.leer_con_etag(clave)[1] != si_coincide:
+            raise PrecondicionFallida(clave)
+        if si_coincide is None and solo_si_no_existe and os.path.exists(ruta):
+            raise PrecondicionFallida(clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        # Se reemplaza de una vez: un lector nunca ve un objeto a medio escribir
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "wb") as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+        return self._etag(contenido)
+
+    def borrar(self, clave):
+        try:
+            os.remove(self._ruta(clave))
+        except FileNotFoundError:
+            pass
+
+    def listar(self, prefijo=""):
+        """Claves en orden lexicográfico, como list_objects_v2"""
+        claves = []
+        for directorio, _, archivos in os.walk(self.raiz):
+            relativo = os.path.relpath(directorio, self.raiz)
+            base = "" if relativo == "." else relativo.replace(os.sep, "/") + "/"
+            claves.extend(base + nombre for nombre in archivos if not nombre.endswith(".tmp"))
+        return sorted(clave for clave in claves if clave.startswith(prefijo))
+
+
+class AlmacenS3:
+    """Almacén de objetos sobre un bucket de S3"""
+    def __init__(self, bucket, s3_client=None):
+        self.bucket = bucket
+        self._cliente = s3_client
+
+    @property
+    def _s3(self):
+        # El cliente (y boto3) se crea en el primer uso, no al construir el almacén
+        if self._cliente is None:
+            from database.clientes_aws import cliente_s3
+            self._cliente = cliente_s3()
+        return self._cliente
+
+    def leer(self, clave):
+        return self.leer_con_etag(clave)[0]
+
+    def leer_con_etag(self, clave, si_no_coincide=None):
+        """Devuelve (contenido, etag, modificado). Con `si_no_coincide` hace un GET
+        condicional: si el ETag sigue igual S3 responde 304 sin cuerpo y se
+        devuelve (None, etag, False). Si el objeto no existe: (None, None, True)"""
+        from botocore.exceptions import ClientError
+        kwargs = {"IfNoneMatch": si_no_coincide} if si_no_coincide else {}
+        try:
+            resp = self._s3.get_object(Bucket=self.bucket, Key=clave, **kwargs)
+        except ClientError as e:
+            codigo = e.response.get("Error", {}).get("Code")
+            if codigo in ("304", "NotModified"):
+                return None, si_no_coincide, False
+            if codigo in ("NoSuchKey", "404"):
+                return None, None, True
+            raise
+        return resp["Body"].read(), resp.get("ETag"), True
+
+    def escribir(self, clave, contenido, si_coincide=None, solo_si_no_existe=False):
+        """Devuelve el ETag nuevo. `si_coincide` (If-Match) solo escribe si el objeto
+        sigue en ese ETag; `solo_si_no_existe` (If-None-Match: *) solo si no existe"""
+        from botocore.exceptions import ClientError
+        kwargs = {}
+        if si_coincide is not None:
+            kwargs["IfMatch"] = si_coincide
+        elif solo_si_no_existe:
+            kwargs["IfNoneMatch"] = "*"
+        try:
+            return self._s3.put_object(Bucket=self.bucket, Key=clave, Body=contenido, **kwargs).get("ETag")
+        except ClientError as e:
+            # 409: otra escritura condicional al mismo objeto ganó la carrera
+            if e.response.get("Error", {}).get("Code") in ("PreconditionFailed", "412",
+                                                            "ConditionalRequestConflict", "409"):
+                raise PrecondicionFallida(clave) from e
+            raise
+
+    def borrar(self, clave):
+        self._s3.delete_object(Bucket=self.bucket, Key=clave)
+
+    def listar(self, prefijo=""):
+        paginador = self._s3.get_paginator("list_objects_v2")
+        for pagina in paginador.paginate(Bucket=self.bucket, Prefix=prefijo):
+            for objeto in pagina.get("Contents", []):
+                yield objeto["Key"]
@@ -0,0 +1,100 @@
+import gzip
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# ==============================
+# Archivo frío de historial_conversaciones
+# ==============================
+class _ArchivoConversacionesImpl:
+    """Escribe fuera del camino crítico las conversaciones que salen de la
+    ventana del documento, como objetos JSONL comprimidos con gzip.
+
+    Durabilidad: mejor esfuerzo. Los lotes viven en memoria del contenedor
+    hasta escribirse; si el contenedor muere antes, se pierden (solo son
+    registros de inicio de sesión). Los lotes que fallan se reintentan en la
+    siguiente invocación hasta MAX_LOTES_PENDIENTES; después se descartan."""
+
+    PREFIJO = "archivo"
+    MAX_LOTES_PENDIENTES = 100
+    # Atributo de request con el lote propuesto, hasta confirmar el documento
+    ATRIBUTO_LOTE = "archivo_conversaciones"
+
+    def __init__(self):
+        self.almacen = None
+        self._pendientes = []
+        self._lock = threading.Lock()
+        self._hilo = None
+        self.metricas = {"lotes_escritos": 0, "entradas_archivadas": 0, "fallos": 0, "descartados": 0}
+
+    def configurar(self, almacen):
+        self.almacen = almacen
+
+    def clave(self, user_id, primero):
+        return f"{self.PREFIJO}/{user_id}/conversaciones-{primero:010d}.jsonl.gz"
+
+    def encolar(self, user_id, primero, entradas):
+        """`primero` es el número de conversación de entradas[0]; hace la clave idempotente"""
+        if not entradas:
+            return
+        with self._lock:
+            if len(self._pendientes) >= self.MAX_LOTES_PENDIENTES:
+                self.metricas["descartados"] += 1
+                logger.warning("Archivo de conversaciones lleno, se descarta un lote")
+                return
+            self._pendientes.append((user_id, primero, list(entradas)))
+
+    def proponer(self, handler_input, user_id, primero, entradas):
+        """Deja el lote que salió de la ventana en los atributos del request.
+        Se encola recién cuando el documento que ya no las tiene se confirmó
+        (ver confirmar); si el handler se reaplica tras un conflicto, su lote
+        reemplaza al del intento fallido, así que se llama aunque no haya
+        entradas"""
+        handler_input.attributes_manager.request_attributes[self.ATRIBUTO_LOTE] = (user_id, primero, list(entradas))
+
+    def confirmar(self, handler_input):
+        """Encola el lote propuesto en el request, una vez confirmada su unidad de trabajo"""
+        lote = handler_input.attributes_manager.request_attributes.pop(self.ATRIBUTO_LOTE, None)
+        if lote is not None:
+            self.encolar(*lote)
+
+    def vaciar(self):
+        """Escribe todos los lotes pendientes; los que fallan se quedan en cola"""
+        with self._lock:
+            lotes, self._pendientes = self._pendientes, []
+        fallidos = []
+        for user_id, primero, entradas in lotes:
+            if self.almacen is None:
+                self.metricas["descartados"] += 1
+                continue
+            try:
+                lineas = "".join(json.dumps(e, default=str) + "\n" for e in entradas)
+                self.almacen.escribir(self.clave(user_id, primero), gzip.compress(lineas.encode("utf-8")))
+                self.metricas["lotes_escritos"] += 1
+                self.metricas["entradas_archivadas"] += len(entradas)
+            except Exception as e:
+                self.metricas["fallos"] += 1
+                logger.warning(f"No se pudo archivar conversaciones de {user_id}: {e}")
+                fallidos.append((user_id, primero, entradas))
+        if fallidos:
+            with self._lock:
+                self._pendientes = fallidos + self._pendientes
+
+    def vaciar_en_segundo_plano(self):
+        """Lanza el vaciado en un hilo si hay lotes y no hay otro en curso"""
+        with self._lock:
+            if not self._pendientes or (self._hilo is not None and self._hilo.is_alive()):
+                return
+            self._hilo = threading.Thread(target=self.vaciar, name="archivo-conversaciones", daemon=True)
+            self._hilo.start()
+
+    def leer(self, user_id):
+        """Devuelve las conversaciones archivadas del usuario, de la más antigua a la más nueva"""
+        for clave in self.almacen.listar(f"{self.PREFIJO}/{user_id}/"):
+            for linea in gzip.decompress(self.almacen.leer(clave)).decode("utf-8").splitlines():
+                yield json.loads(linea)
+
+ArchivoConversaciones = _ArchivoConversacionesImpl()
@@ -0,0 +1,66 @@
+import os
+import threading
+
+# ==============================
+# Clientes de AWS compartidos por contenedor
+# ==============================
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "20"))
+AWS_CONNECT_TIMEOUT = float(os.getenv("AWS_CONNECT_TIMEOUT", "2"))
+AWS_READ_TIMEOUT = float(os.getenv("AWS_READ_TIMEOUT", "5"))
+# Un documento grande tarda más en subir o bajar que una consulta a DynamoDB
+S3_READ_TIMEOUT = float(os.getenv("S3_READ_TIMEOUT", "30"))
+DDB_REGION = os.getenv("DDB_REGION", "us-east-1")
+
+_CLIENTES = {}
+_LOCK = threading.Lock()
+
+
+def config_botocore(read_timeout=AWS_READ_TIMEOUT):
+    """Pool de conexiones y tiempos de espera comunes a todos los clientes"""
+    from botocore.config import Config
+    return Config(
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=read_timeout,
+        retries={"max_attempts": 3, "mode": "standard"},
+        tcp_keepalive=True,
+    )
+
+
+def _compartido(nombre, crear):
+    cliente = _CLIENTES.get(nombre)
+    if cliente is None:
+        with _LOCK:
+            cliente = _CLIENTES.get(nombre)
+            if cliente is None:
+                cliente = _CLIENTES[nombre] = crear()
+    return cliente
+
+
+def _sesion():
+    import boto3
+    # Las sesiones de boto3 no son seguras entre hilos al crear clientes; se
+    # crean bajo _LOCK y los clientes resultantes sí lo son
+    return _CLIENTES.get("sesion") or _CLIENTES.setdefault("sesion", boto3.session.Session())
+
+
+def cliente_s3():
+    """Cliente de S3 para AlmacenS3 y sus adapters, con el direccionamiento por omisión"""
+    return _compartido("s3", lambda: _sesion().client("s3", region_name=os.environ.get("S3_PERSISTENCE_REGION"),
+                                                       config=config_botocore(S3_READ_TIMEOUT)))
+
+
+def cliente_s3_prefirmado():
+    """Cliente de S3 para las URLs prefirmadas: path-style y s3v4, como las
+    generaba utils.create_presigned_url"""
+    from botocore.config import Config
+
+    def crear():
+        config = config_botocore().merge(Config(signature_version="s3v4", s3={"addressing_style": "path"}))
+        return _sesion().client("s3", region_name=os.environ.get("S3_PERSISTENCE_REGION"), config=config)
+    return _compartido("s3_prefirmado", crear)
+
+
+def recurso_dynamodb():
+    return _compartido("dynamodb", lambda: _sesion().resource("dynamodb", region_name=DDB_REGION,
+                                                               config=config_botocore()))
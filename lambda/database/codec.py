@@ -0,0 +1,206 @@
+import json
+import logging
+import time
+import zlib
+
+from ask_sdk_core.attributes_manager import AbstractPersistenceAdapter
+from ask_sdk_core.exceptions import PersistenceException
+
+from utility.trazas import Trazador
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# ==============================
+# Codecs de documentos persistidos
+# ==============================
+# Los documentos codificados empiezan con una cabecera de 6 bytes:
+#   b"BIB" + versión + id del serializador + id del compresor
+# Un documento sin cabecera es JSON legado (empieza con "{").
+CABECERA = b"BIB"
+VERSION = 1
+SERIALIZADORES = {"json": 1, "msgpack": 2, "cbor": 3}
+COMPRESORES = {"none": 0, "zlib": 1, "zstd": 2}
+
+
+def _serializador(nombre):
+    """(codificar, decodificar) para el serializador; msgpack y cbor son opcionales"""
+    if nombre == "json":
+        return (lambda doc: json.dumps(doc, separators=(",", ":"), default=str).encode("utf-8"),
+                json.loads)
+    if nombre == "msgpack":
+        import msgpack
+        return (lambda doc: msgpack.packb(doc, use_bin_type=True, default=str),
+                lambda datos: msgpack.unpackb(datos, raw=False))
+    if nombre == "cbor":
+        import cbor2
+        return (lambda doc: cbor2.dumps(doc, default=lambda encoder, valor: encoder.encode(str(valor))),
+                cbor2.loads)
+    raise ValueError(f"Serializador desconocido: {nombre}")
+
+
+def _compresor(nombre, nivel):
+    if nombre == "none":
+        return (lambda datos: datos), (lambda datos: datos)
+    if nombre == "zlib":
+        return (lambda datos: zlib.compress(datos, nivel)), zlib.decompress
+    if nombre == "zstd":
+        import zstandard
+        return (zstandard.ZstdCompressor(level=nivel).compress,
+                zstandard.ZstdDecompressor().decompress)
+    raise ValueError(f"Compresor desconocido: {nombre}")
+
+
+class Codec:
+    """Codifica documentos de usuario como `<serializador>+<compresor>`, p. ej.
+    "msgpack+zlib". "json" a secas escribe JSON legado sin cabecera.
+
+    decodificar() acepta cualquier formato conocido, no solo el propio: los
+    documentos JSON legados (o escritos con otro codec) se siguen leyendo y se
+    reescriben en el formato nuevo en la siguiente escritura."""
+
+    def __init__(self, nombre="json", nivel=6):
+        serializador, _, compresor = nombre.partition("+")
+        compresor = compresor or "none"
+        if serializador not in SERIALIZADORES or compresor not in COMPRESORES:
+            raise ValueError(f"Codec desconocido: {nombre}")
+        self.nombre = nombre
+        self.nivel = nivel
+        self.legado = nombre == "json"
+        self._serializar, _ = _serializador(serializador)
+        self._comprimir, _ = _compresor(compresor, nivel)
+        self._cabecera = CABECERA + bytes([VERSION, SERIALIZADORES[serializador], COMPRESORES[compresor]])
+        self.metricas = {"codificados": 0, "bytes_sin_comprimir": 0, "bytes_codificados": 0,
+                         "decodificados": 0, "decodificados_legado": 0, "decodificacion_ms": 0.0}
+
+    def codificar(self, documento):
+        with Trazador.tramo("codificar"):
+            if self.legado:
+                # Mismos bytes que escribe S3Adapter
+                serializado = contenido = json.dumps(documento).encode("utf-8")
+            else:
+                serializado = self._serializar(documento)
+                contenido = self._cabecera + self._comprimir(serializado)
+        self.metricas["codificados"] += 1
+        self.metricas["bytes_sin_comprimir"] += len(serializado)
+        self.metricas["bytes_codificados"] += len(contenido)
+        return contenido
+
+    def decodificar(self, contenido):
+        if isinstance(contenido, str):
+            contenido = contenido.encode("utf-8")
+        inicio = time.perf_counter()
+        with Trazador.tramo("decodificar"):
+            if not contenido.startswith(CABECERA):
+                documento = json.loads(contenido)
+                self.metricas["decodificados_legado"] += 1
+            else:
+                version, serializador, compresor = contenido[3:6]
+                if version != VERSION:
+                    raise ValueError(f"Versión de codec no soportada: {version}")
+                _, deserializar = _serializador(_nombre(SERIALIZADORES, serializador))
+                _, descomprimir = _compresor(_nombre(COMPRESORES, compresor), self.nivel)
+                documento = deserializar(descomprimir(contenido[6:]))
+        self.metricas["decodificados"] += 1
+        self.metricas["decodificacion_ms"] += (time.perf_counter() - inicio) * 1000
+        return documento
+
+    def obtener_metricas(self):
+        metricas = dict(self.metricas)
+        metricas["bytes_ahorrados_por_compresion"] = metricas["bytes_sin_comprimir"] - metricas["bytes_codificados"]
+        return metricas
+
+
+def _nombre(tabla, identificador):
+    for nombre, valor in tabla.items():
+        if valor == identificador:
+            return nombre
+    raise ValueError(f"Identificador de codec desconocido: {identificador}")
+
+
+_CODECS = {}
+
+def obtener_codec(nombre):
+    """Codec compartido por contenedor. Si la dependencia opcional del codec
+    pedido no está instalada, se usa json+zlib (solo biblioteca estándar)"""
+    codec = _CODECS.get(nombre)
+    if codec is None:
+        try:
+            codec = Codec(nombre)
+        except ImportError as e:
+            logger.warning(f"Codec {nombre} no disponible ({e}); se usa json+zlib")
+            codec = Codec("json+zlib")
+        _CODECS[nombre] = codec
+    return codec
+
+
+class CodecS3Adapter(AbstractPersistenceAdapter):
+    """Un objeto por usuario (clave = user_id, como S3Adapter) sobre un
+    almacén de objetos, codificado con `codec`. Con el codec "json" escribe
+    exactamente lo mismo que S3Adapter, y siempre lee ambos formatos, así que
+    se puede cambiar de codec (o volver a "json") sin migrar nada.
+
+    Recuerda el ETag de la última lectura o escritura de cada usuario hasta que
+    DatabaseManager lo toma (tomar_etag) para revalidar su cache con revalidar()."""
+
+    def __init__(self, almacen, codec=None, prefijo=""):
+        self.almacen = almacen
+        self.codec = codec or obtener_codec("json")
+        self.prefijo = prefijo
+        self._etags = {}
+
+    @staticmethod
+    def _user_id(request_envelope):
+        return request_envelope.context.system.user.user_id
+
+    def _clave(self, user_id):
+        return self.prefijo + user_id
+
+    def get_attributes(self, request_envelope):
+        user_id = self._user_id(request_envelope)
+        try:
+            contenido, etag, _ = self.almacen.leer_con_etag(self._clave(user_id))
+            if not contenido:
+                return {}
+            self._etags[user_id] = etag
+            return self.codec.decodificar(contenido)
+        except Exception as e:
+            raise PersistenceException(f"No se pudieron leer los atributos ({type(e).__name__}): {e}")
+
+    def save_attributes(self, request_envelope, attributes):
+        user_id = self._user_id(request_envelope)
+        try:
+            self._etags[user_id] = self.almacen.escribir(self._clave(user_id), self.codec.codificar(attributes))
+        except Exception as e:
+            raise PersistenceException(f"No se pudieron guardar los atributos ({type(e).__name__}): {e}")
+
+    def delete_attributes(self, request_envelope):
+        try:
+            self.almacen.borrar(self._clave(self._user_id(request_envelope)))
+        except Exception as e:
+            raise PersistenceException(f"No se pudieron borrar los atributos ({type(e).__name__}): {e}")
+
+    def guardar_condicional(self, user_id, documento, etag=None, nuevo=False):
+        """PUT con If-Match (etag) o If-None-Match: * (nuevo); devuelve el ETag nuevo
+        o lanza ConflictoDeEscritura si otro contenedor escribió primero"""
+        from database.almacen import PrecondicionFallida
+        from database.database import ConflictoDeEscritura
+        contenido = self.codec.codificar(documento)
+        try:
+            return self.almacen.escribir(self._clave(user_id), contenido, si_coincide=etag,
+                                         solo_si_no_existe=nuevo)
+        except PrecondicionFallida as e:
+            raise ConflictoDeEscritura(f"{user_id}: el documento cambió desde que se leyó") from e
+
+    def tomar_etag(self, user_id):
+        return self._etags.pop(user_id, None)
+
+    def revalidar(self, user_id, etag):
+        """GET condicional. Devuelve (modificado, documento, etag): (False, None, etag)
+        si no cambió; (True, None, None) si ya no existe"""
+        contenido, etag_nuevo, modificado = self.almacen.leer_con_etag(self._clave(user_id), si_no_coincide=etag)
+        if not modificado:
+            return False, None, etag
+        if not contenido:
+            return True, None, None
+        return True, self.codec.decodificar(contenido), etag_nuevo
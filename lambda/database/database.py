@@ -1,9 +1,15 @@
+import copy
+import hashlib
+import json
 import logging
 import os
-import boto3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from ask_sdk_s3.adapter import S3Adapter
-from ask_sdk_core.skill_builder import CustomSkillBuilder
+
+from utility.trazas import Trazador
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -11,15 +17,45 @@ logger.setLevel(logging.INFO)
 USE_FAKE_S3 = os.getenv("USE_FAKE_S3", "false").lower() == "true"
 ENABLE_DDB_CACHE = os.getenv("ENABLE_DDB_CACHE", "false").lower() == "true"
 CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "86400"))
+CACHE_MAX_ENTRADAS = int(os.getenv("CACHE_MAX_ENTRADAS", "500"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+DDB_RECHECK_SECONDS = int(os.getenv("DDB_RECHECK_SECONDS", "300"))
+# Cada cuánto se revalida con un GET condicional (ETag) una entrada del cache; < 0 lo desactiva
+CACHE_REVALIDATE_SECONDS = int(os.getenv("CACHE_REVALIDATE_SECONDS", "30"))
+# Stale-while-revalidate en intents de solo lectura: hasta cuántos segundos después
+# de vencer (o de tocarle revalidarse) se sirve una entrada mientras se refresca; 0 lo desactiva
+CACHE_STALE_SECONDS = int(os.getenv("CACHE_STALE_SECONDS", "300"))
+# "hilo": el refresco corre en segundo plano al terminar el request; "siguiente": al
+# empezar la siguiente invocación del contenedor, antes de cargar su documento
+CACHE_SWR_MODO = os.getenv("CACHE_SWR_MODO", "hilo")
+INTENTS_SOLO_LECTURA = frozenset(filter(None, os.getenv(
+    "INTENTS_SOLO_LECTURA", "ConsultarPrestamosIntent,ConsultarDevueltosIntent,BuscarLibroIntent").split(",")))
+# Escritura diferida (write-behind), opcional: en estos requests (nombre del intent o
+# tipo de request, p. ej. LaunchRequest) el documento se encola y se escribe después de
+# responder. Vacío (por omisión) la desactiva; ver "Escrituras diferidas" más abajo
+ESCRITURA_DIFERIDA_REQUESTS = frozenset(filter(None, os.getenv("ESCRITURA_DIFERIDA_REQUESTS", "").split(",")))
+# "hilo": se escribe en segundo plano al terminar el request; "siguiente": al empezar la
+# siguiente invocación (las del mismo usuario se siguen acumulando mientras sean diferibles)
+ESCRITURA_DIFERIDA_MODO = os.getenv("ESCRITURA_DIFERIDA_MODO", "hilo")
+# Con tantos usuarios pendientes, la escritura se hace en el momento
+ESCRITURA_DIFERIDA_MAX_PENDIENTES = int(os.getenv("ESCRITURA_DIFERIDA_MAX_PENDIENTES", "50"))
+# En modo "siguiente", lo más que puede esperar un documento encolado
+ESCRITURA_DIFERIDA_MAX_SEGUNDOS = int(os.getenv("ESCRITURA_DIFERIDA_MAX_SEGUNDOS", "60"))
 LIBROS_POR_PAGINA = 10
 
 # ==============================
 # Adaptador de "Fake S3" (memoria)
 # ==============================
 _FAKE_STORE = {}
+# Versión por usuario; hace las veces de ETag de S3
+_FAKE_VERSIONES = {}
 
 class FakeS3Adapter:
-    def __init__(self):
+    """Persistencia en memoria. Con un codec no legado guarda bytes codificados
+    en _FAKE_STORE, igual que en S3; sin codec guarda el dict tal cual"""
+    def __init__(self, codec=None):
+        self.codec = codec
+        self._etags = {}
         logger.info("🧪 Usando FakeS3Adapter (memoria)")
 
     @staticmethod
@@ -28,23 +64,204 @@ class FakeS3Adapter:
 
     def get_attributes(self, request_envelope):
         uid = self._user_id_from_envelope(request_envelope)
-        return _FAKE_STORE.get(uid, {})
+        if uid in _FAKE_STORE:
+            self._etags[uid] = self._etag(uid)
+        return self._decodificar(_FAKE_STORE.get(uid, {}))
+
+    def leer(self, uid):
+        """Documento guardado de `uid` ({} si no hay), sin pasar por un request"""
+        return self._decodificar(_FAKE_STORE.get(uid, {}))
+
+    def _decodificar(self, valor):
+        if isinstance(valor, bytes):
+            from database.codec import obtener_codec
+            return (self.codec or obtener_codec("json")).decodificar(valor)
+        return valor
+
+    @staticmethod
+    def _etag(uid):
+        return f"v{_FAKE_VERSIONES.get(uid, 0)}"
 
     def save_attributes(self, request_envelope, attributes):
-        uid = self._user_id_from_envelope(request_envelope)
-        _FAKE_STORE[uid] = attributes or {}
+        self._guardar(self._user_id_from_envelope(request_envelope), attributes)
+
+    def guardar_condicional(self, uid, attributes, etag=None, nuevo=False):
+        """Como un PUT de S3 con If-Match (etag) o If-None-Match: * (nuevo);
+        devuelve el ETag nuevo o lanza ConflictoDeEscritura"""
+        if etag is not None and self._etag(uid) != etag:
+            raise ConflictoDeEscritura(f"{uid}: se esperaba {etag} y hay {self._etag(uid)}")
+        if etag is None and nuevo and uid in _FAKE_STORE:
+            raise ConflictoDeEscritura(f"{uid}: el documento ya existe")
+        self._guardar(uid, attributes)
+        return self._etags.pop(uid)
+
+    def _guardar(self, uid, attributes):
+        if self.codec is not None and not self.codec.legado:
+            _FAKE_STORE[uid] = self.codec.codificar(attributes or {})
+        else:
+            _FAKE_STORE[uid] = attributes or {}
+        _FAKE_VERSIONES[uid] = _FAKE_VERSIONES.get(uid, 0) + 1
+        self._etags[uid] = self._etag(uid)
         logger.info(f"FakeS3Adapter: guardados atributos para {uid}")
 
     def delete_attributes(self, request_envelope):
         uid = self._user_id_from_envelope(request_envelope)
         if uid in _FAKE_STORE:
             del _FAKE_STORE[uid]
+            _FAKE_VERSIONES[uid] = _FAKE_VERSIONES.get(uid, 0) + 1
             logger.info(f"FakeS3Adapter: atributos borrados para {uid}")
 
+    def tomar_etag(self, uid):
+        return self._etags.pop(uid, None)
+
+    def revalidar(self, uid, etag):
+        """Misma semántica que CodecS3Adapter.revalidar"""
+        if uid not in _FAKE_STORE:
+            return True, None, None
+        actual = self._etag(uid)
+        if actual == etag:
+            return False, None, etag
+        return True, self._decodificar(_FAKE_STORE[uid]), actual
+
 # ==============================
 # Cache en memoria con TTL
 # ==============================
-_CACHE = {}
+class _CacheLRU(OrderedDict):
+    """Cache acotado por número de entradas y por bytes aproximados (tamaño del
+    documento serializado más el de sus estructuras derivadas), con desalojo
+    LRU. Las entradas vencidas se barren cada `barrido_cada` operaciones, aunque
+    nadie vuelva a pedirlas. El lock permite que el refresco en segundo plano
+    escriba mientras el request lee."""
+
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS, max_bytes=CACHE_MAX_BYTES,
+                 barrido_cada=64, now_fn=datetime.now):
+        super().__init__()
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.barrido_cada = barrido_cada
+        self.now_fn = now_fn
+        self.bytes = 0
+        self.desalojos = 0
+        self._operaciones = 0
+        self._lock = threading.RLock()
+        # id(lista) -> user_id de la entrada que tiene estructuras derivadas de esa lista
+        self._listas = {}
+
+    def get(self, user_id, default=None):
+        with self._lock:
+            self._contar_operacion()
+            if user_id not in self:
+                return default
+            self.move_to_end(user_id)
+            return super().__getitem__(user_id)
+
+    def __setitem__(self, user_id, item):
+        with self._lock:
+            self._contar_operacion()
+            if user_id in self:
+                anterior = super().__getitem__(user_id)
+                if anterior.get("derivados") and anterior["data"] is item["data"]:
+                    # Se volvió a cachear el mismo documento (p. ej. tras escribirlo): sus índices siguen valiendo
+                    item["derivados"] = anterior["derivados"]
+                    item["tamano_derivados"] = anterior["tamano_derivados"]
+                    anterior = dict(anterior, derivados=None)
+                self._quitar(user_id, anterior)
+            super().__setitem__(user_id, item)
+            self.move_to_end(user_id)
+            self.bytes += _peso(item)
+            self._desalojar()
+
+    def __delitem__(self, user_id):
+        with self._lock:
+            self._quitar(user_id, super().__getitem__(user_id))
+            super().__delitem__(user_id)
+
+    def _quitar(self, user_id, item):
+        self.bytes -= _peso(item)
+        for _, _, id_lista in (item.get("derivados") or {}).values():
+            if self._listas.get(id_lista) == user_id:
+                del self._listas[id_lista]
+
+    def _desalojar(self):
+        # Nunca se desaloja la entrada recién puesta
+        while len(self) > 1 and (len(self) > self.max_entradas or self.bytes > self.max_bytes):
+            user_id, desalojado = super().popitem(last=False)
+            self._quitar(user_id, desalojado)
+            self.desalojos += 1
+
+    # Estructuras derivadas (índices) de las listas de un documento cacheado
+    def derivado(self, lista, nombre):
+        """La estructura `nombre` adjunta a `lista`, o None"""
+        with self._lock:
+            item = super().get(self._listas.get(id(lista)))
+            derivado = (item.get("derivados") or {}).get(nombre) if item else None
+            return derivado[0] if derivado and derivado[2] == id(lista) else None
+
+    def adjuntar(self, lista, nombre, estructura, tamano):
+        """Adjunta `estructura` a la entrada cuyo documento contiene `lista`: se
+        desaloja con ella y `tamano` cuenta en max_bytes. Devuelve False si la
+        lista no es de ningún documento en cache"""
+        with self._lock:
+            user_id = self._listas.get(id(lista))
+            if user_id not in self or not _contiene(super().__getitem__(user_id)["data"], lista):
+                user_id = next((uid for uid, item in super().items() if _contiene(item["data"], lista)), None)
+                if user_id is None:
+                    return False
+            item = super().__getitem__(user_id)
+            derivados = item.get("derivados") or {}
+            anterior = derivados.get(nombre)
+            if anterior and self._listas.get(anterior[2]) == user_id and anterior[2] != id(lista):
+                del self._listas[anterior[2]]
+            derivados[nombre] = (estructura, tamano, id(lista))
+            item["derivados"] = derivados
+            cambio = tamano - (anterior[1] if anterior else 0)
+            item["tamano_derivados"] = item.get("tamano_derivados", 0) + cambio
+            self.bytes += cambio
+            self._listas[id(lista)] = user_id
+            self.move_to_end(user_id)
+            self._desalojar()
+            return True
+
+    def pop(self, user_id, *default):
+        with self._lock:
+            if user_id in self:
+                item = super().__getitem__(user_id)
+                del self[user_id]
+                return item
+        if default:
+            return default[0]
+        raise KeyError(user_id)
+
+    def _contar_operacion(self):
+        self._operaciones += 1
+        if self._operaciones % self.barrido_cada == 0:
+            self.barrer()
+
+    def barrer(self):
+        """Quita las entradas vencidas (también las que aún podrían servirse obsoletas)"""
+        with self._lock:
+            ahora = self.now_fn().timestamp()
+            vencidas = [uid for uid, item in super().items() if ahora > item["expire_at"]]
+            for uid in vencidas:
+                del self[uid]
+        return len(vencidas)
+
+def _peso(item):
+    return item.get("tamano", 0) + item.get("tamano_derivados", 0)
+
+
+def _escribe_por_usuario(adaptador):
+    """Si el adaptador puede escribir sin el request (lo necesitan las escrituras diferidas)"""
+    return (getattr(adaptador, "guardar_condicional", None) is not None or
+            getattr(adaptador, "guardar_documento", None) is not None)
+
+
+def _contiene(data, lista):
+    # dict.values: en un documento fragmentado no dispara lecturas
+    return isinstance(data, dict) and any(valor is lista for valor in dict.values(data))
+
+
+_CACHE = _CacheLRU()
 
 def _cache_get(user_id, cache=_CACHE, now_fn=datetime.now):
     item = cache.get(user_id)
@@ -55,26 +272,139 @@ def _cache_get(user_id, cache=_CACHE, now_fn=datetime.now):
         return None
     return item["data"]
 
-def _cache_put(user_id, data, cache=_CACHE, ttl_seconds=CACHE_TTL_SECONDS, now_fn=datetime.now):
+def _cache_put(user_id, data, cache=_CACHE, ttl_seconds=CACHE_TTL_SECONDS, now_fn=datetime.now,
+               huella=None, tamano=0, etag=None, revalidar_seconds=CACHE_REVALIDATE_SECONDS):
+    ahora = now_fn()
     cache[user_id] = {
         "data": data,
-        "expire_at": (now_fn() + timedelta(seconds=ttl_seconds)).timestamp()
+        "expire_at": (ahora + timedelta(seconds=ttl_seconds)).timestamp(),
+        "huella": huella,
+        "tamano": tamano,
+        "etag": etag,
+        "revalidar_en": (ahora + timedelta(seconds=max(revalidar_seconds, 0))).timestamp(),
+        # Último momento en que se supo que coincidía con la persistencia
+        "validado_en": ahora.timestamp()
     }
 
+def _huella(data):
+    """Huella del contenido del documento; igual huella => mismo contenido persistido.
+    Devuelve (huella, tamaño aproximado en bytes)"""
+    if hasattr(data, "contenido_cargado"):
+        # Documento fragmentado: lo que no se ha cargado no pudo cambiar
+        data = data.contenido_cargado()
+    with Trazador.tramo("json"):
+        serializado = json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(serializado, digest_size=16).hexdigest(), len(serializado)
+
+
+class ConflictoDeEscritura(Exception):
+    """El documento del usuario cambió en la persistencia desde que se cargó"""
+
+
+# ==============================
+# Unidad de trabajo por request
+# ==============================
+class _UnidadDeTrabajo:
+    """Carga el documento del usuario a lo más una vez (en el primer acceso) y
+    lo escribe a lo más una vez, al confirmar"""
+
+    def __init__(self, manager, handler_input):
+        self._manager = manager
+        self._handler_input = handler_input
+        self._datos = None
+        self.etag = None
+        self.nuevo = False
+        self.pendiente = False
+        self.cerrada = False
+
+    @property
+    def datos(self):
+        if self._datos is None:
+            self._datos, es_nuevo = self._manager._cargar_user_data(self._handler_input)
+            # Un documento recién creado todavía no existe en la persistencia
+            self.nuevo = es_nuevo
+            # La versión que se leyó, aunque el cache se refresque mientras tanto
+            self.etag = self._manager._etag_cacheado(self._handler_input, self._datos)
+            self.pendiente = self.pendiente or es_nuevo
+        return self._datos
+
+    def marcar_pendiente(self, data):
+        self._datos = data
+        self.pendiente = True
+
+    def olvidar(self):
+        """Descarta el documento cargado si no tiene cambios, para releerlo"""
+        if not self.pendiente:
+            self._datos = None
+
+    def confirmar(self):
+        """Escribe los cambios; la unidad queda cerrada solo si la escritura se hizo"""
+        if self.cerrada:
+            return
+        if self.pendiente and self._datos is not None:
+            try:
+                self._manager._guardar_user_data(self._handler_input, self._datos, nuevo=self.nuevo,
+                                                 etag=self.etag)
+            except Exception:
+                # El cache tiene el documento modificado, que no llegó a la persistencia
+                self._manager.clear_cache_by_user_id(self._manager._user_id(self._handler_input))
+                raise
+        self.cerrada = True
+
 
 class _DatabaseManagerImpl:
     DDB_TABLE = "BibliotecaSkillCache"
+    UNIDAD_ATTR = "_unidad_de_trabajo"
+    MAX_INTENTOS_DIFERIDA = 3
 
-    def __init__(self, enable_ddb_cache=ENABLE_DDB_CACHE, cache_ttl_seconds=CACHE_TTL_SECONDS):
+    def __init__(self, enable_ddb_cache=ENABLE_DDB_CACHE, cache_ttl_seconds=CACHE_TTL_SECONDS,
+                 ddb_recheck_seconds=DDB_RECHECK_SECONDS, cache_revalidate_seconds=CACHE_REVALIDATE_SECONDS,
+                 cache_stale_seconds=CACHE_STALE_SECONDS, cache_swr_modo=CACHE_SWR_MODO,
+                 intents_solo_lectura=INTENTS_SOLO_LECTURA, escritura_diferida=ESCRITURA_DIFERIDA_REQUESTS,
+                 escritura_diferida_modo=ESCRITURA_DIFERIDA_MODO, cache=None, adaptador=None):
         self.enable_ddb_cache = enable_ddb_cache
         self.cache_ttl_seconds = cache_ttl_seconds
-        self._cache = _CACHE
+        self.ddb_recheck_seconds = ddb_recheck_seconds
+        self.cache_revalidate_seconds = cache_revalidate_seconds
+        self.cache_stale_seconds = cache_stale_seconds
+        self.cache_swr_modo = cache_swr_modo
+        self.intents_solo_lectura = intents_solo_lectura
+        self.escritura_diferida = escritura_diferida
+        self.escritura_diferida_modo = escritura_diferida_modo
+        # Un cache propio permite simular varios contenedores en un proceso
+        self.adaptador = adaptador
+        self._cache = _CACHE if cache is None else cache
+        self.metricas = {"escrituras": 0, "escrituras_omitidas": 0, "conflictos": 0, "reintentos": 0,
+                         "revalidaciones_sin_cambios": 0, "revalidaciones_con_cambios": 0,
+                         "revalidaciones_fallidas": 0, "swr_servidos": 0, "swr_antiguedad_max_s": 0.0,
+                         "swr_antiguedad_total_s": 0.0, "swr_refrescos": 0, "swr_refrescos_fallidos": 0,
+                         "diferidas_encoladas": 0, "diferidas_acumuladas": 0, "diferidas_escritas": 0,
+                         "diferidas_absorbidas": 0, "diferidas_cola_llena": 0, "diferidas_fallos": 0,
+                         "diferidas_perdidas_conflicto": 0, "diferidas_perdidas_fallos": 0,
+                         "diferidas_demora_max_s": 0.0}
+
+        # Refrescos pendientes de stale-while-revalidate: user_id -> (adaptador, envelope, etag)
+        self._refrescos = {}
+        self._lock_refrescos = threading.Lock()
+        self._hilo_refresco = None
+
+        # Escrituras diferidas: user_id -> entrada (ver _encolar)
+        self._diferidas = {}
+        self._lock_diferidas = threading.Lock()
+        # Un solo vaciado a la vez: el del inicio de un request espera al del hilo
+        self._lock_vaciado = threading.Lock()
+        self._hilo_diferidas = None
+
+        # Handle de la tabla y su estado, reutilizados por todo el contenedor
+        self._ddb_table = None
+        self._ddb_sana = None
+        self._ddb_revisar_en = 0
 
         self._dynamodb = None
         if self.enable_ddb_cache:
             try:
-                import boto3
-                self._dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+                from database.clientes_aws import recurso_dynamodb
+                self._dynamodb = recurso_dynamodb()
             except Exception as e:
                 logger.warning(f"No se pudo inicializar DynamoDB resource: {e}")
                 self._dynamodb = None
@@ -85,82 +415,471 @@ class _DatabaseManagerImpl:
     def _get_ddb_table(self):
         if not self.enable_ddb_cache or not self._dynamodb:
             return None
+        ahora = time.monotonic()
+        if ahora < self._ddb_revisar_en:
+            return self._ddb_table if self._ddb_sana else None
         try:
+            # DescribeTable solo una vez por intervalo, no en cada get/put
             table = self._dynamodb.Table(self.DDB_TABLE)
             table.load()
-            return table
+            if self._ddb_sana is False:
+                logger.info("DDB disponible de nuevo")
+            self._ddb_table, self._ddb_sana = table, True
         except Exception as e:
-            logger.warning(f"DDB deshabilitado o sin permisos: {e}")
-            return None
+            self._marcar_ddb_caida(e)
+        self._ddb_revisar_en = ahora + self.ddb_recheck_seconds
+        return self._ddb_table if self._ddb_sana else None
+
+    def _marcar_ddb_caida(self, error):
+        # Solo se avisa en la transición, no en cada request
+        if self._ddb_sana is not False:
+            logger.warning(f"DDB deshabilitado o sin permisos: {error}")
+        self._ddb_sana = False
+        self._ddb_revisar_en = time.monotonic() + self.ddb_recheck_seconds
+
+    def _unidad_activa(self, handler_input):
+        unidad = handler_input.attributes_manager.request_attributes.get(self.UNIDAD_ATTR)
+        if unidad is not None and not unidad.cerrada:
+            return unidad
+        return None
 
     def get_user_data(self, handler_input):
+        unidad = self._unidad_activa(handler_input)
+        if unidad is not None:
+            return unidad.datos
+
+        data, es_nuevo = self._cargar_user_data(handler_input)
+        if es_nuevo:
+            self._guardar_user_data(handler_input, data, forzar=True, nuevo=True)
+        return data
+
+    def save_user_data(self, handler_input, data):
+        unidad = self._unidad_activa(handler_input)
+        if unidad is not None:
+            # Se escribe una sola vez al confirmar la unidad
+            unidad.marcar_pendiente(data)
+            return
+
+        self._guardar_user_data(handler_input, data)
+
+    def _cargar_user_data(self, handler_input):
+        """Devuelve (datos, es_nuevo); es_nuevo indica que aún no están persistidos"""
         user_id = self._user_id(handler_input)
 
         # 1) Cache en memoria
-        data = _cache_get(user_id)
+        inicio = time.perf_counter()
+        obsoleto = self._servir_obsoleto(handler_input, user_id)
+        data = obsoleto if obsoleto is not None else _cache_get(user_id, cache=self._cache)
+        Trazador.sumar("memoria_hit" if data is not None else "memoria_miss", (time.perf_counter() - inicio) * 1000)
+        if data is not None and obsoleto is None:
+            data = self._revalidar(handler_input, user_id, data)
         if data is not None:
             logger.info("⚡ Cache hit (memoria)")
-            return data
+            return data, False
 
         # 2) Cache en DDB (opcional)
         if self.enable_ddb_cache:
             try:
                 table = self._get_ddb_table()
                 if table:
+                    inicio = time.perf_counter()
                     resp = table.get_item(Key={"user_id": user_id})
+                    Trazador.sumar("ddb_hit" if "Item" in resp else "ddb_miss", (time.perf_counter() - inicio) * 1000)
                     if "Item" in resp:
                         data = resp["Item"].get("data", {})
                         logger.info("⚡ Cache hit (DynamoDB)")
-                        _cache_put(user_id, data, cache=self._cache, ttl_seconds=self.cache_ttl_seconds)
-                        return data
+                        huella, tamano = _huella(data)
+                        _cache_put(user_id, data, cache=self._cache, ttl_seconds=self.cache_ttl_seconds,
+                                   huella=huella, tamano=tamano)
+                        return data, False
             except Exception as e:
                 logger.warning(f"DDB get_item error: {e}")
+                self._marcar_ddb_caida(e)
 
-        # 3) Persistencia principal
-        attr_mgr = handler_input.attributes_manager
-        persistent = attr_mgr.persistent_attributes
+        # 3) Persistencia principal: siempre una lectura nueva (p. ej. al reintentar
+        # tras un conflicto), no lo que el AttributesManager leyó antes en el request
+        with Trazador.tramo("s3_lectura"):
+            persistent = self._adaptador(handler_input).get_attributes(handler_input.request_envelope)
         if not persistent:
-            persistent = self.initial_data()
-            attr_mgr.persistent_attributes = persistent
-            attr_mgr.save_persistent_attributes()
+            # Se persiste quien lo pidió: al momento o al confirmar la unidad de trabajo
+            return self.initial_data(), True
 
         # 4) Actualizar caches
-        _cache_put(user_id, persistent, cache=self._cache, ttl_seconds=self.cache_ttl_seconds)
+        huella, tamano = _huella(persistent)
+        self._cache_put(user_id, persistent, huella, tamano, self._tomar_etag(handler_input, user_id))
         if self.enable_ddb_cache:
             try:
                 table = self._get_ddb_table()
                 if table:
-                    table.put_item(Item={
-                        "user_id": user_id,
-                        "data": persistent,
-                        "ttl": int((datetime.now() + timedelta(seconds=self.cache_ttl_seconds)).timestamp())
-                    })
+                    with Trazador.tramo("ddb_escritura"):
+                        table.put_item(Item={
+                            "user_id": user_id,
+                            "data": persistent,
+                            "ttl": int((datetime.now() + timedelta(seconds=self.cache_ttl_seconds)).timestamp())
+                        })
             except Exception as e:
                 logger.warning(f"DDB put_item error: {e}")
+                self._marcar_ddb_caida(e)
 
-        return persistent
+        return persistent, False
 
-    def save_user_data(self, handler_input, data):
+    def configurar(self, adaptador):
+        """Adaptador de persistencia del contenedor (el mismo que recibe el SkillBuilder)"""
+        self.adaptador = adaptador
+
+    def _adaptador(self, handler_input):
+        if self.adaptador is None:
+            raise RuntimeError("DatabaseManager sin adaptador de persistencia: falta configurar()")
+        return self.adaptador
+
+    def _tomar_etag(self, handler_input, user_id):
+        """ETag de lo que el adaptador acaba de leer, si sabe darlo"""
+        tomar_etag = getattr(self._adaptador(handler_input), "tomar_etag", None)
+        return tomar_etag(user_id) if tomar_etag else None
+
+    def _etag_cacheado(self, handler_input, data):
+        """ETag de la versión de `data` que está en el cache, si es esa la cacheada"""
+        item = self._cache.get(self._user_id(handler_input))
+        return item.get("etag") if item and item.get("data") is data else None
+
+    def _cache_put(self, user_id, data, huella, tamano, etag):
+        """Cachea lo que se acaba de leer o escribir en la persistencia, con su ETag"""
+        _cache_put(user_id, data, cache=self._cache, ttl_seconds=self.cache_ttl_seconds,
+                   huella=huella, tamano=tamano, etag=etag, revalidar_seconds=self.cache_revalidate_seconds)
+
+    def _revalidar(self, handler_input, user_id, data):
+        """Si toca, confirma con un GET condicional que la entrada del cache sigue
+        vigente: sin cambios (304) la renueva sin transferir el cuerpo; si otro
+        contenedor escribió, la reemplaza. Devuelve None si el documento ya no existe"""
+        item = self._cache.get(user_id)
+        if self.cache_revalidate_seconds < 0 or not item or not item.get("etag"):
+            return data
+        ahora = datetime.now()
+        if ahora.timestamp() < item.get("revalidar_en", 0):
+            return data
+        revalidar = getattr(self._adaptador(handler_input), "revalidar", None)
+        if revalidar is None:
+            return data
+
+        try:
+            with Trazador.tramo("s3_revalidacion"):
+                modificado, documento, etag = revalidar(user_id, item["etag"])
+        except Exception as e:
+            # Mejor servir lo cacheado que fallar el request
+            self.metricas["revalidaciones_fallidas"] += 1
+            logger.warning(f"No se pudo revalidar el cache de {user_id}: {e}")
+            return data
+
+        if not modificado:
+            self.metricas["revalidaciones_sin_cambios"] += 1
+            self._renovar(item)
+            return data
+
+        self.metricas["revalidaciones_con_cambios"] += 1
+        logger.info("🔄 El documento cambió en la persistencia; se actualiza el cache")
+        if documento is None:
+            self.clear_cache_by_user_id(user_id)
+            return None
+        huella, tamano = _huella(documento)
+        self._cache_put(user_id, documento, huella, tamano, etag)
+        return documento
+
+    def _renovar(self, item):
+        """La persistencia confirmó que la entrada sigue vigente"""
+        ahora = datetime.now()
+        item["revalidar_en"] = (ahora + timedelta(seconds=max(self.cache_revalidate_seconds, 0))).timestamp()
+        item["expire_at"] = (ahora + timedelta(seconds=self.cache_ttl_seconds)).timestamp()
+        item["validado_en"] = ahora.timestamp()
+
+    # Stale-while-revalidate
+    def _solo_lectura(self, handler_input):
+        intent = getattr(handler_input.request_envelope.request, "intent", None)
+        return intent is not None and intent.name in self.intents_solo_lectura
+
+    def _servir_obsoleto(self, handler_input, user_id):
+        """En intents de solo lectura, una entrada vencida o con la revalidación
+        pendiente se sirve al momento (si no lleva más de cache_stale_seconds así)
+        y se agenda su refresco. Devuelve None si no aplica"""
+        if self.cache_stale_seconds <= 0 or not self._solo_lectura(handler_input):
+            return None
+        item = self._cache.get(user_id)
+        if not item:
+            return None
+        ahora = datetime.now().timestamp()
+        vence = item["expire_at"]
+        if item.get("etag") and self.cache_revalidate_seconds >= 0:
+            vence = min(vence, item.get("revalidar_en", vence))
+        if ahora < vence or ahora - vence > self.cache_stale_seconds:
+            return None
+
+        antiguedad = ahora - item.get("validado_en", ahora)
+        self.metricas["swr_servidos"] += 1
+        self.metricas["swr_antiguedad_total_s"] += antiguedad
+        self.metricas["swr_antiguedad_max_s"] = max(self.metricas["swr_antiguedad_max_s"], antiguedad)
+        Trazador.sumar("swr_antiguedad", antiguedad * 1000)
+        with self._lock_refrescos:
+            self._refrescos[user_id] = (self._adaptador(handler_input), handler_input.request_envelope,
+                                        item.get("etag"))
+        logger.info(f"⏳ Cache obsoleto servido ({antiguedad:.0f} s); se refresca después")
+        return item["data"]
+
+    def refrescar_pendientes(self, al_iniciar=False):
+        """Refresca las entradas que se sirvieron obsoletas: al terminar el request
+        en un hilo (modo "hilo") o al empezar el siguiente (modo "siguiente"), para
+        no demorar la respuesta que las sirvió"""
+        with self._lock_refrescos:
+            if not self._refrescos or al_iniciar != (self.cache_swr_modo == "siguiente"):
+                return
+            if self.cache_swr_modo == "hilo":
+                # Si ya hay un hilo refrescando, él toma también los nuevos
+                if self._hilo_refresco is None or not self._hilo_refresco.is_alive():
+                    self._hilo_refresco = threading.Thread(target=self._refrescar_todos,
+                                                           name="refresco-cache", daemon=True)
+                    self._hilo_refresco.start()
+                return
+        self._refrescar_todos()
+
+    def _refrescar_todos(self):
+        while True:
+            with self._lock_refrescos:
+                if not self._refrescos:
+                    return
+                user_id, (adaptador, envelope, etag) = self._refrescos.popitem()
+            try:
+                self._refrescar(user_id, adaptador, envelope, etag)
+                self.metricas["swr_refrescos"] += 1
+            except Exception as e:
+                self.metricas["swr_refrescos_fallidos"] += 1
+                logger.warning(f"No se pudo refrescar el cache de {user_id}: {e}")
+
+    def _refrescar(self, user_id, adaptador, envelope, etag):
+        """Relee el documento servido obsoleto. El resultado solo se instala si la
+        entrada sigue siendo la que se encoló (mismo ETag): si el request escribió
+        o alguien la invalidó mientras tanto, la del cache es más nueva"""
+        encolado = etag
+        revalidar = getattr(adaptador, "revalidar", None)
+        if revalidar is not None and etag:
+            modificado, documento, etag = revalidar(user_id, etag)
+        else:
+            modificado = True
+            documento = adaptador.get_attributes(envelope)
+            tomar_etag = getattr(adaptador, "tomar_etag", None)
+            etag = tomar_etag(user_id) if tomar_etag else None
+        if modificado and documento:
+            huella, tamano = _huella(documento)
+        with self._cache._lock:
+            item = self._cache.get(user_id)
+            if item is None or item.get("etag") != encolado:
+                return
+            if not modificado:
+                self._renovar(item)
+            elif not documento:
+                self.clear_cache_by_user_id(user_id)
+            else:
+                self._cache_put(user_id, documento, huella, tamano, etag)
+
+    def _guardar_user_data(self, handler_input, data, forzar=False, nuevo=False, etag=None):
+        """Escribe el documento. Si el adaptador soporta escrituras condicionales,
+        solo escribe si nadie más lo hizo desde que se leyó (If-Match con el ETag
+        cacheado) o, si es `nuevo`, si todavía no existe; si no, ConflictoDeEscritura.
+        Sin ETag conocido (p. ej. leído del cache de DDB) la escritura es incondicional.
+        `etag` es el de la versión leída; por omisión, el del cache si `data` es lo cacheado"""
         user_id = self._user_id(handler_input)
 
+        # Si el contenido no cambió desde que se cargó/guardó, no hay nada que escribir
+        huella, tamano = _huella(data)
+        item = self._cache.get(user_id)
+        if not forzar and item and item.get("huella") == huella:
+            self.metricas["escrituras_omitidas"] += 1
+            logger.info("💤 Sin cambios, se omite la escritura")
+            return
+
+        adaptador = self._adaptador(handler_input)
+        if etag is None:
+            etag = self._etag_cacheado(handler_input, data)
+        if not forzar and self._diferible(handler_input) and _escribe_por_usuario(adaptador):
+            if self._encolar(user_id, data, huella, tamano, etag, nuevo, adaptador):
+                return
+        elif self._diferidas:
+            self._absorber(user_id)
+        self._escribir(user_id, data, huella, tamano, etag, nuevo, adaptador, handler_input.request_envelope)
+
+    def _escribir(self, user_id, data, huella, tamano, etag, nuevo, adaptador, envelope=None):
+        """PUT del documento (condicional si el adaptador lo soporta) y actualización
+        de los caches. Sin `envelope` (escrituras diferidas), el adaptador tiene que
+        poder escribir por user_id. Devuelve el ETag nuevo; lanza ConflictoDeEscritura"""
         # Persistencia principal
-        attr_mgr = handler_input.attributes_manager
-        attr_mgr.persistent_attributes = data
-        attr_mgr.save_persistent_attributes()
+        guardar_condicional = getattr(adaptador, "guardar_condicional", None)
+        guardar_documento = getattr(adaptador, "guardar_documento", None)
+        try:
+            with Trazador.tramo("s3_escritura"):
+                if guardar_condicional is not None:
+                    etag = guardar_condicional(user_id, data, etag=etag, nuevo=nuevo)
+                else:
+                    if guardar_documento is not None:
+                        guardar_documento(user_id, data)
+                    else:
+                        adaptador.save_attributes(envelope, data)
+                    tomar_etag = getattr(adaptador, "tomar_etag", None)
+                    etag = tomar_etag(user_id) if tomar_etag else None
+        except ConflictoDeEscritura:
+            # Lo cacheado es la copia local que divergió; hay que releer
+            self.metricas["conflictos"] += 1
+            self.clear_cache_by_user_id(user_id)
+            raise
+        self.metricas["escrituras"] += 1
 
-        _cache_put(user_id, data, cache=self._cache, ttl_seconds=self.cache_ttl_seconds)
+        self._cache_put(user_id, data, huella, tamano, etag)
 
         if self.enable_ddb_cache:
             try:
                 table = self._get_ddb_table()
                 if table:
-                    table.put_item(Item={
-                        "user_id": user_id,
-                        "data": data,
-                        "ttl": int((datetime.now() + timedelta(seconds=self.cache_ttl_seconds)).timestamp())
-                    })
+                    with Trazador.tramo("ddb_escritura"):
+                        table.put_item(Item={
+                            "user_id": user_id,
+                            "data": data,
+                            "ttl": int((datetime.now() + timedelta(seconds=self.cache_ttl_seconds)).timestamp())
+                        })
             except Exception as e:
                 logger.warning(f"DDB put_item error: {e}")
+                self._marcar_ddb_caida(e)
+        return etag
+
+    # ==============================
+    # Escrituras diferidas (write-behind)
+    # ==============================
+    # Solo en los requests de `escritura_diferida` (registro de conversaciones del
+    # LaunchRequest, estado del listado, agregados al historial...): el documento
+    # queda en el cache al momento, así que este contenedor lo ve enseguida, y el
+    # PUT se hace después de responder (en un hilo o al empezar la siguiente
+    # invocación). Varias escrituras del mismo usuario se acumulan en una.
+    #
+    # Garantías, explícitas:
+    # - La respuesta sale ANTES de que el cambio sea durable. Hasta el vaciado vive
+    #   solo en la memoria del contenedor: si el contenedor muere (timeout, reciclado)
+    #   se pierde. Lambda congela los hilos al responder, así que en modo "hilo" el
+    #   PUT puede quedar para el inicio de la siguiente invocación.
+    # - La escritura diferida sigue siendo condicional (If-Match con la versión
+    #   leída): si otro contenedor escribió antes, el cambio diferido se descarta
+    #   (diferidas_perdidas_conflicto) y nunca pisa al otro.
+    # - Un fallo transitorio se reintenta en los siguientes vaciados; después de
+    #   MAX_INTENTOS_DIFERIDA se descarta (diferidas_perdidas_fallos).
+    # - Una escritura no diferida del mismo usuario lleva el documento completo y
+    #   reemplaza a la pendiente (diferidas_absorbidas).
+    # - Con la cola llena (ESCRITURA_DIFERIDA_MAX_PENDIENTES usuarios) se escribe en
+    #   el momento (diferidas_cola_llena).
+    # - La cola no guarda nada del request: con un adaptador que solo escribe a
+    #   partir del request (save_attributes), se escribe en el momento.
+    def _nombre_request(self, handler_input):
+        request = handler_input.request_envelope.request
+        intent = getattr(request, "intent", None)
+        return intent.name if intent is not None else getattr(request, "object_type", None)
+
+    def _diferible(self, handler_input):
+        return bool(self.escritura_diferida) and self._nombre_request(handler_input) in self.escritura_diferida
+
+    def _encolar(self, user_id, data, huella, tamano, etag, nuevo, adaptador):
+        """Encola el documento del usuario (acumulándolo con uno pendiente) y lo
+        deja en el cache. Devuelve False si la cola está llena"""
+        with self._lock_diferidas:
+            pendiente = self._diferidas.get(user_id)
+            if pendiente is None and len(self._diferidas) >= ESCRITURA_DIFERIDA_MAX_PENDIENTES:
+                self.metricas["diferidas_cola_llena"] += 1
+                return False
+            if pendiente is not None:
+                # La versión en la persistencia sigue siendo la que leyó la primera
+                self.metricas["diferidas_acumuladas"] += 1
+                etag, nuevo = pendiente["etag"], pendiente["nuevo"]
+            self._diferidas[user_id] = {
+                # Nada del request (handler_input, AttributesManager): la entrada lo sobrevive
+                "data": data, "huella": huella, "tamano": tamano, "etag": etag, "nuevo": nuevo,
+                "adaptador": adaptador,
+                "encolada_en": pendiente["encolada_en"] if pendiente else time.time(),
+                "intentos": pendiente["intentos"] if pendiente else 0,
+            }
+            self.metricas["diferidas_encoladas"] += 1
+        # Con el ETag de la versión leída: revalidar y las escrituras no diferidas
+        # siguen comparando contra lo que hay en la persistencia
+        self._cache_put(user_id, data, huella, tamano, etag)
+        logger.info("📮 Escritura diferida encolada")
+        return True
+
+    def _absorber(self, user_id):
+        with self._lock_diferidas:
+            if self._diferidas.pop(user_id, None) is not None:
+                self.metricas["diferidas_absorbidas"] += 1
+
+    def vaciar_diferidas(self, handler_input=None):
+        """Escribe las escrituras diferidas pendientes. Al empezar un request, en
+        modo "siguiente", se queda en cola la del mismo usuario si este request
+        también es diferible (se acumula con la suya), sigue en el cache y no
+        lleva más de ESCRITURA_DIFERIDA_MAX_SEGUNDOS esperando"""
+        conservar = None
+        if handler_input is not None and self.escritura_diferida_modo == "siguiente" and self._diferible(handler_input):
+            conservar = self._user_id(handler_input)
+        # El lock va antes de mirar la cola: vacía puede significar que el hilo
+        # ya sacó las entradas y su PUT sigue en curso; hay que esperarlo
+        with self._lock_vaciado:
+            if not self._diferidas:
+                return
+            with self._lock_diferidas:
+                pendiente = self._diferidas.get(conservar)
+                item = self._cache.get(conservar) if pendiente else None
+                if not (item and item.get("huella") == pendiente["huella"]
+                        and time.time() - pendiente["encolada_en"] < ESCRITURA_DIFERIDA_MAX_SEGUNDOS):
+                    conservar = None
+                entradas = [(u, e) for u, e in self._diferidas.items() if u != conservar]
+                for user_id, _ in entradas:
+                    del self._diferidas[user_id]
+            for user_id, entrada in entradas:
+                self._vaciar_entrada(user_id, entrada)
+
+    def _vaciar_entrada(self, user_id, entrada):
+        try:
+            etag = self._escribir(user_id, entrada["data"], entrada["huella"], entrada["tamano"], entrada["etag"],
+                                  entrada["nuevo"], entrada["adaptador"])
+        except ConflictoDeEscritura:
+            self.metricas["diferidas_perdidas_conflicto"] += 1
+            logger.warning(f"Escritura diferida de {user_id} descartada: el documento cambió en la persistencia")
+            return
+        except Exception as e:
+            self.metricas["diferidas_fallos"] += 1
+            entrada["intentos"] += 1
+            with self._lock_diferidas:
+                if user_id in self._diferidas:
+                    # La encolada después lleva este cambio y se escribe en su lugar
+                    logger.warning(f"Falló la escritura diferida de {user_id}; la reemplaza una posterior: {e}")
+                elif entrada["intentos"] >= self.MAX_INTENTOS_DIFERIDA:
+                    self.metricas["diferidas_perdidas_fallos"] += 1
+                    logger.error(f"Escritura diferida de {user_id} descartada tras {entrada['intentos']} fallos: {e}")
+                    # Lo cacheado no está en la persistencia
+                    self.clear_cache_by_user_id(user_id)
+                else:
+                    logger.warning(f"Falló la escritura diferida de {user_id}, se reintenta: {e}")
+                    self._diferidas[user_id] = entrada
+            return
+        self.metricas["diferidas_escritas"] += 1
+        demora = time.time() - entrada["encolada_en"]
+        self.metricas["diferidas_demora_max_s"] = max(self.metricas["diferidas_demora_max_s"], demora)
+        with self._lock_diferidas:
+            posterior = self._diferidas.get(user_id)
+            if posterior is not None:
+                # Se encoló otra mientras se escribía: parte de esta versión, y el
+                # cache vuelve a tener la más nueva
+                posterior["etag"], posterior["nuevo"] = etag, False
+                self._cache_put(user_id, posterior["data"], posterior["huella"], posterior["tamano"], etag)
+
+    def vaciar_diferidas_en_segundo_plano(self):
+        """Modo "hilo": lanza el vaciado si hay pendientes y no hay otro en curso"""
+        if self.escritura_diferida_modo != "hilo" or not self._diferidas:
+            return
+        with self._lock_diferidas:
+            if self._hilo_diferidas is not None and self._hilo_diferidas.is_alive():
+                return
+            self._hilo_diferidas = threading.Thread(target=self.vaciar_diferidas, name="escrituras-diferidas",
+                                                    daemon=True)
+            self._hilo_diferidas.start()
 
     def initial_data(self):
         return {
@@ -170,20 +889,135 @@ class _DatabaseManagerImpl:
             "estadisticas": {
                 "total_libros": 0,
                 "total_prestamos": 0,
-                "total_devoluciones": 0
+                "total_devoluciones": 0,
+                # Ver utility/contadores.py
+                "contadores": {"disponibles": 0, "prestados": 0, "por_autor": {}, "por_tipo": {},
+                               "ids_disponibles": {}, "ids_prestados": {}}
             },
             "historial_conversaciones": [],
             "configuracion": {"limite_prestamos": 10, "dias_prestamo": 7},
             "usuario_frecuente": False
         }
 
+    # Unidad de trabajo: una lectura y una escritura por request
+    def iniciar_unidad(self, handler_input):
+        unidad = _UnidadDeTrabajo(self, handler_input)
+        handler_input.attributes_manager.request_attributes[self.UNIDAD_ATTR] = unidad
+        return unidad
+
+    def finalizar_unidad(self, handler_input, confirmar=True):
+        unidad = self._unidad_activa(handler_input)
+        if unidad is None:
+            return
+        if confirmar:
+            unidad.confirmar()
+        else:
+            unidad.cerrada = True
+            # El documento en cache pudo quedar modificado a medias
+            self.clear_cache_for_user(handler_input)
+
+    @contextmanager
+    def transaction(self, handler_input):
+        """Context manager de unidad de trabajo. Dentro del bloque, get_user_data
+        y save_user_data comparten un solo documento que se escribe al salir"""
+        unidad = self._unidad_activa(handler_input)
+        if unidad is not None:
+            # Anidada: la confirma quien abrió la unidad
+            yield unidad
+            return
+        unidad = self.iniciar_unidad(handler_input)
+        try:
+            yield unidad
+        except Exception:
+            self.finalizar_unidad(handler_input, confirmar=False)
+            raise
+        self.finalizar_unidad(handler_input)
+
+    def ejecutar_transaccion(self, handler_input, operacion, reintentos=3):
+        """Aplica `operacion(user_data)` y guarda. Si la escritura choca con otra
+        (ConflictoDeEscritura), recarga el documento y reaplica la operación"""
+        unidad = self._unidad_activa(handler_input)
+        if unidad is not None:
+            resultado = operacion(unidad.datos)
+            unidad.marcar_pendiente(unidad.datos)
+            return resultado
+
+        for intento in range(reintentos + 1):
+            data, es_nuevo = self._cargar_user_data(handler_input)
+            etag = self._etag_cacheado(handler_input, data)
+            resultado = operacion(data)
+            try:
+                self._guardar_user_data(handler_input, data, forzar=es_nuevo, nuevo=es_nuevo, etag=etag)
+                return resultado
+            except ConflictoDeEscritura:
+                if intento == reintentos:
+                    raise
+                logger.warning(f"Conflicto de escritura, reintento {intento + 1} de {reintentos}")
+                self._preparar_reintento(handler_input)
+
+    def ejecutar_con_reintentos(self, handler_input, funcion, reintentos=3):
+        """Ejecuta `funcion()` (el handle de un handler) y confirma ahí mismo su
+        unidad de trabajo. Si la escritura choca con otra (ConflictoDeEscritura),
+        abre una unidad nueva, restaura los atributos de sesión y la respuesta
+        y vuelve a ejecutar `funcion` sobre el documento recargado"""
+        attr_mgr = handler_input.attributes_manager
+        sesion = copy.deepcopy(attr_mgr.session_attributes)
+        for intento in range(reintentos + 1):
+            resultado = funcion()
+            unidad = self._unidad_activa(handler_input)
+            if unidad is None:
+                return resultado
+            try:
+                unidad.confirmar()
+                return resultado
+            except ConflictoDeEscritura:
+                if intento == reintentos:
+                    raise
+                logger.warning(f"Conflicto de escritura, se reaplica el request ({intento + 1} de {reintentos})")
+                self._preparar_reintento(handler_input)
+                attr_mgr.session_attributes = copy.deepcopy(sesion)
+                # Lo que el intento fallido puso en la respuesta (speak,
+                # directivas, tarjetas) no debe salir dos veces
+                from ask_sdk_core.response_helper import ResponseFactory
+                handler_input.response_builder = ResponseFactory()
+                self.iniciar_unidad(handler_input)
+
+    def _preparar_reintento(self, handler_input):
+        self.metricas["reintentos"] += 1
+        # Sin el documento en cache, la siguiente carga lo relee del adaptador
+        self.clear_cache_for_user(handler_input)
+
+    @property
+    def cache(self):
+        """El cache de documentos; utility.derivados adjunta ahí los índices"""
+        return self._cache
+
     # Operaciones para handlers
     def clear_cache_for_user(self, handler_input):
         user_id = self._user_id(handler_input)
         self.clear_cache_by_user_id(user_id)
+        unidad = self._unidad_activa(handler_input)
+        if unidad is not None:
+            unidad.olvidar()
+
+    def version_documento(self, handler_input):
+        """Huella corta de la versión cacheada del documento (la última leída o
+        escrita), o None si no está en cache"""
+        item = self._cache.get(self._user_id(handler_input))
+        return item["huella"][:12] if item and item.get("huella") else None
 
     def clear_cache_by_user_id(self, user_id):
         if user_id in self._cache:
             del self._cache[user_id]
 
+    def obtener_metricas(self):
+        """Contadores de escrituras (realizadas y omitidas), revalidaciones, lecturas
+        obsoletas (stale-while-revalidate), escrituras diferidas y ocupación del cache"""
+        metricas = dict(self.metricas)
+        metricas["diferidas_pendientes"] = len(self._diferidas)
+        metricas["cache_entradas"] = len(self._cache)
+        metricas["cache_bytes"] = getattr(self._cache, "bytes", 0)
+        metricas["cache_desalojos"] = getattr(self._cache, "desalojos", 0)
+        return metricas
+
 DatabaseManager = _DatabaseManagerImpl()
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import logging
+
+from ask_sdk_core.attributes_manager import AbstractPersistenceAdapter
+
+from utility.trazas import Trazador
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# ==============================
+# Documento de usuario fragmentado
+# ==============================
+# Nombre del objeto -> campo del documento. Lo demás (estadisticas,
+# configuracion, usuario_frecuente...) vive en el objeto "base".
+SECCIONES = {
+    "catalogo": "libros_disponibles",
+    "prestamos": "prestamos_activos",
+    "historial": "historial_prestamos",
+    "conversaciones": "historial_conversaciones",
+}
+FORMATO_FRAGMENTADO = 1
+
+
+def _serializar(valor):
+    with Trazador.tramo("json"):
+        return json.dumps(valor).encode("utf-8")
+
+
+def _huella_bytes(contenido):
+    return hashlib.blake2b(contenido, digest_size=16).hexdigest()
+
+
+class DocumentoFragmentado(dict):
+    """Documento de usuario que carga cada sección la primera vez que se accede.
+
+    Se comporta como un dict normal; las secciones pendientes aparecen como
+    claves presentes y solo se leen del almacén cuando alguien las usa.
+    Recorrer el documento completo (items, keys, json.dumps...) lo carga todo."""
+
+    def __init__(self, base, cargador, pendientes=()):
+        super().__init__(base)
+        self._cargador = cargador
+        self._pendientes = set(pendientes)
+        # campo -> huella del último contenido leído o escrito
+        self.huellas = {}
+
+    def _cargar(self, campo):
+        if campo in self._pendientes:
+            self._pendientes.discard(campo)
+            dict.__setitem__(self, campo, self._cargador(campo))
+
+    def cargar_todo(self):
+        for campo in list(self._pendientes):
+            self._cargar(campo)
+
+    def campos_cargados(self):
+        return list(dict.keys(self))
+
+    def contenido_cargado(self):
+        """Copia superficial solo de lo ya cargado (no dispara lecturas)"""
+        contenido = dict(dict.items(self))
+        contenido["_pendientes"] = sorted(self._pendientes)
+        return contenido
+
+    def __getitem__(self, campo):
+        self._cargar(campo)
+        return super().__getitem__(campo)
+
+    def get(self, campo, default=None):
+        self._cargar(campo)
+        return super().get(campo, default)
+
+    def setdefault(self, campo, default=None):
+        self._cargar(campo)
+        return super().setdefault(campo, default)
+
+    def pop(self, campo, *default):
+        self._cargar(campo)
+        return super().pop(campo, *default)
+
+    def __setitem__(self, campo, valor):
+        self._pendientes.discard(campo)
+        super().__setitem__(campo, valor)
+
+    def __delitem__(self, campo):
+        if campo in self._pendientes:
+            self._pendientes.discard(campo)
+            # Puede que no estuviera en el almacén; igual deja de existir
+            super().pop(campo, None)
+            return
+        super().__delitem__(campo)
+
+    def __contains__(self, campo):
+        return campo in self._pendientes or super().__contains__(campo)
+
+    def __len__(self):
+        return super().__len__() + len(self._pendientes)
+
+    def __iter__(self):
+        self.cargar_todo()
+        return super().__iter__()
+
+    def keys(self):
+        self.cargar_todo()
+        return super().keys()
+
+    def values(self):
+        self.cargar_todo()
+        return super().values()
+
+    def items(self):
+        self.cargar_todo()
+        return super().items()
+
+    def update(self, *args, **kwargs):
+        for campo, valor in dict(*args, **kwargs).items():
+            self[campo] = valor
+
+    def copy(self):
+        self.cargar_todo()
+        return dict(super().items())
+
+    def __eq__(self, otro):
+        self.cargar_todo()
+        return super().__eq__(otro)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"DocumentoFragmentado({dict.__repr__(self)}, pendientes={sorted(self._pendientes)})"
+
+
+# ==============================
+# Adaptador de persistencia fragmentado
+# ==============================
+class ShardedS3Adapter(AbstractPersistenceAdapter):
+    """Guarda cada usuario en varios objetos: `<prefijo>/<user_id>/base.json`
+    más uno por sección (catalogo, prestamos, historial, conversaciones).
+
+    Solo se leen las secciones que el request usa y solo se escriben las que
+    cambiaron. Si el usuario aún tiene el formato anterior (un solo objeto,
+    como lo guarda S3Adapter), se lee completo y se reparte en fragmentos en
+    la siguiente escritura."""
+
+    def __init__(self, almacen, prefijo="usuarios", clave_legada=None, borrar_legado=False):
+        self.almacen = almacen
+        self.prefijo = prefijo
+        # S3Adapter usa el user_id como clave del objeto por omisión
+        self.clave_legada = clave_legada or (lambda user_id: user_id)
+        self.borrar_legado = borrar_legado
+        # Huellas de documentos guardados como dict normal (p. ej. el inicial),
+        # que no pueden llevarlas consigo
+        self._huellas_planas = {}
+
+    @staticmethod
+    def _user_id_from_envelope(request_envelope):
+        return request_envelope.context.system.user.user_id
+
+    def _clave(self, user_id, nombre):
+        return f"{self.prefijo}/{user_id}/{nombre}.json"
+
+    def _leer_json(self, clave):
+        contenido = self.almacen.leer(clave)
+        if contenido is None:
+            return None, None
+        with Trazador.tramo("json"):
+            valor = json.loads(contenido)
+        return valor, _huella_bytes(contenido)
+
+    def cargar_documento(self, user_id):
+        """Devuelve el DocumentoFragmentado del usuario, o {} si no existe"""
+        base, huella_base = self._leer_json(self._clave(user_id, "base"))
+        if base is None:
+            return self._cargar_legado(user_id)
+
+        documento = None
+
+        def cargador(campo):
+            nombre = next(n for n, c in SECCIONES.items() if c == campo)
+            with Trazador.tramo("s3_lectura"):
+                valor, huella = self._leer_json(self._clave(user_id, nombre))
+            if valor is None:
+                return []
+            documento.huellas[campo] = huella
+            return valor
+
+        documento = DocumentoFragmentado(base.get("datos", {}), cargador, pendientes=SECCIONES.values())
+        documento.huellas["base"] = huella_base
+        self._huellas_planas.pop(user_id, None)
+        return documento
+
+    def _cargar_legado(self, user_id):
+        legado = self.almacen.leer(self.clave_legada(user_id))
+        if legado is None:
+            return {}
+        logger.info(f"📦 Migrando documento legado de {user_id} a formato fragmentado")
+        # Sin huellas: la siguiente escritura crea todos los fragmentos
+        return DocumentoFragmentado(json.loads(legado), cargador=None)
+
+    def guardar_documento(self, user_id, documento):
+        """Escribe solo los fragmentos cuyo contenido cambió"""
+        es_fragmentado = isinstance(documento, DocumentoFragmentado)
+        huellas = documento.huellas if es_fragmentado else self._huellas_planas.setdefault(user_id, {})
+        campos = documento.campos_cargados() if es_fragmentado else list(documento.keys())
+        escritos = []
+
+        for nombre, campo in SECCIONES.items():
+            if campo not in campos:
+                continue
+            contenido = _serializar(dict.get(documento, campo))
+            huella = _huella_bytes(contenido)
+            if huellas.get(campo) != huella:
+                self.almacen.escribir(self._clave(user_id, nombre), contenido)
+                huellas[campo] = huella
+                escritos.append(nombre)
+
+        # La base se escribe al final: su existencia marca la migración como completa
+        base = {campo: dict.get(documento, campo) for campo in campos if campo not in SECCIONES.values()}
+        contenido = _serializar({"formato": FORMATO_FRAGMENTADO, "datos": base})
+        huella = _huella_bytes(contenido)
+        migrando = "base" not in huellas
+        if huellas.get("base") != huella:
+            self.almacen.escribir(self._clave(user_id, "base"), contenido)
+            huellas["base"] = huella
+            escritos.append("base")
+
+        if migrando and self.borrar_legado:
+            self.almacen.borrar(self.clave_legada(user_id))
+        logger.info(f"ShardedS3Adapter: fragmentos escritos para {user_id}: {escritos or 'ninguno'}")
+
+    def get_attributes(self, request_envelope):
+        return self.cargar_documento(self._user_id_from_envelope(request_envelope))
+
+    def save_attributes(self, request_envelope, attributes):
+        self.guardar_documento(self._user_id_from_envelope(request_envelope), attributes or {})
+
+    def delete_attributes(self, request_envelope):
+        user_id = self._user_id_from_envelope(request_envelope)
+        for nombre in list(SECCIONES) + ["base"]:
+            self.almacen.borrar(self._clave(user_id, nombre))
+        self._huellas_planas.pop(user_id, None)
+
+
+def migrar_usuarios(almacen, user_ids, **opciones):
+    """Migra en lote documentos del formato de un solo objeto al fragmentado"""
+    adaptador = ShardedS3Adapter(almacen, **opciones)
+    migrados = 0
+    for user_id in user_ids:
+        if almacen.leer(adaptador._clave(user_id, "base")) is not None:
+            continue
+        documento = adaptador.cargar_documento(user_id)
+        if documento:
+            adaptador.guardar_documento(user_id, documento)
+            migrados += 1
+    return migrados
@@ -0,0 +1,32 @@
+from ask_sdk_core.attributes_manager import AbstractPersistenceAdapter
+
+# ==============================
+# Adaptador de persistencia diferido
+# ==============================
+class PersistenciaPerezosa(AbstractPersistenceAdapter):
+    """Construye el adaptador real (y sus imports de AWS) en el primer request
+    que lee o escribe atributos persistentes, no en la fase de init"""
+    def __init__(self, fabrica):
+        self._fabrica = fabrica
+        self._adaptador = None
+
+    @property
+    def adaptador(self):
+        if self._adaptador is None:
+            self._adaptador = self._fabrica()
+        return self._adaptador
+
+    def get_attributes(self, request_envelope):
+        return self.adaptador.get_attributes(request_envelope)
+
+    def save_attributes(self, request_envelope, attributes):
+        self.adaptador.save_attributes(request_envelope, attributes)
+
+    def delete_attributes(self, request_envelope):
+        self.adaptador.delete_attributes(request_envelope)
+
+    def __getattr__(self, nombre):
+        # Capacidades opcionales del adaptador real (tomar_etag, revalidar...)
+        if nombre.startswith("_"):
+            raise AttributeError(nombre)
+        return getattr(self.adaptador, nombre)
@@ -2,6 +2,9 @@ import logging
 from ask_sdk_core.dispatch_components import AbstractExceptionHandler
 import random
 
+from database.database import DatabaseManager
+from utility.trazas import Trazador
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
@@ -13,6 +16,10 @@ class CatchAllExceptionHandler(AbstractExceptionHandler):
         logger.error(f"Exception: {exception}", exc_info=True)
         # Limpiar sesión en caso de error
         handler_input.attributes_manager.session_attributes = {}
+        # Descartar cambios no confirmados de la unidad de trabajo
+        DatabaseManager.finalizar_unidad(handler_input, confirmar=False)
+        # Los interceptores de respuesta no corren tras una excepción
+        Trazador.finalizar(resultado="error")
         
         respuestas = [
             "Ups, algo no salió como esperaba. ¿Podemos intentarlo de nuevo?",
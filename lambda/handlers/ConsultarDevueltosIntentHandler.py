@@ -1,22 +1,9 @@
-import os
-import json
 import logging
-from datetime import datetime, timedelta
-import random
-import uuid
-
 import ask_sdk_core.utils as ask_utils
-from ask_sdk_core.skill_builder import CustomSkillBuilder
-from ask_sdk_core.dispatch_components import AbstractRequestHandler, AbstractExceptionHandler
-from ask_sdk_model import Response, DialogState
-from ask_sdk_model.dialog import ElicitSlotDirective, DelegateDirective
-from ask_sdk_s3.adapter import S3Adapter
-import boto3
-from botocore.exceptions import ClientError
+from ask_sdk_core.dispatch_components import AbstractRequestHandler
 from database.database import DatabaseManager
-from utility.utils import sincronizar_estados_libros, get_random_phrase, generar_id_unico, buscar_libro_por_titulo, buscar_libro_por_titulo_exacto, buscar_libros_por_autor, generar_id_prestamo
-from constants.constants import SALUDOS, OPCIONES_MENU, PREGUNTAS_QUE_HACER, ALGO_MAS, CONFIRMACIONES
-from configuration.configurations import LIBROS_POR_PAGINA
+from utility.utils import get_random_phrase
+from constants.constants import PREGUNTAS_QUE_HACER, ALGO_MAS
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -1,10 +1,11 @@
 import logging
-from datetime import datetime
 from ask_sdk_core.dispatch_components import AbstractRequestHandler
 import ask_sdk_core.utils as ask_utils
 
 from database.database import DatabaseManager
 from utility.utils import get_random_phrase, sincronizar_estados_libros
+from utility.vencimientos import DIAS_POR_VENCER, obtener_indice_vencimientos, resumen_vencimientos
+from utility.tiempo import reloj
 from constants.constants import ALGO_MAS, PREGUNTAS_QUE_HACER
 
 logger = logging.getLogger(__name__)
@@ -30,27 +31,25 @@ class ConsultarPrestamosIntentHandler(AbstractRequestHandler):
                 else:
                     speak_output = f"Déjame revisar... Tienes {len(prestamos)} libros prestados: "
                 
-                # Listar préstamos con detalles
+                # Listar préstamos con detalles: los más urgentes primero
+                resumen = resumen_vencimientos(prestamos, reloj(handler_input),
+                                               indice=obtener_indice_vencimientos(prestamos))
                 detalles = []
-                hay_vencidos = False
-                hay_proximos = False
+                vencidos = resumen["vencidos"]
+                hay_vencidos = vencidos > 0
+                hay_proximos = resumen["por_vencer"] > 0
                 
-                for p in prestamos[:5]:
+                for p, dias_restantes in resumen["urgentes"]:
                     detalle = f"'{p['titulo']}' está con {p.get('persona', 'alguien')}"
                     
-                    # Calcular días restantes
-                    fecha_limite = datetime.fromisoformat(p['fecha_limite'])
-                    dias_restantes = (fecha_limite - datetime.now()).days
-                    
-                    if dias_restantes < 0:
+                    if dias_restantes is None:
+                        pass
+                    elif dias_restantes < 0:
                         detalle += " (¡ya venció!)"
-                        hay_vencidos = True
                     elif dias_restantes == 0:
                         detalle += " (vence hoy)"
-                        hay_proximos = True
-                    elif dias_restantes <= 2:
+                    elif dias_restantes <= DIAS_POR_VENCER:
                         detalle += f" (vence en {dias_restantes} días)"
-                        hay_proximos = True
                     
                     detalles.append(detalle)
                 
@@ -58,6 +57,8 @@ class ConsultarPrestamosIntentHandler(AbstractRequestHandler):
                 
                 if len(prestamos) > 5:
                     speak_output += f"Y {len(prestamos) - 5} más. "
+                    if vencidos > 5:
+                        speak_output += f"En total tienes {vencidos} préstamos vencidos. "
                 
                 # Agregar advertencias si es necesario
                 if hay_vencidos:
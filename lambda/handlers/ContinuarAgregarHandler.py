@@ -1,10 +1,12 @@
 import logging
-from datetime import datetime
 from ask_sdk_core.dispatch_components import AbstractRequestHandler
 import ask_sdk_core.utils as ask_utils
 
 from database.database import DatabaseManager
-from utility.utils import generar_id_unico, get_random_phrase
+from utility.utils import generar_id_unico, get_random_phrase, titulo_duplicado
+from utility.indice_libros import indexar_libro
+from utility.contadores import contar_alta
+from utility.tiempo import reloj
 from constants.constants import ALGO_MAS, PREGUNTAS_QUE_HACER
 
 logger = logging.getLogger(__name__)
@@ -139,31 +141,30 @@ class ContinuarAgregarHandler(AbstractRequestHandler):
                 libros = user_data.get("libros_disponibles", [])
                 
                 # Verificar duplicado
-                for libro in libros:
-                    if libro.get("titulo", "").lower() == titulo_final.lower():
-                        handler_input.attributes_manager.session_attributes = {}
-                        return (
-                            handler_input.response_builder
-                                .speak(f"'{titulo_final}' ya está en tu biblioteca. " + get_random_phrase(ALGO_MAS))
-                                .ask(get_random_phrase(PREGUNTAS_QUE_HACER))
-                                .response
-                        )
+                if titulo_duplicado(libros, titulo_final):
+                    handler_input.attributes_manager.session_attributes = {}
+                    return (
+                        handler_input.response_builder
+                            .speak(f"'{titulo_final}' ya está en tu biblioteca. " + get_random_phrase(ALGO_MAS))
+                            .ask(get_random_phrase(PREGUNTAS_QUE_HACER))
+                            .response
+                    )
                 
                 nuevo_libro = {
                     "id": generar_id_unico(),
                     "titulo": titulo_final,
                     "autor": autor_final,
                     "tipo": tipo_final,
-                    "fecha_agregado": datetime.now().isoformat(),
+                    "fecha_agregado": reloj(handler_input),
                     "total_prestamos": 0,
                     "estado": "disponible"
                 }
                 
                 libros.append(nuevo_libro)
+                indexar_libro(libros, nuevo_libro)
                 user_data["libros_disponibles"] = libros
                 
-                stats = user_data.setdefault("estadisticas", {})
-                stats["total_libros"] = len(libros)
+                contar_alta(user_data, nuevo_libro)
                 
                 DatabaseManager.save_user_data(handler_input, user_data)
                 
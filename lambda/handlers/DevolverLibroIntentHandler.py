@@ -1,22 +1,45 @@
 import logging
-from datetime import datetime
 from ask_sdk_core.dispatch_components import AbstractRequestHandler
 import ask_sdk_core.utils as ask_utils
 import random
 
 from database.database import DatabaseManager
-from utility.utils import get_random_phrase
+from utility.utils import get_random_phrase, respondiendo_confirmacion
+from utility.similitud import con_puntaje, mejores_coincidencias
+from utility.contadores import contar_devolucion
+from utility.vencimientos import desindexar_prestamo
+from utility.tiempo import reloj, fecha_epoch
 from constants.constants import ALGO_MAS, PREGUNTAS_QUE_HACER, CONFIRMACIONES
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+def confirmando_devolucion(handler_input):
+    """Si el usuario responde sí o no a "¿Quieres devolver...?" """
+    return respondiendo_confirmacion(handler_input, "confirmar_devolver")
+
+def _preguntar(handler_input, prestamo, speak):
+    """Deja pendiente la confirmación de devolver `prestamo`"""
+    session_attrs = handler_input.attributes_manager.session_attributes
+    session_attrs["esperando"] = "confirmar_devolver"
+    session_attrs["devolver_prestamo_id"] = prestamo.get("id")
+    return (
+        handler_input.response_builder
+            .speak(speak)
+            .ask(f"¿Quieres registrar la devolución de '{prestamo.get('titulo')}'?")
+            .response
+    )
+
 class DevolverLibroIntentHandler(AbstractRequestHandler):
     def can_handle(self, handler_input):
-        return ask_utils.is_intent_name("DevolverLibroIntent")(handler_input)
+        return (ask_utils.is_intent_name("DevolverLibroIntent")(handler_input) or
+                confirmando_devolucion(handler_input))
 
     def handle(self, handler_input):
         try:
+            if confirmando_devolucion(handler_input):
+                return self._confirmar(handler_input)
+
             titulo = ask_utils.get_slot_value(handler_input, "titulo")
             id_prestamo = ask_utils.get_slot_value(handler_input, "id_prestamo")
 
@@ -47,26 +70,22 @@ class DevolverLibroIntentHandler(AbstractRequestHandler):
                 )
 
             prestamo_encontrado = None
-            indice = -1
-
-            for i, p in enumerate(prestamos):
-                if id_prestamo and p.get("id") == id_prestamo:
-                    prestamo_encontrado = p
-                    indice = i
-                    break
-                elif titulo and titulo.lower() in (p.get("titulo", "").lower()):
-                    prestamo_encontrado = p
-                    indice = i
-                    break
+            puntaje = 1.0
+
+            if id_prestamo:
+                prestamo_encontrado = next((p for p in prestamos if p.get("id") == id_prestamo), None)
+            if not prestamo_encontrado and titulo:
+                # Tolerante a acentos, artículos y errores de reconocimiento
+                prestamo_encontrado, puntaje = con_puntaje(mejores_coincidencias(prestamos, titulo), titulo)
 
             if not prestamo_encontrado:
                 # Ayudar al usuario listando préstamos
                 if len(prestamos) == 1:
                     p = prestamos[0]
                     sugerencia = f"Solo tienes prestado '{p.get('titulo')}' a {p.get('persona')}. ¿Es ese?"
-                else:
-                    titulos_prestados = [f"'{p.get('titulo')}'" for p in prestamos[:3]]
-                    sugerencia = f"Tienes prestados: {', '.join(titulos_prestados)}. ¿Cuál de estos es?"
+                    return _preguntar(handler_input, p, f"Hmm, no encuentro ese libro en los préstamos. {sugerencia}")
+                titulos_prestados = [f"'{p.get('titulo')}'" for p in prestamos[:3]]
+                sugerencia = f"Tienes prestados: {', '.join(titulos_prestados)}. ¿Cuál de estos es?"
                 
                 return (
                     handler_input.response_builder
@@ -75,59 +94,102 @@ class DevolverLibroIntentHandler(AbstractRequestHandler):
                         .response
                 )
 
-            # Procesar devolución
-            prestamos.pop(indice)
-            prestamo_encontrado["fecha_devolucion"] = datetime.now().isoformat()
-            prestamo_encontrado["estado"] = "devuelto"
-
-            # Calcular si fue devuelto a tiempo
-            fecha_limite = datetime.fromisoformat(prestamo_encontrado["fecha_limite"])
-            devuelto_a_tiempo = datetime.now() <= fecha_limite
-
-            historial = user_data.get("historial_prestamos", [])
-            historial.append(prestamo_encontrado)
-
-            libros = user_data.get("libros_disponibles", [])
-            for l in libros:
-                if l.get("id") == prestamo_encontrado.get("libro_id"):
-                    l["estado"] = "disponible"
-                    break
-
-            user_data["prestamos_activos"] = prestamos
-            user_data["historial_prestamos"] = historial
-            stats = user_data.get("estadisticas", {})
-            stats["total_devoluciones"] = stats.get("total_devoluciones", 0) + 1
-
-            DatabaseManager.save_user_data(handler_input, user_data)
-
-            # Respuesta natural
-            confirmacion = get_random_phrase(CONFIRMACIONES)
-            speak_output = f"{confirmacion} He registrado la devolución de '{prestamo_encontrado['titulo']}'. "
-            
-            if devuelto_a_tiempo:
-                speak_output += "¡Fue devuelto a tiempo! "
-            else:
-                speak_output += "Fue devuelto un poco tarde, pero no hay problema. "
-            
-            speak_output += "Espero que lo hayan disfrutado. "
-            
-            if prestamos:
-                speak_output += f"Aún tienes {len(prestamos)} "
-                speak_output += "libro prestado. " if len(prestamos) == 1 else "libros prestados. "
-            
-            speak_output += get_random_phrase(ALGO_MAS)
-            
+            if puntaje < 1.0:
+                # Solo parecido: se pregunta antes de registrar la devolución
+                return _preguntar(handler_input, prestamo_encontrado,
+                                  f"No tengo prestado un libro llamado exactamente '{titulo}'. "
+                                  f"¿Quieres registrar la devolución de '{prestamo_encontrado.get('titulo')}'?")
+
+            return self._devolver(handler_input, user_data, prestamo_encontrado)
+        except Exception as e:
+            logger.error(f"Error en DevolverLibro: {e}", exc_info=True)
             return (
                 handler_input.response_builder
-                    .speak(speak_output)
+                    .speak("Tuve un problema registrando la devolución. ¿Lo intentamos de nuevo?")
+                    .ask("¿Qué libro quieres devolver?")
+                    .response
+            )
+
+    def _confirmar(self, handler_input):
+        """Respuesta a "¿Quieres registrar la devolución...?": el préstamo se
+        vuelve a buscar por id, por si se devolvió desde la pregunta"""
+        prestamo_id = handler_input.attributes_manager.session_attributes.get("devolver_prestamo_id")
+        handler_input.attributes_manager.session_attributes = {}
+
+        if ask_utils.is_intent_name("AMAZON.NoIntent")(handler_input):
+            speak = "De acuerdo, no registré ninguna devolución. " + get_random_phrase(ALGO_MAS)
+            return (
+                handler_input.response_builder
+                    .speak(speak)
                     .ask(get_random_phrase(PREGUNTAS_QUE_HACER))
                     .response
             )
-        except Exception as e:
-            logger.error(f"Error en DevolverLibro: {e}", exc_info=True)
+
+        user_data = DatabaseManager.get_user_data(handler_input)
+        prestamo = next((p for p in user_data.get("prestamos_activos", [])
+                         if isinstance(p, dict) and p.get("id") == prestamo_id), None)
+        if not prestamo:
+            speak = "Ese préstamo ya no está activo. " + get_random_phrase(ALGO_MAS)
             return (
                 handler_input.response_builder
-                    .speak("Tuve un problema registrando la devolución. ¿Lo intentamos de nuevo?")
-                    .ask("¿Qué libro quieres devolver?")
+                    .speak(speak)
+                    .ask(get_random_phrase(PREGUNTAS_QUE_HACER))
                     .response
-            )
\ No newline at end of file
+            )
+        return self._devolver(handler_input, user_data, prestamo)
+
+    def _devolver(self, handler_input, user_data, prestamo_encontrado):
+        prestamos = user_data.get("prestamos_activos", [])
+
+        # Procesar devolución
+        indice = next(i for i, p in enumerate(prestamos) if p is prestamo_encontrado)
+        prestamos.pop(indice)
+        desindexar_prestamo(prestamos, prestamo_encontrado)
+        prestamo_encontrado["fecha_devolucion"] = reloj(handler_input)
+        prestamo_encontrado["estado"] = "devuelto"
+        fecha_epoch(prestamo_encontrado, "fecha_prestamo")
+
+        # Calcular si fue devuelto a tiempo
+        fecha_limite = fecha_epoch(prestamo_encontrado, "fecha_limite")
+        devuelto_a_tiempo = fecha_limite is None or reloj(handler_input) <= fecha_limite
+
+        historial = user_data.get("historial_prestamos", [])
+        historial.append(prestamo_encontrado)
+
+        libros = user_data.get("libros_disponibles", [])
+        for l in libros:
+            if l.get("id") == prestamo_encontrado.get("libro_id"):
+                l["estado"] = "disponible"
+                break
+
+        user_data["prestamos_activos"] = prestamos
+        user_data["historial_prestamos"] = historial
+        stats = user_data.get("estadisticas", {})
+        stats["total_devoluciones"] = stats.get("total_devoluciones", 0) + 1
+        contar_devolucion(user_data, prestamo_encontrado.get("libro_id"))
+
+        DatabaseManager.save_user_data(handler_input, user_data)
+
+        # Respuesta natural
+        confirmacion = get_random_phrase(CONFIRMACIONES)
+        speak_output = f"{confirmacion} He registrado la devolución de '{prestamo_encontrado['titulo']}'. "
+        
+        if devuelto_a_tiempo:
+            speak_output += "¡Fue devuelto a tiempo! "
+        else:
+            speak_output += "Fue devuelto un poco tarde, pero no hay problema. "
+        
+        speak_output += "Espero que lo hayan disfrutado. "
+        
+        if prestamos:
+            speak_output += f"Aún tienes {len(prestamos)} "
+            speak_output += "libro prestado. " if len(prestamos) == 1 else "libros prestados. "
+        
+        speak_output += get_random_phrase(ALGO_MAS)
+        
+        return (
+            handler_input.response_builder
+                .speak(speak_output)
+                .ask(get_random_phrase(PREGUNTAS_QUE_HACER))
+                .response
+        )
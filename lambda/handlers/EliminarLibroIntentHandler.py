@@ -2,19 +2,30 @@ import logging
 import ask_sdk_core.utils as ask_utils
 from ask_sdk_core.dispatch_components import AbstractRequestHandler
 from database.database import DatabaseManager
-from utility.utils import get_random_phrase
+from utility.utils import get_random_phrase, buscar_libro_con_puntaje, respondiendo_confirmacion
+from utility.indice_libros import desindexar_libro
+from utility.contadores import contar_baja
 from constants.constants import PREGUNTAS_QUE_HACER, ALGO_MAS
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+def confirmando_eliminacion(handler_input):
+    """Si el usuario responde sí o no a "¿Quieres eliminar...?" """
+    return respondiendo_confirmacion(handler_input, "confirmar_eliminar")
+
+
 class EliminarLibroIntentHandler(AbstractRequestHandler):
     def can_handle(self, handler_input):
-        return ask_utils.is_intent_name("EliminarLibroIntent")(handler_input)
+        return (ask_utils.is_intent_name("EliminarLibroIntent")(handler_input) or
+                confirmando_eliminacion(handler_input))
 
     def handle(self, handler_input):
         try:
+            if confirmando_eliminacion(handler_input):
+                return self._confirmar(handler_input)
+
             titulo = ask_utils.get_slot_value(handler_input, "titulo")
             session_attrs = handler_input.attributes_manager.session_attributes
 
@@ -43,11 +54,7 @@ class EliminarLibroIntentHandler(AbstractRequestHandler):
             user_data = DatabaseManager.get_user_data(handler_input)
             libros = user_data.get("libros_disponibles", [])
 
-            encontrado = None
-            for libro in libros:
-                if libro.get("titulo", "").strip().lower() == titulo.strip().lower():
-                    encontrado = libro
-                    break
+            encontrado, puntaje = buscar_libro_con_puntaje(libros, titulo)
 
             if not encontrado:
                 # Limpiar sesión
@@ -60,35 +67,85 @@ class EliminarLibroIntentHandler(AbstractRequestHandler):
                         .response
                 )
 
-            # Remover libro
-            libros = [l for l in libros if l.get("id") != encontrado.get("id")]
-            user_data["libros_disponibles"] = libros
-
-            # Actualizar estadísticas
-            stats = user_data.setdefault("estadisticas", {})
-            stats["total_libros"] = len(libros)
+            if puntaje < 1.0:
+                # Solo parecido (p. ej. "El" dentro de "Hotel California"): se pregunta antes de borrar
+                session_attrs["esperando"] = "confirmar_eliminar"
+                session_attrs["eliminar_libro_id"] = encontrado.get("id")
+                session_attrs["eliminar_libro_titulo"] = encontrado.get("titulo")
+                pregunta = f"¿Quieres eliminar '{encontrado.get('titulo')}'?"
+                return (
+                    handler_input.response_builder
+                        .speak(f"No tengo un libro llamado exactamente '{titulo}'. {pregunta}")
+                        .ask(pregunta)
+                        .response
+                )
 
-            DatabaseManager.save_user_data(handler_input, user_data)
+            return self._eliminar(handler_input, user_data, encontrado)
 
-            # Limpiar sesión
+        except Exception as e:
+            logger.error(f"Error en EliminarLibro: {e}", exc_info=True)
             handler_input.attributes_manager.session_attributes = {}
+            return (
+                handler_input.response_builder
+                    .speak("Hubo un problema eliminando el libro. Intentemos de nuevo.")
+                    .ask("¿Qué libro quieres eliminar?")
+                    .response
+            )
 
-            speak_output = f"Listo. Eliminé '{encontrado.get('titulo')}'. Ahora tienes {len(libros)} libros en tu biblioteca. "
-            speak_output += get_random_phrase(ALGO_MAS)
+    def _confirmar(self, handler_input):
+        """Respuesta a "¿Quieres eliminar...?": el libro se vuelve a buscar por
+        id, por si cambió la biblioteca desde la pregunta"""
+        session_attrs = handler_input.attributes_manager.session_attributes
+        libro_id = session_attrs.get("eliminar_libro_id")
+        titulo = session_attrs.get("eliminar_libro_titulo")
 
+        if ask_utils.is_intent_name("AMAZON.NoIntent")(handler_input):
+            handler_input.attributes_manager.session_attributes = {}
+            speak = "De acuerdo, no eliminé nada. " + get_random_phrase(ALGO_MAS)
             return (
                 handler_input.response_builder
-                    .speak(speak_output)
+                    .speak(speak)
                     .ask(get_random_phrase(PREGUNTAS_QUE_HACER))
                     .response
             )
 
-        except Exception as e:
-            logger.error(f"Error en EliminarLibro: {e}", exc_info=True)
+        user_data = DatabaseManager.get_user_data(handler_input)
+        libros = user_data.get("libros_disponibles", [])
+        encontrado = next((l for l in libros if isinstance(l, dict) and l.get("id") == libro_id
+                           and l.get("titulo") == titulo), None)
+        if not encontrado:
             handler_input.attributes_manager.session_attributes = {}
+            speak = f"'{titulo}' ya no está en tu biblioteca. " + get_random_phrase(ALGO_MAS)
             return (
                 handler_input.response_builder
-                    .speak("Hubo un problema eliminando el libro. Intentemos de nuevo.")
-                    .ask("¿Qué libro quieres eliminar?")
+                    .speak(speak)
+                    .ask(get_random_phrase(PREGUNTAS_QUE_HACER))
                     .response
             )
+        return self._eliminar(handler_input, user_data, encontrado)
+
+    def _eliminar(self, handler_input, user_data, encontrado):
+        libros = user_data.get("libros_disponibles", [])
+
+        # Remover libro (en sitio, para mantener el índice de búsqueda)
+        libros.remove(encontrado)
+        desindexar_libro(libros, encontrado)
+        user_data["libros_disponibles"] = libros
+
+        # Actualizar estadísticas
+        contar_baja(user_data, encontrado)
+
+        DatabaseManager.save_user_data(handler_input, user_data)
+
+        # Limpiar sesión
+        handler_input.attributes_manager.session_attributes = {}
+
+        speak_output = f"Listo. Eliminé '{encontrado.get('titulo')}'. Ahora tienes {len(libros)} libros en tu biblioteca. "
+        speak_output += get_random_phrase(ALGO_MAS)
+
+        return (
+            handler_input.response_builder
+                .speak(speak_output)
+                .ask(get_random_phrase(PREGUNTAS_QUE_HACER))
+                .response
+        )
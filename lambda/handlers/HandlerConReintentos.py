@@ -0,0 +1,16 @@
+from ask_sdk_core.dispatch_components import AbstractRequestHandler
+
+from database.database import DatabaseManager
+
+class HandlerConReintentos(AbstractRequestHandler):
+    """Envuelve un handler para confirmar su unidad de trabajo al terminar el
+    handle. Si otro contenedor escribió el documento mientras tanto, se recarga
+    y se vuelve a ejecutar el handle (concurrencia optimista, sin locks)"""
+    def __init__(self, handler):
+        self.handler = handler
+
+    def can_handle(self, handler_input):
+        return self.handler.can_handle(handler_input)
+
+    def handle(self, handler_input):
+        return DatabaseManager.ejecutar_con_reintentos(handler_input, lambda: self.handler.handle(handler_input))
@@ -0,0 +1,28 @@
+import importlib
+
+from ask_sdk_core.dispatch_components import AbstractRequestHandler
+
+class HandlerPerezoso(AbstractRequestHandler):
+    """Registra un handler sin importar su módulo. `filtro` es una condición
+    barata y necesaria (p. ej. el nombre del intent): si no se cumple, se
+    responde que no sin importar nada; si se cumple, se importa el handler
+    real y se delega en su can_handle"""
+    def __init__(self, modulo, clase, filtro=None):
+        self.modulo = modulo
+        self.clase = clase
+        self.filtro = filtro
+        self._handler = None
+
+    @property
+    def handler(self):
+        if self._handler is None:
+            self._handler = getattr(importlib.import_module(self.modulo), self.clase)()
+        return self._handler
+
+    def can_handle(self, handler_input):
+        if self.filtro is not None and not self.filtro(handler_input):
+            return False
+        return self.handler.can_handle(handler_input)
+
+    def handle(self, handler_input):
+        return self.handler.handle(handler_input)
@@ -0,0 +1,19 @@
+from ask_sdk_core.dispatch_components import AbstractRequestHandler
+
+from utility.trazas import Trazador
+
+class HandlerTrazado(AbstractRequestHandler):
+    """Envuelve un handler para medir su can_handle (tramo `can_handle`, que
+    suma toda la cadena hasta el que acepta) y su handle (tramo `handler`)"""
+    def __init__(self, handler):
+        self.handler = handler
+
+    def can_handle(self, handler_input):
+        with Trazador.tramo("can_handle"):
+            return self.handler.can_handle(handler_input)
+
+    def handle(self, handler_input):
+        with Trazador.tramo("handler"):
+            respuesta = self.handler.handle(handler_input)
+        Trazador.marcar("fin_handler")
+        return respuesta
@@ -1,11 +1,13 @@
 import logging
 import ask_sdk_core.utils as ask_utils
 from ask_sdk_core.dispatch_components import AbstractRequestHandler
-from datetime import datetime
 
 from database.database import DatabaseManager
+from database.archivo import ArchivoConversaciones
 from constants.constants import SALUDOS, OPCIONES_MENU, PREGUNTAS_QUE_HACER
-from utility.utils import get_random_phrase, sincronizar_estados_libros
+from utility.utils import get_random_phrase, sincronizar_estados_libros, contar_conversaciones, registrar_conversacion
+from utility.contadores import obtener_contadores
+from utility.tiempo import reloj
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -26,17 +28,22 @@ class LaunchRequestHandler(AbstractRequestHandler):
             DatabaseManager.save_user_data(handler_input, user_data)
             
             # Marcar si es usuario frecuente
-            historial = user_data.get("historial_conversaciones", [])
-            es_usuario_frecuente = len(historial) > 5
+            es_usuario_frecuente = contar_conversaciones(user_data) > 5
             
-            user_data.setdefault("historial_conversaciones", []).append({
+            primero, excedentes = registrar_conversacion(user_data, {
                 "tipo": "inicio_sesion",
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": reloj(handler_input),
                 "accion": "bienvenida"
             })
             DatabaseManager.save_user_data(handler_input, user_data)
+            # Las que salen de la ventana se archivan fuera del camino crítico,
+            # después de confirmar el documento (ArchivoConversacionesResponseInterceptor)
+            user_id = handler_input.request_envelope.context.system.user.user_id
+            ArchivoConversaciones.proponer(handler_input, user_id, primero, excedentes)
 
-            total_libros = len(user_data.get("libros_disponibles", []))
+            # Contadores mantenidos (se arman la primera vez en documentos anteriores)
+            obtener_contadores(user_data)
+            total_libros = user_data["estadisticas"].get("total_libros", 0)
             prestamos_activos = len(user_data.get("prestamos_activos", []))
 
             # Saludo personalizado
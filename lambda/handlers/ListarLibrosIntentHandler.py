@@ -5,21 +5,37 @@ from ask_sdk_core.dispatch_components import AbstractRequestHandler
 from database.database import DatabaseManager
 from utility.utils import get_random_phrase, buscar_libros_por_autor, sincronizar_estados_libros
 from constants.constants import ALGO_MAS, PREGUNTAS_QUE_HACER
+from utility.contadores import obtener_contadores
+from utility.paginacion import nuevo_cursor, codificar_cursor, siguiente_pagina
 from configuration.configurations import LIBROS_POR_PAGINA
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 class ListarLibrosIntentHandler(AbstractRequestHandler):
+    """Lista los libros de a LIBROS_POR_PAGINA. En sesión queda solo un cursor
+    (utility.paginacion), no la lista filtrada"""
     def can_handle(self, handler_input):
         return ask_utils.is_intent_name("ListarLibrosIntent")(handler_input)
 
     def handle(self, handler_input):
+        # Obtener parámetros de filtrado; una lista nueva empieza desde el principio
+        filtro = ask_utils.get_slot_value(handler_input, "filtro_tipo")
+        autor = ask_utils.get_slot_value(handler_input, "autor")
+
+        if autor:
+            cursor = nuevo_cursor("autor", autor)
+        elif filtro and filtro.lower() in ["prestados", "prestado"]:
+            cursor = nuevo_cursor("prestados")
+        elif filtro and filtro.lower() in ["disponibles", "disponible"]:
+            cursor = nuevo_cursor("disponibles")
+        else:
+            cursor = nuevo_cursor()
+        return self.listar(handler_input, cursor)
+
+    def listar(self, handler_input, cursor):
+        """Lista la página que sigue al cursor (SiguientePagina retoma desde aquí)"""
         try:
-            # Obtener parámetros de filtrado
-            filtro = ask_utils.get_slot_value(handler_input, "filtro_tipo")
-            autor = ask_utils.get_slot_value(handler_input, "autor")
-            
             user_data = DatabaseManager.get_user_data(handler_input)
             
             # IMPORTANTE: Sincronizar estados antes de listar
@@ -27,11 +43,15 @@ class ListarLibrosIntentHandler(AbstractRequestHandler):
             DatabaseManager.save_user_data(handler_input, user_data)
             
             session_attrs = handler_input.attributes_manager.session_attributes
+            # Sesiones anteriores al cursor guardaban la lista completa
+            session_attrs.pop("libros_filtrados", None)
+            session_attrs.pop("pagina_libros", None)
             
             todos_libros = user_data.get("libros_disponibles", [])
-            prestamos = user_data.get("prestamos_activos", [])
             
             if not todos_libros:
+                session_attrs.pop("cursor_libros", None)
+                session_attrs["listando_libros"] = False
                 speak_output = "Aún no tienes libros en tu biblioteca. ¿Te gustaría agregar el primero? Solo di: agrega un libro."
                 return (
                     handler_input.response_builder
@@ -40,25 +60,26 @@ class ListarLibrosIntentHandler(AbstractRequestHandler):
                         .response
                 )
             
-            # Filtrar libros según el criterio
-            libros_filtrados = todos_libros.copy()
-            titulo_filtro = ""
-            
-            if autor:
-                libros_filtrados = buscar_libros_por_autor(libros_filtrados, autor)
-                titulo_filtro = f" de {autor}"
-            elif filtro:
-                if filtro.lower() in ["prestados", "prestado"]:
-                    ids_prestados = [p.get("libro_id") for p in prestamos]
-                    libros_filtrados = [l for l in libros_filtrados if l.get("id") in ids_prestados]
-                    titulo_filtro = " prestados"
-                elif filtro.lower() in ["disponibles", "disponible"]:
-                    ids_prestados = [p.get("libro_id") for p in prestamos]
-                    libros_filtrados = [l for l in libros_filtrados if l.get("id") not in ids_prestados]
-                    titulo_filtro = " disponibles"
+            # Filtrar libros según el criterio del cursor
+            incluir, titulo_filtro, contar = self._filtro(cursor, todos_libros, obtener_contadores(user_data))
+
+            # El total se cuenta una vez; se recuenta si el documento cambió
+            version = DatabaseManager.version_documento(handler_input)
+            if "t" in cursor and cursor.get("v") == version:
+                total = cursor["t"]
+            else:
+                total = contar()
             
-            if not libros_filtrados:
-                speak_output = f"No encontré libros{titulo_filtro}. " + get_random_phrase(ALGO_MAS)
+            mostrados = cursor.get("n", 0)
+            libros_pagina, posicion = siguiente_pagina(todos_libros, cursor, incluir, LIBROS_POR_PAGINA)
+
+            if not libros_pagina:
+                session_attrs.pop("cursor_libros", None)
+                session_attrs["listando_libros"] = False
+                if mostrados:
+                    speak_output = "Esos son todos los libros. " + get_random_phrase(ALGO_MAS)
+                else:
+                    speak_output = f"No encontré libros{titulo_filtro}. " + get_random_phrase(ALGO_MAS)
                 return (
                     handler_input.response_builder
                         .speak(speak_output)
@@ -66,20 +87,16 @@ class ListarLibrosIntentHandler(AbstractRequestHandler):
                         .response
                 )
             
-            # Paginación
-            pagina_actual = session_attrs.get("pagina_libros", 0)
-            inicio = pagina_actual * LIBROS_POR_PAGINA
-            fin = min(inicio + LIBROS_POR_PAGINA, len(libros_filtrados))
-            
             # Si son 10 o menos, listar todos
-            if len(libros_filtrados) <= LIBROS_POR_PAGINA:
-                speak_output = f"Tienes {len(libros_filtrados)} libros{titulo_filtro}: "
-                titulos = [f"'{l.get('titulo', 'Sin título')}'" for l in libros_filtrados]
+            if mostrados == 0 and total <= LIBROS_POR_PAGINA:
+                speak_output = f"Tienes {len(libros_pagina)} libros{titulo_filtro}: "
+                titulos = [f"'{l.get('titulo', 'Sin título')}'" for l in libros_pagina]
                 speak_output += ", ".join(titulos) + ". "
                 speak_output += get_random_phrase(ALGO_MAS)
                 
                 # Limpiar paginación
-                session_attrs["pagina_libros"] = 0
+                session_attrs.pop("cursor_libros", None)
+                session_attrs["listando_libros"] = False
                 
                 return (
                     handler_input.response_builder
@@ -89,27 +106,28 @@ class ListarLibrosIntentHandler(AbstractRequestHandler):
                 )
             
             # Si son más de 10, paginar
-            libros_pagina = libros_filtrados[inicio:fin]
+            inicio = mostrados
+            fin = mostrados + len(libros_pagina)
             
-            if pagina_actual == 0:
-                speak_output = f"Tienes {len(libros_filtrados)} libros{titulo_filtro}. "
+            if mostrados == 0:
+                speak_output = f"Tienes {total} libros{titulo_filtro}. "
                 speak_output += f"Te los voy a mostrar de {LIBROS_POR_PAGINA} en {LIBROS_POR_PAGINA}. "
             else:
-                speak_output = f"Página {pagina_actual + 1}. "
+                speak_output = f"Página {mostrados // LIBROS_POR_PAGINA + 1}. "
             
             speak_output += f"Libros del {inicio + 1} al {fin}: "
             titulos = [f"'{l.get('titulo', 'Sin título')}'" for l in libros_pagina]
             speak_output += ", ".join(titulos) + ". "
             
-            if fin < len(libros_filtrados):
-                speak_output += f"Quedan {len(libros_filtrados) - fin} libros más. Di 'siguiente' para continuar o 'salir' para terminar."
-                session_attrs["pagina_libros"] = pagina_actual + 1
+            if fin < total:
+                speak_output += f"Quedan {total - fin} libros más. Di 'siguiente' para continuar o 'salir' para terminar."
+                cursor = dict(cursor, u=libros_pagina[-1].get("id"), p=posicion, n=fin, t=total, v=version)
+                session_attrs["cursor_libros"] = codificar_cursor(cursor)
                 session_attrs["listando_libros"] = True
-                session_attrs["libros_filtrados"] = libros_filtrados
                 ask_output = "¿Quieres ver más libros? Di 'siguiente' o 'salir'."
             else:
                 speak_output += "Esos son todos los libros. " + get_random_phrase(ALGO_MAS)
-                session_attrs["pagina_libros"] = 0
+                session_attrs.pop("cursor_libros", None)
                 session_attrs["listando_libros"] = False
                 ask_output = get_random_phrase(PREGUNTAS_QUE_HACER)
             
@@ -128,4 +146,18 @@ class ListarLibrosIntentHandler(AbstractRequestHandler):
                     .speak("Hubo un problema consultando tu biblioteca. ¿Intentamos de nuevo?")
                     .ask("¿Qué te gustaría hacer?")
                     .response
-            )
\ No newline at end of file
+            )
+
+    @staticmethod
+    def _filtro(cursor, libros, contadores):
+        """(incluir(libro), texto para la respuesta, contar()) según el filtro del cursor"""
+        if cursor.get("f") == "autor":
+            # El índice por usuario resuelve el autor sin recorrer la biblioteca
+            del_autor = {id(l) for l in buscar_libros_por_autor(libros, cursor.get("a"))}
+            return (lambda l: id(l) in del_autor), f" de {cursor.get('a')}", (lambda: len(del_autor))
+        if cursor.get("f") in ("prestados", "disponibles"):
+            # Los contadores de estadisticas ya saben cuáles y cuántos hay en cada estado
+            estado = cursor["f"]
+            ids = contadores[f"ids_{estado}"]
+            return (lambda l: l.get("id") in ids), f" {estado}", (lambda: contadores[estado])
+        return (lambda l: True), "", (lambda: len(libros))
\ No newline at end of file
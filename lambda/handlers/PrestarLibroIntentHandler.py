@@ -2,21 +2,41 @@ import logging
 import ask_sdk_core.utils as ask_utils
 import random
 from ask_sdk_core.dispatch_components import AbstractRequestHandler
-from datetime import datetime, timedelta
 
 from database.database import DatabaseManager
-from utility.utils import get_random_phrase, generar_id_unico, generar_id_prestamo, buscar_libro_por_titulo_exacto, sincronizar_estados_libros
+from utility.utils import get_random_phrase, generar_id_unico, generar_id_prestamo, buscar_libro_con_puntaje, sincronizar_estados_libros, respondiendo_confirmacion
+from utility.contadores import obtener_contadores, contar_prestamo
+from utility.vencimientos import indexar_prestamo
+from utility.tiempo import SEGUNDOS_POR_DIA, reloj, para_voz
 from constants.constants import CONFIRMACIONES, ALGO_MAS, PREGUNTAS_QUE_HACER
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+def _ejemplos_disponibles(libros, ids_disponibles, cuantos=2):
+    """Títulos de los primeros libros disponibles; se deja de recorrer al tenerlos"""
+    ejemplos = []
+    for l in libros:
+        if l.get("id") in ids_disponibles:
+            ejemplos.append(l.get("titulo"))
+            if len(ejemplos) == cuantos:
+                break
+    return ejemplos
+
+def confirmando_prestamo(handler_input):
+    """Si el usuario responde sí o no a "¿Quieres prestar...?" """
+    return respondiendo_confirmacion(handler_input, "confirmar_prestar")
+
 class PrestarLibroIntentHandler(AbstractRequestHandler):
     def can_handle(self, handler_input):
-        return ask_utils.is_intent_name("PrestarLibroIntent")(handler_input)
+        return (ask_utils.is_intent_name("PrestarLibroIntent")(handler_input) or
+                confirmando_prestamo(handler_input))
 
     def handle(self, handler_input):
         try:
+            if confirmando_prestamo(handler_input):
+                return self._confirmar(handler_input)
+
             titulo = ask_utils.get_slot_value(handler_input, "titulo")
             nombre_persona = ask_utils.get_slot_value(handler_input, "nombre_persona")
 
@@ -39,19 +59,16 @@ class PrestarLibroIntentHandler(AbstractRequestHandler):
             user_data = sincronizar_estados_libros(user_data)
             
             libros = user_data.get("libros_disponibles", [])
-            prestamos = user_data.get("prestamos_activos", [])
 
             # Buscar el libro específico
-            libro = buscar_libro_por_titulo_exacto(libros, titulo)
+            libro, puntaje = buscar_libro_con_puntaje(libros, titulo)
             
             if not libro:
                 speak_output = f"Hmm, no encuentro '{titulo}' en tu biblioteca. "
                 if libros:
                     # Mostrar solo libros disponibles (no prestados)
-                    ids_prestados = [p.get("libro_id") for p in prestamos]
-                    disponibles = [l for l in libros if l.get("id") not in ids_prestados]
-                    if disponibles:
-                        ejemplos = [l.get("titulo") for l in disponibles[:2]]
+                    ejemplos = _ejemplos_disponibles(libros, obtener_contadores(user_data)["ids_disponibles"])
+                    if ejemplos:
                         speak_output += f"Tienes disponibles: {', '.join(ejemplos)}. ¿Cuál quieres prestar?"
                     else:
                         speak_output += "Todos tus libros están prestados actualmente."
@@ -65,98 +82,141 @@ class PrestarLibroIntentHandler(AbstractRequestHandler):
                         .response
                 )
 
-            # Verificar que el libro tiene ID
-            if not libro.get("id"):
-                libro["id"] = generar_id_unico()
-                # Actualizar el libro en la lista
-                for idx, l in enumerate(libros):
-                    if l.get("titulo") == libro.get("titulo"):
-                        libros[idx]["id"] = libro["id"]
-                        break
-
-            # Verificar si ESTE libro específico ya está prestado
-            libro_ya_prestado = False
-            prestamo_existente = None
-            for p in prestamos:
-                if p.get("libro_id") == libro.get("id"):
-                    libro_ya_prestado = True
-                    prestamo_existente = p
-                    break
-
-            if libro_ya_prestado:
-                speak_output = f"'{libro['titulo']}' ya está prestado a {prestamo_existente.get('persona', 'alguien')}. "
-                # Sugerir otros libros disponibles
-                ids_prestados = [p.get("libro_id") for p in prestamos]
-                disponibles = [l for l in libros if l.get("id") not in ids_prestados]
-                if disponibles:
-                    speak_output += "¿Quieres prestar otro libro? "
-                    ejemplos = [l.get("titulo") for l in disponibles[:2]]
-                    speak_output += f"Tienes disponibles: {', '.join(ejemplos)}."
-                else:
-                    speak_output += "No tienes más libros disponibles para prestar."
-                
+            if puntaje < 1.0:
+                # Solo parecido: se pregunta antes de registrar el préstamo
+                session_attrs = handler_input.attributes_manager.session_attributes
+                session_attrs["esperando"] = "confirmar_prestar"
+                session_attrs["prestar_libro_id"] = libro.get("id")
+                session_attrs["prestar_libro_titulo"] = libro.get("titulo")
+                session_attrs["prestar_persona"] = nombre_persona
+                pregunta = f"¿Quieres prestar '{libro.get('titulo')}'?"
                 return (
                     handler_input.response_builder
-                        .speak(speak_output)
-                        .ask("¿Qué otro libro quieres prestar?")
+                        .speak(f"No tengo un libro llamado exactamente '{titulo}'. {pregunta}")
+                        .ask(pregunta)
                         .response
                 )
 
-            # Crear préstamo
-            prestamo = {
-                "id": generar_id_prestamo(),
-                "libro_id": libro["id"],
-                "titulo": libro["titulo"],
-                "persona": nombre_persona if nombre_persona else "un amigo",
-                "fecha_prestamo": datetime.now().isoformat(),
-                "fecha_limite": (datetime.now() + timedelta(days=7)).isoformat(),
-                "estado": "activo"
-            }
-
-            prestamos.append(prestamo)
-            user_data["prestamos_activos"] = prestamos
-            
-            # Marcar el libro como prestado
-            for l in libros:
-                if l.get("id") == libro.get("id"):
-                    l["estado"] = "prestado"
-                    l["total_prestamos"] = l.get("total_prestamos", 0) + 1
-                    break
-
-            stats = user_data.get("estadisticas", {})
-            stats["total_prestamos"] = stats.get("total_prestamos", 0) + 1
-
-            DatabaseManager.save_user_data(handler_input, user_data)
+            return self._prestar(handler_input, user_data, libro, nombre_persona)
+        except Exception as e:
+            logger.error(f"Error en PrestarLibro: {e}", exc_info=True)
+            return (
+                handler_input.response_builder
+                    .speak("Ups, tuve un problema registrando el préstamo. ¿Lo intentamos de nuevo?")
+                    .ask("¿Qué libro quieres prestar?")
+                    .response
+            )
 
-            # Respuesta natural
-            confirmacion = get_random_phrase(CONFIRMACIONES)
-            persona_text = f" a {nombre_persona}" if nombre_persona else ""
-            fecha_limite = datetime.fromisoformat(prestamo['fecha_limite']).strftime("%d de %B")
-            
-            speak_output = f"{confirmacion} He registrado el préstamo de '{libro['titulo']}'{persona_text}. "
-            speak_output += f"La fecha de devolución es el {fecha_limite}. "
-            
-            # Informar cuántos libros disponibles quedan
-            ids_prestados = [p.get("libro_id") for p in prestamos]
-            disponibles = len([l for l in libros if l.get("id") not in ids_prestados])
-            if disponibles > 0:
-                speak_output += f"Te quedan {disponibles} libros disponibles. "
-            else:
-                speak_output += "Ya no tienes más libros disponibles para prestar. "
-            
-            speak_output += get_random_phrase(ALGO_MAS)
+    def _confirmar(self, handler_input):
+        """Respuesta a "¿Quieres prestar...?": el libro se vuelve a buscar por
+        id, por si cambió la biblioteca desde la pregunta"""
+        session_attrs = handler_input.attributes_manager.session_attributes
+        libro_id = session_attrs.get("prestar_libro_id")
+        titulo = session_attrs.get("prestar_libro_titulo")
+        nombre_persona = session_attrs.get("prestar_persona")
+        handler_input.attributes_manager.session_attributes = {}
+
+        if ask_utils.is_intent_name("AMAZON.NoIntent")(handler_input):
+            speak = "De acuerdo, no registré ningún préstamo. " + get_random_phrase(ALGO_MAS)
+            return (
+                handler_input.response_builder
+                    .speak(speak)
+                    .ask(get_random_phrase(PREGUNTAS_QUE_HACER))
+                    .response
+            )
 
+        user_data = sincronizar_estados_libros(DatabaseManager.get_user_data(handler_input))
+        libro = next((l for l in user_data.get("libros_disponibles", []) if isinstance(l, dict)
+                      and l.get("id") == libro_id and l.get("titulo") == titulo), None)
+        if not libro:
+            speak = f"'{titulo}' ya no está en tu biblioteca. " + get_random_phrase(ALGO_MAS)
             return (
                 handler_input.response_builder
-                    .speak(speak_output)
+                    .speak(speak)
                     .ask(get_random_phrase(PREGUNTAS_QUE_HACER))
                     .response
             )
-        except Exception as e:
-            logger.error(f"Error en PrestarLibro: {e}", exc_info=True)
+        return self._prestar(handler_input, user_data, libro, nombre_persona)
+
+    def _prestar(self, handler_input, user_data, libro, nombre_persona):
+        libros = user_data.get("libros_disponibles", [])
+        prestamos = user_data.get("prestamos_activos", [])
+        contadores = obtener_contadores(user_data)
+        ids_disponibles = contadores["ids_disponibles"]
+
+        # Verificar que el libro tiene ID
+        if not libro.get("id"):
+            libro["id"] = generar_id_unico()
+            # Actualizar el libro en la lista
+            for idx, l in enumerate(libros):
+                if l.get("titulo") == libro.get("titulo"):
+                    libros[idx]["id"] = libro["id"]
+                    break
+
+        # Verificar si ESTE libro específico ya está prestado
+        if libro.get("id") in contadores["ids_prestados"]:
+            prestamo_existente = next((p for p in prestamos if p.get("libro_id") == libro.get("id")), {})
+            speak_output = f"'{libro['titulo']}' ya está prestado a {prestamo_existente.get('persona', 'alguien')}. "
+            # Sugerir otros libros disponibles
+            ejemplos = _ejemplos_disponibles(libros, ids_disponibles)
+            if ejemplos:
+                speak_output += "¿Quieres prestar otro libro? "
+                speak_output += f"Tienes disponibles: {', '.join(ejemplos)}."
+            else:
+                speak_output += "No tienes más libros disponibles para prestar."
+            
             return (
                 handler_input.response_builder
-                    .speak("Ups, tuve un problema registrando el préstamo. ¿Lo intentamos de nuevo?")
-                    .ask("¿Qué libro quieres prestar?")
+                    .speak(speak_output)
+                    .ask("¿Qué otro libro quieres prestar?")
                     .response
-            )
\ No newline at end of file
+            )
+
+        # Crear préstamo
+        prestamo = {
+            "id": generar_id_prestamo(reloj(handler_input)),
+            "libro_id": libro["id"],
+            "titulo": libro["titulo"],
+            "persona": nombre_persona if nombre_persona else "un amigo",
+            "fecha_prestamo": reloj(handler_input),
+            "fecha_limite": reloj(handler_input) + 7 * SEGUNDOS_POR_DIA,
+            "estado": "activo"
+        }
+
+        prestamos.append(prestamo)
+        indexar_prestamo(prestamos, prestamo)
+        user_data["prestamos_activos"] = prestamos
+        
+        # Marcar el libro como prestado
+        libro["estado"] = "prestado"
+        libro["total_prestamos"] = libro.get("total_prestamos", 0) + 1
+
+        stats = user_data.get("estadisticas", {})
+        stats["total_prestamos"] = stats.get("total_prestamos", 0) + 1
+        contar_prestamo(user_data, libro["id"])
+
+        DatabaseManager.save_user_data(handler_input, user_data)
+
+        # Respuesta natural
+        confirmacion = get_random_phrase(CONFIRMACIONES)
+        persona_text = f" a {nombre_persona}" if nombre_persona else ""
+        fecha_limite = para_voz(prestamo['fecha_limite'])
+        
+        speak_output = f"{confirmacion} He registrado el préstamo de '{libro['titulo']}'{persona_text}. "
+        speak_output += f"La fecha de devolución es el {fecha_limite}. "
+        
+        # Informar cuántos libros disponibles quedan
+        disponibles = contadores["disponibles"]
+        if disponibles > 0:
+            speak_output += f"Te quedan {disponibles} libros disponibles. "
+        else:
+            speak_output += "Ya no tienes más libros disponibles para prestar. "
+        
+        speak_output += get_random_phrase(ALGO_MAS)
+
+        return (
+            handler_input.response_builder
+                .speak(speak_output)
+                .ask(get_random_phrase(PREGUNTAS_QUE_HACER))
+                .response
+        )
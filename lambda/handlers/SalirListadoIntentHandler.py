@@ -11,7 +11,7 @@ class SalirListadoIntentHandler(AbstractRequestHandler):
     def handle(self, handler_input):
         # Limpiar estado de paginación
         session_attrs = handler_input.attributes_manager.session_attributes
-        session_attrs["pagina_libros"] = 0
+        session_attrs.pop("cursor_libros", None)
         session_attrs["listando_libros"] = False
         
         speak_output = "De acuerdo, terminé de mostrar los libros. " + get_random_phrase(ALGO_MAS)
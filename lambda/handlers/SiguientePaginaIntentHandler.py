@@ -4,6 +4,7 @@ import ask_sdk_core.utils as ask_utils
 
 # Asegúrate de tener acceso al handler que maneja la lista de libros
 from handlers.ListarLibrosIntentHandler import ListarLibrosIntentHandler
+from utility.paginacion import decodificar_cursor
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -15,8 +16,9 @@ class SiguientePaginaIntentHandler(AbstractRequestHandler):
     def handle(self, handler_input):
         try:
             session_attrs = handler_input.attributes_manager.session_attributes
+            cursor = decodificar_cursor(session_attrs.get("cursor_libros"))
             
-            if not session_attrs.get("listando_libros"):
+            if not session_attrs.get("listando_libros") or cursor is None:
                 speak_output = "No estoy mostrando una lista en este momento. ¿Quieres ver tus libros?"
                 return (
                     handler_input.response_builder
@@ -25,9 +27,9 @@ class SiguientePaginaIntentHandler(AbstractRequestHandler):
                         .response
                 )
             
-            # Continuar con la paginación
+            # Continuar con la paginación, con el mismo filtro
             handler = ListarLibrosIntentHandler()
-            return handler.handle(handler_input)
+            return handler.listar(handler_input, cursor)
             
         except Exception as e:
             logger.error(f"Error en SiguientePagina: {e}", exc_info=True)
@@ -0,0 +1,8 @@
+from ask_sdk_core.dispatch_components import AbstractRequestInterceptor
+
+from database.archivo import ArchivoConversaciones
+
+class ArchivoConversacionesRequestInterceptor(AbstractRequestInterceptor):
+    """Reanuda en segundo plano los lotes de archivo que quedaron de la invocación anterior"""
+    def process(self, handler_input):
+        ArchivoConversaciones.vaciar_en_segundo_plano()
@@ -0,0 +1,12 @@
+from ask_sdk_core.dispatch_components import AbstractResponseInterceptor
+
+from database.archivo import ArchivoConversaciones
+
+class ArchivoConversacionesResponseInterceptor(AbstractResponseInterceptor):
+    """Encola el lote de conversaciones propuesto en este request y lo escribe
+    en segundo plano. Va después de UnidadDeTrabajoResponseInterceptor, y los
+    interceptores de respuesta no corren si el request falló: solo se archiva
+    lo que salió de un documento confirmado"""
+    def process(self, handler_input, response):
+        ArchivoConversaciones.confirmar(handler_input)
+        ArchivoConversaciones.vaciar_en_segundo_plano()
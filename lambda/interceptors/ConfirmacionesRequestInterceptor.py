@@ -0,0 +1,13 @@
+import ask_sdk_core.utils as ask_utils
+from ask_sdk_core.dispatch_components import AbstractRequestInterceptor
+
+from utility.utils import descartar_confirmacion
+
+class ConfirmacionesRequestInterceptor(AbstractRequestInterceptor):
+    """Si quedó pendiente un "¿Quieres eliminar/prestar/devolver...?" y el
+    usuario pasó a otra cosa en vez de responder sí o no, olvida la pregunta"""
+    def process(self, handler_input):
+        if (ask_utils.is_intent_name("AMAZON.YesIntent")(handler_input) or
+                ask_utils.is_intent_name("AMAZON.NoIntent")(handler_input)):
+            return
+        descartar_confirmacion(handler_input.attributes_manager.session_attributes)
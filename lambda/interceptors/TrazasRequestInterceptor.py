@@ -0,0 +1,11 @@
+from ask_sdk_core.dispatch_components import AbstractRequestInterceptor
+
+from utility.trazas import Trazador
+
+class TrazasRequestInterceptor(AbstractRequestInterceptor):
+    """Abre la traza del request; se registra antes que los demás interceptores"""
+    def process(self, handler_input):
+        request = handler_input.request_envelope.request
+        intent = getattr(request, "intent", None)
+        Trazador.iniciar(intent.name if intent is not None else request.object_type,
+                         request_id=request.request_id)
@@ -0,0 +1,11 @@
+from ask_sdk_core.dispatch_components import AbstractResponseInterceptor
+
+from utility.trazas import Trazador
+
+class TrazasResponseInterceptor(AbstractResponseInterceptor):
+    """Cierra la traza y emite la línea EMF. Se registra al final para que el
+    tramo `respuesta` cubra los interceptores de respuesta (confirmar la unidad
+    de trabajo, archivo de conversaciones)"""
+    def process(self, handler_input, response):
+        Trazador.sumar_desde("fin_handler", "respuesta")
+        Trazador.finalizar()
@@ -0,0 +1,13 @@
+from ask_sdk_core.dispatch_components import AbstractRequestInterceptor
+
+from database.database import DatabaseManager
+
+class UnidadDeTrabajoRequestInterceptor(AbstractRequestInterceptor):
+    """Abre una unidad de trabajo por request: el documento del usuario se
+    carga de forma perezosa en el primer get_user_data. Antes escribe las
+    escrituras diferidas y los refrescos de cache que quedaron de la
+    invocación anterior"""
+    def process(self, handler_input):
+        DatabaseManager.vaciar_diferidas(handler_input)
+        DatabaseManager.refrescar_pendientes(al_iniciar=True)
+        DatabaseManager.iniciar_unidad(handler_input)
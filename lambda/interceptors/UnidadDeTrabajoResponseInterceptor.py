@@ -0,0 +1,12 @@
+from ask_sdk_core.dispatch_components import AbstractResponseInterceptor
+
+from database.database import DatabaseManager
+
+class UnidadDeTrabajoResponseInterceptor(AbstractResponseInterceptor):
+    """Confirma la unidad de trabajo: a lo más una escritura por request.
+    Después lanza el refresco de lo que se sirvió obsoleto del cache y el
+    vaciado de las escrituras diferidas"""
+    def process(self, handler_input, response):
+        DatabaseManager.finalizar_unidad(handler_input)
+        DatabaseManager.refrescar_pendientes()
+        DatabaseManager.vaciar_diferidas_en_segundo_plano()
@@ -1,90 +1,147 @@
-import os
-import json
-import logging
-from datetime import datetime, timedelta
-import random
-import uuid
-
-import ask_sdk_core.utils as ask_utils
-from ask_sdk_core.skill_builder import CustomSkillBuilder
-from ask_sdk_core.dispatch_components import AbstractRequestHandler, AbstractExceptionHandler
-from ask_sdk_model import Response, DialogState
-from ask_sdk_model.dialog import ElicitSlotDirective, DelegateDirective
-from ask_sdk_s3.adapter import S3Adapter
-
-import boto3
-from botocore.exceptions import ClientError
-
-from database.database import FakeS3Adapter
-from configuration.configurations import USE_FAKE_S3
-
-from handlers.LaunchRequestHandler import LaunchRequestHandler
-from handlers.AgregarLibroIntentHandler import AgregarLibroIntentHandler
-from handlers.MostrarOpcionesIntentHandler import MostrarOpcionesIntentHandler
-from handlers.ContinuarAgregarHandler import ContinuarAgregarHandler
-from handlers.ListarLibrosIntentHandler import ListarLibrosIntentHandler
-from handlers.PrestarLibroIntentHandler import PrestarLibroIntentHandler
-from handlers.LimpiarCacheIntentHandler import LimpiarCacheIntentHandler
-from handlers.SiguientePaginaIntentHandler import SiguientePaginaIntentHandler
-from handlers.SalirListadoIntentHandler import SalirListadoIntentHandler
-from handlers.HelpIntentHandler import HelpIntentHandler
-from handlers.CancelOrStopIntentHandler import CancelOrStopIntentHandler
-from handlers.FallbackIntentHandler import FallbackIntentHandler
-from handlers.SessionEndedRequestHandler import SessionEndedRequestHandler
-from handlers.CatchAllExceptionHandler import CatchAllExceptionHandler
-from handlers.BuscarLibroIntentHandler import BuscarLibroIntentHandler
-from handlers.DevolverLibroIntentHandler import DevolverLibroIntentHandler
-from handlers.ConsultarPrestamosIntentHandler import ConsultarPrestamosIntentHandler
-from handlers.ConsultarDevueltosIntentHandler import ConsultarDevueltosIntentHandler
-from handlers.EliminarLibroIntentHandler import EliminarLibroIntentHandler
-
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-
-# ==============================
-# Inicializar persistence adapter
-# ==============================
-if USE_FAKE_S3:
-    persistence_adapter = FakeS3Adapter()
-else:
-    s3_bucket = os.environ.get("S3_PERSISTENCE_BUCKET")
-    if not s3_bucket:
-        raise RuntimeError("S3_PERSISTENCE_BUCKET es requerido cuando USE_FAKE_S3=false")
-    logger.info(f"🪣 Usando S3Adapter con bucket: {s3_bucket}")
-    persistence_adapter = S3Adapter(bucket_name=s3_bucket)
-
-sb = CustomSkillBuilder(persistence_adapter=persistence_adapter)
-
-# ==============================
-# Registrar handlers - ORDEN CRÍTICO
-# ==============================
-sb.add_request_handler(LaunchRequestHandler())
-sb.add_request_handler(MostrarOpcionesIntentHandler())
-
-# ContinuarAgregarHandler DEBE ir ANTES que otros handlers para interceptar respuestas
-sb.add_request_handler(ContinuarAgregarHandler())
-
-# Luego AgregarLibroIntentHandler
-sb.add_request_handler(AgregarLibroIntentHandler())
-sb.add_request_handler(EliminarLibroIntentHandler())
-
-# Luego los demás handlers
-sb.add_request_handler(ListarLibrosIntentHandler())
-sb.add_request_handler(BuscarLibroIntentHandler())
-sb.add_request_handler(PrestarLibroIntentHandler())
-sb.add_request_handler(DevolverLibroIntentHandler())
-sb.add_request_handler(ConsultarPrestamosIntentHandler())
-sb.add_request_handler(ConsultarDevueltosIntentHandler())
-sb.add_request_handler(LimpiarCacheIntentHandler())
-sb.add_request_handler(SiguientePaginaIntentHandler())
-sb.add_request_handler(SalirListadoIntentHandler())
-sb.add_request_handler(HelpIntentHandler())
-sb.add_request_handler(CancelOrStopIntentHandler())
-sb.add_request_handler(FallbackIntentHandler())
-sb.add_request_handler(SessionEndedRequestHandler())
-
-# Exception handler
-sb.add_exception_handler(CatchAllExceptionHandler())
-
-# Lambda handler
-lambda_handler = sb.lambda_handler()
+import os
+import logging
+import importlib
+
+import ask_sdk_core.utils as ask_utils
+from ask_sdk_core.skill_builder import CustomSkillBuilder
+
+from database.database import DatabaseManager, FakeS3Adapter
+from database.archivo import ArchivoConversaciones
+from database.almacen import AlmacenMemoria, AlmacenS3
+from database.fragmentos import ShardedS3Adapter
+from database.codec import CodecS3Adapter, obtener_codec
+from database.perezoso import PersistenciaPerezosa
+from configuration.configurations import USE_FAKE_S3, USE_SHARDED_S3, LAZY_IMPORTS, ENABLE_TRACING, PERSISTENCE_CODEC
+
+from handlers.HandlerPerezoso import HandlerPerezoso
+from handlers.HandlerTrazado import HandlerTrazado
+from handlers.HandlerConReintentos import HandlerConReintentos
+from handlers.CatchAllExceptionHandler import CatchAllExceptionHandler
+
+from interceptors.TrazasRequestInterceptor import TrazasRequestInterceptor
+from interceptors.TrazasResponseInterceptor import TrazasResponseInterceptor
+from interceptors.ConfirmacionesRequestInterceptor import ConfirmacionesRequestInterceptor
+from interceptors.UnidadDeTrabajoRequestInterceptor import UnidadDeTrabajoRequestInterceptor
+from interceptors.UnidadDeTrabajoResponseInterceptor import UnidadDeTrabajoResponseInterceptor
+from interceptors.ArchivoConversacionesRequestInterceptor import ArchivoConversacionesRequestInterceptor
+from interceptors.ArchivoConversacionesResponseInterceptor import ArchivoConversacionesResponseInterceptor
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# ==============================
+# Inicializar persistence adapter
+# ==============================
+if USE_FAKE_S3:
+    almacen = AlmacenMemoria()
+else:
+    s3_bucket = os.environ.get("S3_PERSISTENCE_BUCKET")
+    if not s3_bucket:
+        raise RuntimeError("S3_PERSISTENCE_BUCKET es requerido cuando USE_FAKE_S3=false")
+    almacen = AlmacenS3(s3_bucket)
+
+def crear_persistence_adapter():
+    if USE_SHARDED_S3:
+        # Lee el formato de un solo objeto y lo migra a fragmentos al escribir
+        logger.info("🪣 Usando ShardedS3Adapter")
+        return ShardedS3Adapter(almacen)
+    codec = obtener_codec(PERSISTENCE_CODEC)
+    if USE_FAKE_S3:
+        return FakeS3Adapter(codec)
+    # Mismas claves que S3Adapter; con codec "json" también los mismos bytes,
+    # y lee JSON legado con cualquier codec configurado
+    logger.info(f"🪣 Usando CodecS3Adapter ({codec.nombre}) con bucket: {s3_bucket}")
+    return CodecS3Adapter(almacen, codec)
+
+if LAZY_IMPORTS:
+    # boto3 y el SDK de S3 se importan en el primer request que persiste algo
+    persistence_adapter = PersistenciaPerezosa(crear_persistence_adapter)
+else:
+    persistence_adapter = crear_persistence_adapter()
+
+DatabaseManager.configurar(persistence_adapter)
+ArchivoConversaciones.configurar(almacen)
+
+sb = CustomSkillBuilder(persistence_adapter=persistence_adapter)
+
+# ==============================
+# Registrar handlers - ORDEN CRÍTICO
+# ==============================
+def _agregando_libro(handler_input):
+    return bool(handler_input.attributes_manager.session_attributes.get("agregando_libro"))
+
+def _cancelar_o_parar(handler_input):
+    return (ask_utils.is_intent_name("AMAZON.CancelIntent")(handler_input) or
+            ask_utils.is_intent_name("AMAZON.StopIntent")(handler_input))
+
+def _con_confirmacion(intent, esperando):
+    # El intent, o el sí/no a su pregunta de confirmación ("¿Quieres eliminar...?")
+    def filtro(handler_input):
+        return (ask_utils.is_intent_name(intent)(handler_input) or
+                handler_input.attributes_manager.session_attributes.get("esperando") == esperando)
+    return filtro
+
+def _sin_handler_propio(handler_input):
+    # Un sí/no fuera de una confirmación se trata como no entendido
+    return (ask_utils.is_intent_name("AMAZON.FallbackIntent")(handler_input) or
+            ask_utils.is_intent_name("AMAZON.YesIntent")(handler_input) or
+            ask_utils.is_intent_name("AMAZON.NoIntent")(handler_input))
+
+# (clase en handlers/<clase>.py, condición barata que el handler necesita para aceptar)
+HANDLERS = [
+    ("LaunchRequestHandler", ask_utils.is_request_type("LaunchRequest")),
+    ("MostrarOpcionesIntentHandler", ask_utils.is_intent_name("MostrarOpcionesIntent")),
+
+    # ContinuarAgregarHandler DEBE ir ANTES que otros handlers para interceptar respuestas
+    ("ContinuarAgregarHandler", _agregando_libro),
+
+    # Luego AgregarLibroIntentHandler
+    ("AgregarLibroIntentHandler", ask_utils.is_intent_name("AgregarLibroIntent")),
+    ("EliminarLibroIntentHandler", _con_confirmacion("EliminarLibroIntent", "confirmar_eliminar")),
+
+    # Luego los demás handlers
+    ("ListarLibrosIntentHandler", ask_utils.is_intent_name("ListarLibrosIntent")),
+    ("BuscarLibroIntentHandler", ask_utils.is_intent_name("BuscarLibroIntent")),
+    ("PrestarLibroIntentHandler", _con_confirmacion("PrestarLibroIntent", "confirmar_prestar")),
+    ("DevolverLibroIntentHandler", _con_confirmacion("DevolverLibroIntent", "confirmar_devolver")),
+    ("ConsultarPrestamosIntentHandler", ask_utils.is_intent_name("ConsultarPrestamosIntent")),
+    ("ConsultarDevueltosIntentHandler", ask_utils.is_intent_name("ConsultarDevueltosIntent")),
+    ("LimpiarCacheIntentHandler", ask_utils.is_intent_name("LimpiarCacheIntent")),
+    ("SiguientePaginaIntentHandler", ask_utils.is_intent_name("SiguientePaginaIntent")),
+    ("SalirListadoIntentHandler", ask_utils.is_intent_name("SalirListadoIntent")),
+    ("HelpIntentHandler", ask_utils.is_intent_name("AMAZON.HelpIntent")),
+    ("CancelOrStopIntentHandler", _cancelar_o_parar),
+    ("FallbackIntentHandler", _sin_handler_propio),
+    ("SessionEndedRequestHandler", ask_utils.is_request_type("SessionEndedRequest")),
+]
+
+for clase, filtro in HANDLERS:
+    if LAZY_IMPORTS:
+        # El módulo del handler se importa la primera vez que le toca un request
+        handler = HandlerPerezoso(f"handlers.{clase}", clase, filtro)
+    else:
+        handler = getattr(importlib.import_module(f"handlers.{clase}"), clase)()
+    # Escrituras condicionales: ante un conflicto se recarga y se reaplica el handler
+    handler = HandlerConReintentos(handler)
+    sb.add_request_handler(HandlerTrazado(handler) if ENABLE_TRACING else handler)
+
+# Exception handler
+sb.add_exception_handler(CatchAllExceptionHandler())
+
+# Trazas: la de request va antes que todos y la de response al final
+sb.add_global_request_interceptor(TrazasRequestInterceptor())
+
+# Una pregunta de sí o no sin responder no sobrevive a otro intent
+sb.add_global_request_interceptor(ConfirmacionesRequestInterceptor())
+
+# Unidad de trabajo: una lectura y una escritura de persistencia por request
+sb.add_global_request_interceptor(UnidadDeTrabajoRequestInterceptor())
+sb.add_global_response_interceptor(UnidadDeTrabajoResponseInterceptor())
+
+# Archivo de conversaciones: se escribe después de confirmar el documento
+sb.add_global_request_interceptor(ArchivoConversacionesRequestInterceptor())
+sb.add_global_response_interceptor(ArchivoConversacionesResponseInterceptor())
+sb.add_global_response_interceptor(TrazasResponseInterceptor())
+
+# Lambda handler
+lambda_handler = sb.lambda_handler()
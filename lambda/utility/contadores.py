@@ -0,0 +1,126 @@
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# ==============================
+# Contadores mantenidos en estadisticas
+# ==============================
+# estadisticas["contadores"] se actualiza en O(1) al agregar, prestar, devolver
+# y eliminar, para no recorrer la biblioteca en cada request:
+#   disponibles / prestados: cuántos libros hay en cada estado
+#   por_autor / por_tipo:    libros por autor y por tipo (género)
+#   ids_disponibles / ids_prestados: {id: 1}, conjuntos serializables en JSON
+# estadisticas["total_libros"] se mantiene junto con ellos.
+# Los documentos anteriores se cuentan una vez, la primera vez que se usan.
+CONTADORES = "contadores"
+
+
+def _autor(libro):
+    return libro.get("autor") or "Desconocido"
+
+
+def _tipo(libro):
+    return libro.get("tipo") or "Sin categoría"
+
+
+def _sumar(mapa, clave, cantidad):
+    valor = mapa.get(clave, 0) + cantidad
+    if valor:
+        mapa[clave] = valor
+    else:
+        mapa.pop(clave, None)
+
+
+def reconstruir_contadores(user_data):
+    """Cuenta todo desde cero a partir de libros_disponibles y prestamos_activos"""
+    ids_con_prestamo = {p.get("libro_id") for p in user_data.get("prestamos_activos", [])}
+    contadores = {"disponibles": 0, "prestados": 0, "por_autor": {}, "por_tipo": {},
+                  "ids_disponibles": {}, "ids_prestados": {}}
+    for libro in user_data.get("libros_disponibles", []):
+        if isinstance(libro, dict):
+            _contar_libro(contadores, libro, libro.get("id") in ids_con_prestamo, 1)
+    return contadores
+
+
+def _contar_libro(contadores, libro, prestado, signo):
+    _sumar(contadores["por_autor"], _autor(libro), signo)
+    _sumar(contadores["por_tipo"], _tipo(libro), signo)
+    estado, ids = ("prestados", "ids_prestados") if prestado else ("disponibles", "ids_disponibles")
+    contadores[estado] += signo
+    if signo > 0:
+        contadores[ids][libro.get("id")] = 1
+    else:
+        contadores[ids].pop(libro.get("id"), None)
+
+
+def obtener_contadores(user_data):
+    """Los contadores del documento; si no los tiene, se cuentan ahora"""
+    stats = user_data.setdefault("estadisticas", {})
+    contadores = stats.get(CONTADORES)
+    if contadores is None:
+        contadores = stats[CONTADORES] = reconstruir_contadores(user_data)
+        stats["total_libros"] = len(user_data.get("libros_disponibles", []))
+    return contadores
+
+
+def contar_alta(user_data, libro):
+    """Después de agregar `libro` a libros_disponibles"""
+    contadores = obtener_contadores(user_data)
+    if libro.get("id") in contadores["ids_disponibles"] or libro.get("id") in contadores["ids_prestados"]:
+        return  # Recién contado por obtener_contadores
+    _contar_libro(contadores, libro, False, 1)
+    stats = user_data["estadisticas"]
+    stats["total_libros"] = stats.get("total_libros", 0) + 1
+
+
+def contar_baja(user_data, libro):
+    """Después de quitar `libro` de libros_disponibles"""
+    contadores = obtener_contadores(user_data)
+    libro_id = libro.get("id")
+    if libro_id in contadores["ids_prestados"]:
+        _contar_libro(contadores, libro, True, -1)
+    elif libro_id in contadores["ids_disponibles"]:
+        _contar_libro(contadores, libro, False, -1)
+    else:
+        return  # Recién contado sin él
+    stats = user_data["estadisticas"]
+    stats["total_libros"] = max(stats.get("total_libros", 0) - 1, 0)
+
+
+def contar_prestamo(user_data, libro_id):
+    """Después de registrar el préstamo del libro `libro_id`"""
+    contadores = obtener_contadores(user_data)
+    if contadores["ids_disponibles"].pop(libro_id, None) is not None:
+        contadores["disponibles"] -= 1
+        contadores["prestados"] += 1
+        contadores["ids_prestados"][libro_id] = 1
+
+
+def contar_devolucion(user_data, libro_id):
+    """Después de registrar la devolución del libro `libro_id` (si el libro
+    se eliminó mientras estaba prestado, ya no cuenta en ningún lado)"""
+    contadores = obtener_contadores(user_data)
+    if contadores["ids_prestados"].pop(libro_id, None) is not None:
+        contadores["prestados"] -= 1
+        contadores["disponibles"] += 1
+        contadores["ids_disponibles"][libro_id] = 1
+
+
+def verificar_contadores(user_data, corregir=True):
+    """Compara los contadores mantenidos con los recontados desde cero.
+    Devuelve los nombres de los que difieren (deriva); con `corregir`, los
+    reemplaza por los recontados"""
+    stats = user_data.setdefault("estadisticas", {})
+    mantenidos = dict(stats.get(CONTADORES) or {})
+    mantenidos["total_libros"] = stats.get("total_libros")
+    recontados = reconstruir_contadores(user_data)
+    total = len(user_data.get("libros_disponibles", []))
+    deriva = sorted(nombre for nombre, valor in dict(recontados, total_libros=total).items()
+                    if mantenidos.get(nombre) != valor)
+    if deriva:
+        logger.warning(f"Deriva en contadores de estadisticas: {', '.join(deriva)}")
+        if corregir:
+            stats[CONTADORES] = recontados
+            stats["total_libros"] = total
+    return deriva
@@ -0,0 +1,108 @@
+# ==============================
+# Estructuras derivadas de las listas de un documento (índices)
+# ==============================
+# Se adjuntan a la entrada del documento en el cache de DatabaseManager: se
+# desalojan con ella y su tamaño aproximado cuenta en CACHE_MAX_BYTES. Una
+# lista que no es de ningún documento cacheado (un usuario nuevo antes de su
+# primera escritura, las herramientas) conserva solo la última estructura de
+# cada tipo.
+_SUELTAS = {}
+
+
+class EstructuraDeLista:
+    """Base de los índices sobre una lista del documento. Los helpers que
+    cambian la lista (indexar_libro, desindexar_prestamo...) le avisan cada
+    alta y baja; un aviso que no cuadra con la lista la deja desfasada y se
+    reconstruye la próxima vez que se pide. Un cambio sin aviso se nota si
+    cambia el largo o el último elemento: verificarlo es O(1), no recorre la
+    lista. Las subclases implementan _agregar y _eliminar"""
+    # Memoria aproximada por elemento indexado, medida con tracemalloc
+    BYTES_POR_ELEMENTO = 100
+
+    def __init__(self, lista):
+        self.lista = lista
+        self.desfasada = False
+        self._elementos = {}    # id(elemento) -> elemento, para quitar sin recorrer
+        for elemento in lista:
+            self.agregar(elemento)
+
+    @property
+    def total(self):
+        return len(self._elementos)
+
+    def sincronizado_con(self, lista):
+        if self.lista is not lista or self.desfasada or len(lista) != len(self._elementos):
+            return False
+        return not lista or self._elementos.get(id(lista[-1])) is lista[-1]
+
+    def agregar(self, elemento):
+        self._elementos[id(elemento)] = elemento
+        self._agregar(elemento)
+
+    def eliminar(self, elemento):
+        if self._elementos.get(id(elemento)) is not elemento:
+            self.desfasada = True
+            return
+        del self._elementos[id(elemento)]
+        self._eliminar(elemento)
+
+    def tamano_aproximado(self):
+        return self.BYTES_POR_ELEMENTO * len(self._elementos)
+
+    def _agregar(self, elemento):
+        raise NotImplementedError
+
+    def _eliminar(self, elemento):
+        raise NotImplementedError
+
+
+def _cache():
+    from database.database import DatabaseManager
+    return DatabaseManager.cache
+
+
+def existente(nombre, lista):
+    """La estructura `nombre` de la lista si ya se construyó (aunque no esté al día), o None"""
+    estructura = _cache().derivado(lista, nombre)
+    if estructura is None:
+        estructura = _SUELTAS.get(nombre)
+    return estructura if estructura is not None and estructura.lista is lista else None
+
+
+def obtener(nombre, lista, construir):
+    """La estructura `nombre` de la lista; se construye una sola vez por
+    documento en cache y se reconstruye si la lista cambió sin avisarle"""
+    estructura = existente(nombre, lista)
+    if estructura is not None and estructura.sincronizado_con(lista):
+        return estructura
+    estructura = construir(lista)
+    if _cache().adjuntar(lista, nombre, estructura, estructura.tamano_aproximado()):
+        if _SUELTAS.get(nombre) is not None and _SUELTAS[nombre].lista is lista:
+            del _SUELTAS[nombre]
+    else:
+        _SUELTAS[nombre] = estructura
+    return estructura
+
+
+def avisar_alta(nombres, lista, elemento):
+    """Actualiza en sitio las estructuras después de `lista.append(elemento)`"""
+    for nombre in nombres:
+        estructura = existente(nombre, lista)
+        if estructura is None:
+            continue
+        if estructura.total == len(lista) - 1 and lista[-1] is elemento:
+            estructura.agregar(elemento)
+        else:
+            estructura.desfasada = True
+
+
+def avisar_baja(nombres, lista, elemento):
+    """Actualiza en sitio las estructuras después de quitar `elemento` de la lista"""
+    for nombre in nombres:
+        estructura = existente(nombre, lista)
+        if estructura is None:
+            continue
+        if estructura.total == len(lista) + 1:
+            estructura.eliminar(elemento)
+        else:
+            estructura.desfasada = True
@@ -0,0 +1,84 @@
+import csv
+import json
+import logging
+from datetime import datetime
+
+from utility.tiempo import a_epoch
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# ==============================
+# Exportación de la biblioteca (JSONL / CSV)
+# ==============================
+# Todo sale por generadores que recorren las listas del documento tal como
+# están: se arma una línea (o fila) por registro y se escribe enseguida, sin
+# copiar las listas. Sirve igual para respaldos que para análisis.
+SECCIONES = ("libros_disponibles", "prestamos_activos", "historial_prestamos")
+COLUMNAS = {
+    "libros_disponibles": ("id", "titulo", "autor", "tipo", "estado", "total_prestamos", "fecha_agregado"),
+    "prestamos_activos": ("id", "libro_id", "titulo", "persona", "estado", "fecha_prestamo", "fecha_limite"),
+    "historial_prestamos": ("id", "libro_id", "titulo", "persona", "estado", "fecha_prestamo", "fecha_limite",
+                            "fecha_devolucion"),
+}
+CAMPOS_FECHA = ("fecha_agregado", "fecha_prestamo", "fecha_limite", "fecha_devolucion")
+
+
+def registros(documento, secciones=SECCIONES):
+    """Genera (sección, registro) de las listas del documento, sin copiarlas.
+    En un documento fragmentado solo se cargan las secciones pedidas"""
+    for seccion in secciones:
+        for registro in documento.get(seccion) or ():
+            if isinstance(registro, dict):
+                yield seccion, registro
+
+
+def _fecha(valor, iso):
+    """Epoch (o ISO con `iso`) de una fecha en cualquiera de los dos formatos
+    guardados; lo que no es fecha sale tal cual. No toca el documento"""
+    epoch = a_epoch(valor)
+    if epoch is None:
+        return valor
+    return datetime.fromtimestamp(epoch).isoformat() if iso else epoch
+
+
+def lineas_jsonl(documento, secciones=SECCIONES, iso=False):
+    """Una línea JSON por registro, con la sección en el campo "seccion"""
+    for seccion, registro in registros(documento, secciones):
+        linea = {"seccion": seccion, **registro}
+        for campo in CAMPOS_FECHA:
+            if campo in linea:
+                linea[campo] = _fecha(linea[campo], iso)
+        yield json.dumps(linea, ensure_ascii=False) + "\n"
+
+
+def filas_csv(documento, seccion, iso=False):
+    """Encabezado y una fila por registro de `seccion`, en las columnas de COLUMNAS"""
+    columnas = COLUMNAS[seccion]
+    yield list(columnas)
+    for _, registro in registros(documento, (seccion,)):
+        yield [_fecha(registro.get(c), iso) if c in CAMPOS_FECHA else registro.get(c, "") for c in columnas]
+
+
+def exportar_jsonl(documento, salida, secciones=SECCIONES, iso=False):
+    """Escribe las secciones en `salida` (archivo de texto abierto); devuelve
+    (registros, caracteres) escritos"""
+    total = caracteres = 0
+    for linea in lineas_jsonl(documento, secciones, iso):
+        salida.write(linea)
+        total += 1
+        caracteres += len(linea)
+    logger.info(f"📤 Exportados {total} registros a JSONL")
+    return total, caracteres
+
+
+def exportar_csv(documento, seccion, salida, iso=False):
+    """Escribe `seccion` como CSV en `salida` (abierto con newline=""); devuelve
+    los registros escritos"""
+    escritor = csv.writer(salida)
+    total = -1
+    for fila in filas_csv(documento, seccion, iso):
+        escritor.writerow(fila)
+        total += 1
+    logger.info(f"📤 Exportados {total} registros de {seccion} a CSV")
+    return total
@@ -0,0 +1,119 @@
+import csv
+import json
+import logging
+
+from utility.contadores import contar_alta, obtener_contadores
+from utility.indice_libros import indexar_libro, obtener_titulos
+from utility.tiempo import a_epoch, reloj
+from utility.utils import generar_id_unico
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# ==============================
+# Importación masiva de libros (CSV / JSONL)
+# ==============================
+# Las filas se leen de a una; en memoria solo crece el documento. Columnas
+# aceptadas (sin importar mayúsculas), incluidas las de un export de Goodreads:
+COLUMNAS = {
+    "titulo": ("titulo", "título", "title"),
+    "autor": ("autor", "author"),
+    "tipo": ("tipo", "genero", "género", "genre", "categoria", "categoría", "category"),
+    "fecha_agregado": ("fecha_agregado", "date added", "date_added"),
+}
+TITULO_MAX = 300
+ERRORES_MAX = 20
+
+
+def leer_filas(ruta, formato=None):
+    """Genera (número de línea, fila) de un CSV o JSONL; `formato` se deduce de
+    la extensión si no se da. Una línea JSONL inválida sale como fila None"""
+    formato = formato or ("csv" if ruta.lower().endswith(".csv") else "jsonl")
+    # utf-8-sig: los CSV de Excel empiezan con BOM
+    with open(ruta, encoding="utf-8-sig", newline="") as archivo:
+        if formato == "csv":
+            lector = csv.DictReader(archivo)
+            for fila in lector:
+                yield lector.line_num, fila
+            return
+        for numero, linea in enumerate(archivo, start=1):
+            if not linea.strip():
+                continue
+            try:
+                fila = json.loads(linea)
+            except ValueError:
+                fila = None
+            yield numero, fila if isinstance(fila, dict) else None
+
+
+def _columna(fila, campo):
+    for nombre, valor in fila.items():
+        if nombre and nombre.strip().lower() in COLUMNAS[campo]:
+            return valor.strip() if isinstance(valor, str) else valor
+    return None
+
+
+def libro_de_fila(fila, ahora):
+    """El libro (sin id) que describe la fila, o None con el motivo si no es válida"""
+    if not isinstance(fila, dict):
+        return None, "fila ilegible"
+    titulo = " ".join(str(_columna(fila, "titulo") or "").split())
+    if not titulo:
+        return None, "sin título"
+    if len(titulo) > TITULO_MAX:
+        return None, "título demasiado largo"
+    fecha = _columna(fila, "fecha_agregado")
+    # Goodreads escribe las fechas como 2023/05/01
+    fecha = a_epoch(fecha.replace("/", "-")) if isinstance(fecha, str) else a_epoch(fecha)
+    return {
+        "titulo": titulo,
+        "autor": _columna(fila, "autor") or "Desconocido",
+        "tipo": _columna(fila, "tipo") or "Sin categoría",
+        "fecha_agregado": fecha if fecha is not None else ahora,
+        "total_prestamos": 0,
+        "estado": "disponible"
+    }, None
+
+
+def _id_libre(contadores):
+    """Mismo formato que generar_id_unico, sin repetir un id del catálogo"""
+    while True:
+        libro_id = generar_id_unico()
+        if libro_id not in contadores["ids_disponibles"] and libro_id not in contadores["ids_prestados"]:
+            return libro_id
+
+
+def importar_libros(user_data, filas, handler_input=None):
+    """Agrega al documento los libros de `filas` ((número, fila), como las de
+    leer_filas), saltando los inválidos y los títulos que ya están (en el
+    catálogo o antes en el mismo archivo). Actualiza estadisticas; no escribe:
+    quien llama guarda el documento una sola vez. Devuelve el resumen"""
+    libros = user_data.setdefault("libros_disponibles", [])
+    contadores = obtener_contadores(user_data)
+    # Se toman una vez: aquí la lista solo cambia con indexar_libro
+    titulos = obtener_titulos(libros)
+    ahora = reloj(handler_input)
+    resumen = {"importados": 0, "duplicados": 0, "invalidos": 0, "errores": []}
+    for numero, fila in filas:
+        libro, motivo = libro_de_fila(fila, ahora)
+        if libro is None:
+            resumen["invalidos"] += 1
+        elif titulos.contiene(libro["titulo"]):
+            resumen["duplicados"] += 1
+            motivo = f"'{libro['titulo']}' ya está en la biblioteca"
+        else:
+            libro = {"id": _id_libre(contadores), **libro}
+            libros.append(libro)
+            indexar_libro(libros, libro)
+            contar_alta(user_data, libro)
+            resumen["importados"] += 1
+        if motivo and len(resumen["errores"]) < ERRORES_MAX:
+            resumen["errores"].append((numero, motivo))
+    logger.info(f"📥 Importación: {resumen['importados']} libros nuevos, "
+                f"{resumen['duplicados']} duplicados, {resumen['invalidos']} inválidos")
+    return resumen
+
+
+def importar_archivo(user_data, ruta, formato=None, handler_input=None):
+    """importar_libros() leyendo el archivo en streaming"""
+    return importar_libros(user_data, leer_filas(ruta, formato), handler_input)
@@ -0,0 +1,216 @@
+from difflib import SequenceMatcher
+
+from configuration.configurations import INDICE_MIN_LIBROS, SIMILITUD_MINIMA
+from utility import derivados
+from utility.derivados import EstructuraDeLista
+from utility.similitud import clave, normalizar, rankear
+
+# ==============================
+# Índice invertido de títulos/autores
+# ==============================
+TAMANO_NGRAMA = 3
+# Nombres con los que se adjuntan al documento en cache (ver utility.derivados)
+INDICE = "indice_libros"
+TITULOS = "titulos_normalizados"
+
+
+def _ngramas(texto):
+    return {texto[i:i + TAMANO_NGRAMA] for i in range(len(texto) - TAMANO_NGRAMA + 1)}
+
+
+class _IndiceCampo:
+    """Índice de un campo de texto (título o autor) con la misma semántica que
+    la búsqueda lineal: coincide si la búsqueda está contenida en el texto o
+    el texto está contenido en la búsqueda. Los textos son claves de
+    utility.similitud (sin acentos ni palabras vacías)"""
+
+    def __init__(self):
+        self.textos = {}       # seq -> clave del texto
+        self.exactos = {}      # texto normalizado -> {seq}
+        self.ngramas = {}      # trigrama -> {seq}
+        self.cortos = set()    # seqs con textos sin trigramas
+        self.por_longitud = {} # longitud de texto -> {seq}
+
+    def agregar(self, seq, texto):
+        self.textos[seq] = texto
+        self.exactos.setdefault(texto, set()).add(seq)
+        self.por_longitud.setdefault(len(texto), set()).add(seq)
+        if len(texto) < TAMANO_NGRAMA:
+            self.cortos.add(seq)
+        for grama in _ngramas(texto):
+            self.ngramas.setdefault(grama, set()).add(seq)
+
+    def eliminar(self, seq):
+        texto = self.textos.pop(seq, None)
+        if texto is None:
+            return
+        self._descartar(self.exactos, texto, seq)
+        self._descartar(self.por_longitud, len(texto), seq)
+        self.cortos.discard(seq)
+        for grama in _ngramas(texto):
+            self._descartar(self.ngramas, grama, seq)
+
+    @staticmethod
+    def _descartar(mapa, clave, seq):
+        seqs = mapa.get(clave)
+        if seqs is not None:
+            seqs.discard(seq)
+            if not seqs:
+                del mapa[clave]
+
+    def coincidencias(self, busqueda):
+        """Devuelve los seqs cuyo texto contiene a la búsqueda o está contenido en ella"""
+        if not busqueda:
+            return set(self.textos)
+        return self._contienen(busqueda) | self._contenidos_en(busqueda)
+
+    def parecidos(self, busqueda, minimo=SIMILITUD_MINIMA):
+        """Los seqs que pueden puntuar al menos `minimo` con tolerancia a
+        errores (ver similitud.puntaje): textos de longitud compatible cuyas
+        letras en común, sin importar el orden (quick_ratio, cota superior del
+        puntaje), alcanzan el mínimo. Es un superconjunto exacto de los que
+        pasan, así el índice encuentra lo mismo que el recorrido lineal; los
+        trigramas no sirven de filtro aquí: con 0.72 un título de 20 letras
+        puede tener 5 cambiadas y ningún trigrama en común"""
+        comparacion = SequenceMatcher(None, autojunk=False)
+        comparacion.set_seq2(busqueda)
+        candidatos = set()
+        for longitud, seqs in self.por_longitud.items():
+            if 2 * min(longitud, len(busqueda)) / (longitud + len(busqueda)) < minimo:
+                continue
+            for seq in seqs:
+                comparacion.set_seq1(self.textos[seq])
+                if comparacion.quick_ratio() >= minimo:
+                    candidatos.add(seq)
+        return candidatos
+
+    def _contienen(self, busqueda):
+        if len(busqueda) >= TAMANO_NGRAMA:
+            listas = []
+            for grama in _ngramas(busqueda):
+                seqs = self.ngramas.get(grama)
+                if not seqs:
+                    return set()
+                listas.append(seqs)
+            listas.sort(key=len)
+            candidatos = set(listas[0])
+            for seqs in listas[1:]:
+                candidatos &= seqs
+                if not candidatos:
+                    return candidatos
+        else:
+            # Búsquedas muy cortas: todo texto largo que las contenga comparte
+            # al menos un trigrama con ellas, así que basta recorrer el
+            # vocabulario de trigramas (acotado, no crece con la biblioteca)
+            candidatos = set(self.cortos)
+            for grama, seqs in self.ngramas.items():
+                if busqueda in grama:
+                    candidatos |= seqs
+        return {seq for seq in candidatos if busqueda in self.textos[seq]}
+
+    def _contenidos_en(self, busqueda):
+        resultado = set()
+        for longitud in self.por_longitud:
+            if longitud > len(busqueda):
+                continue
+            for inicio in range(len(busqueda) - longitud + 1):
+                seqs = self.exactos.get(busqueda[inicio:inicio + longitud])
+                if seqs:
+                    resultado |= seqs
+        return resultado
+
+
+class IndiceLibros(EstructuraDeLista):
+    """Índice por usuario sobre la lista `libros_disponibles` de un documento"""
+    BYTES_POR_ELEMENTO = 2500
+
+    def __init__(self, libros):
+        self._siguiente_seq = 0
+        self._libro_por_seq = {}
+        self._seq_por_libro = {}
+        self.titulos = _IndiceCampo()
+        self.autores = _IndiceCampo()
+        super().__init__(libros)
+
+    def _agregar(self, libro):
+        if not isinstance(libro, dict):
+            return
+        seq = self._siguiente_seq
+        self._siguiente_seq += 1
+        self._libro_por_seq[seq] = libro
+        self._seq_por_libro[id(libro)] = seq
+        self.titulos.agregar(seq, clave(libro.get("titulo")))
+        self.autores.agregar(seq, clave(libro.get("autor")))
+
+    def _eliminar(self, libro):
+        seq = self._seq_por_libro.pop(id(libro), None)
+        if seq is None:
+            return
+        del self._libro_por_seq[seq]
+        self.titulos.eliminar(seq)
+        self.autores.eliminar(seq)
+
+    def _en_orden(self, seqs):
+        # Los seqs crecen en orden de inserción, igual que la lista original
+        return [self._libro_por_seq[seq] for seq in sorted(seqs)]
+
+    def buscar_por_titulo(self, titulo_busqueda):
+        """Títulos que contienen la búsqueda o se le parecen, el mejor primero"""
+        if not titulo_busqueda:
+            return self._en_orden(self.titulos.textos)
+        seqs = self.titulos.coincidencias(titulo_busqueda) | self.titulos.parecidos(titulo_busqueda)
+        return rankear(titulo_busqueda, [(seq, self.titulos.textos[seq], self._libro_por_seq[seq]) for seq in seqs])
+
+    def buscar_por_autor(self, autor_busqueda):
+        return self._en_orden(self.autores.coincidencias(autor_busqueda))
+
+
+class TitulosNormalizados(EstructuraDeLista):
+    """Cuántos libros hay con cada título normalizado (sin acentos, mayúsculas
+    ni espacios de más): saber si un título ya está es O(1)"""
+    BYTES_POR_ELEMENTO = 100
+
+    def __init__(self, libros):
+        self.conteo = {}
+        super().__init__(libros)
+
+    def _agregar(self, libro):
+        if isinstance(libro, dict):
+            titulo = normalizar(libro.get("titulo"))
+            self.conteo[titulo] = self.conteo.get(titulo, 0) + 1
+
+    def _eliminar(self, libro):
+        if isinstance(libro, dict):
+            titulo = normalizar(libro.get("titulo"))
+            if self.conteo.get(titulo, 0) > 1:
+                self.conteo[titulo] -= 1
+            else:
+                self.conteo.pop(titulo, None)
+
+    def contiene(self, titulo):
+        return normalizar(titulo) in self.conteo
+
+
+def obtener_indice(libros):
+    """Devuelve el índice de la lista de libros, o None si la lista es tan chica
+    que conviene el recorrido lineal. Se construye una sola vez por documento en
+    cache y se reconstruye si la lista cambió sin avisar al índice."""
+    if len(libros) < INDICE_MIN_LIBROS:
+        return None
+    return derivados.obtener(INDICE, libros, IndiceLibros)
+
+
+def obtener_titulos(libros):
+    """Los títulos normalizados de la lista, para cualquier tamaño de biblioteca
+    (los documentos anteriores se cuentan la primera vez que se piden)"""
+    return derivados.obtener(TITULOS, libros, TitulosNormalizados)
+
+
+def indexar_libro(libros, libro):
+    """Actualiza en sitio los índices después de `libros.append(libro)`"""
+    derivados.avisar_alta((INDICE, TITULOS), libros, libro)
+
+
+def desindexar_libro(libros, libro):
+    """Actualiza en sitio los índices después de `libros.remove(libro)`"""
+    derivados.avisar_baja((INDICE, TITULOS), libros, libro)
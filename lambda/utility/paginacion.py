@@ -0,0 +1,68 @@
+import base64
+import binascii
+import json
+
+# ==============================
+# Cursor de paginación de ListarLibros
+# ==============================
+# En sesión solo viaja un token corto, no la lista filtrada. Campos:
+#   f: filtro ("autor", "prestados", "disponibles" o None)   a: autor buscado
+#   o: orden (por ahora solo el de inserción)                 u: id del último libro mostrado
+#   p: posición en libros_disponibles después de ese libro    n: libros mostrados hasta ahora
+#   t: total de libros que pasan el filtro                     v: versión del documento al contarlos
+ORDEN_INSERCION = "insercion"
+
+
+def nuevo_cursor(filtro=None, autor=None):
+    return {"f": filtro, "a": autor, "o": ORDEN_INSERCION, "n": 0}
+
+
+def codificar_cursor(cursor):
+    serializado = json.dumps(cursor, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(serializado).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(token):
+    """El cursor del token, o None si no hay token o no es válido"""
+    if not token:
+        return None
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if not isinstance(cursor, dict) or cursor.get("o") != ORDEN_INSERCION:
+        return None
+    return cursor
+
+
+def _id(libro):
+    return libro.get("id") if isinstance(libro, dict) else None
+
+
+def posicion_inicial(libros, cursor):
+    """Dónde sigue la lista: justo después del último libro mostrado. Si la lista
+    cambió se lo busca por id; si ya no existe, se sigue desde donde estaba"""
+    ultimo = cursor.get("u")
+    if ultimo is None:
+        return 0
+    posicion = cursor.get("p", 0)
+    if 0 < posicion <= len(libros) and _id(libros[posicion - 1]) == ultimo:
+        return posicion
+    for i, libro in enumerate(libros):
+        if _id(libro) == ultimo:
+            return i + 1
+    return max(min(posicion - 1, len(libros)), 0)
+
+
+def siguiente_pagina(libros, cursor, incluir, tamano):
+    """(libros de la página, posición justo después del último de ellos).
+    Recorre desde el cursor solo lo necesario para llenar la página"""
+    pagina = []
+    posicion = despues_del_ultimo = posicion_inicial(libros, cursor)
+    while posicion < len(libros) and len(pagina) < tamano:
+        libro = libros[posicion]
+        posicion += 1
+        if isinstance(libro, dict) and incluir(libro):
+            pagina.append(libro)
+            despues_del_ultimo = posicion
+    return pagina, despues_del_ultimo
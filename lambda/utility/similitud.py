@@ -0,0 +1,93 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+from configuration.configurations import SIMILITUD_MINIMA
+
+# ==============================
+# Coincidencia aproximada de títulos
+# ==============================
+# El reconocimiento de voz pierde acentos y eñes ("el senor de los anillos") y a
+# veces se come los artículos; se compara sobre una clave sin acentos, sin
+# puntuación y sin palabras vacías.
+PALABRAS_VACIAS = frozenset({
+    "el", "la", "los", "las", "lo", "un", "una", "unos", "unas",
+    "de", "del", "al", "a", "y", "e", "o", "u", "en", "con", "por", "para",
+    "the", "an", "of", "and",
+})
+
+_NO_ALFANUMERICO = re.compile(r"[\W_]+")
+
+# En claves de hasta estas letras una sola letra pesa mucho en la proporción
+# ("anillos" contra "anos" da 0.73): se tolera a lo sumo una letra distinta
+LONGITUD_CLAVE_CORTA = 8
+
+
+def normalizar(texto):
+    """Minúsculas, sin acentos (ñ -> n) y sin puntuación"""
+    texto = texto or ""
+    if not texto.isascii():
+        texto = unicodedata.normalize("NFKD", texto)
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = texto.casefold()
+    return " ".join(_NO_ALFANUMERICO.sub(" ", texto).split())
+
+
+def clave(texto):
+    """Texto normalizado sin palabras vacías; si solo tenía palabras vacías, se
+    dejan (un título como "El" sigue siendo buscable)"""
+    palabras = normalizar(texto).split()
+    return " ".join([p for p in palabras if p not in PALABRAS_VACIAS] or palabras)
+
+
+def puntaje(busqueda, texto):
+    """Similitud entre 0 y 1 de dos claves. Igualdad vale 1; contener o estar
+    contenida vale al menos 0.75 (más cuanto más se parezcan las longitudes); si
+    no, el parecido de caracteres, que tolera letras cambiadas o de más (en
+    claves cortas, una sola)"""
+    if not busqueda or not texto:
+        return 0.0
+    if busqueda == texto:
+        return 1.0
+    corta, larga = sorted((busqueda, texto), key=len)
+    if corta in larga:
+        return 0.75 + 0.25 * len(corta) / len(larga)
+    comparacion = SequenceMatcher(None, busqueda, texto, autojunk=False)
+    if len(larga) <= LONGITUD_CLAVE_CORTA:
+        iguales = sum(bloque.size for bloque in comparacion.get_matching_blocks())
+        if len(larga) - iguales > 1:
+            return 0.0
+    return comparacion.ratio()
+
+
+def rankear(busqueda, candidatos, minimo=SIMILITUD_MINIMA):
+    """`candidatos`: (orden, clave, item). Devuelve los items con puntaje de al
+    menos `minimo`, el mejor primero; los empates quedan en su orden original.
+    Una búsqueda vacía devuelve todos en orden"""
+    if not busqueda:
+        return [item for _, _, item in sorted(candidatos, key=lambda c: c[0])]
+    puntuados = []
+    for orden, texto, item in candidatos:
+        valor = puntaje(busqueda, texto)
+        if valor >= minimo:
+            puntuados.append((-valor, orden, item))
+    puntuados.sort(key=lambda p: (p[0], p[1]))
+    return [item for _, _, item in puntuados]
+
+
+def mejores_coincidencias(items, texto_busqueda, campo="titulo", minimo=SIMILITUD_MINIMA):
+    """Recorrido lineal para listas chicas (p. ej. préstamos activos)"""
+    candidatos = [(orden, clave(item.get(campo)), item)
+                  for orden, item in enumerate(items) if isinstance(item, dict)]
+    return rankear(clave(texto_busqueda), candidatos, minimo)
+
+
+def con_puntaje(coincidencias, texto_busqueda, campo="titulo"):
+    """(mejor coincidencia, puntaje) de una lista ya rankeada; (None, 0.0) si
+    está vacía. El puntaje es 1.0 solo si el texto es el mismo salvo acentos,
+    mayúsculas, espacios y artículos: con menos, conviene preguntar antes de
+    actuar sobre la coincidencia"""
+    if not coincidencias:
+        return None, 0.0
+    mejor = coincidencias[0]
+    return mejor, puntaje(clave(texto_busqueda), clave(mejor.get(campo)))
@@ -0,0 +1,64 @@
+import time
+from datetime import datetime
+
+# ==============================
+# Fechas del modelo de datos
+# ==============================
+# Las fechas se guardan como segundos epoch (int). Los documentos anteriores
+# tienen cadenas ISO 8601; se convierten en sitio al leerlas (fecha_epoch) y
+# quedan como int en la siguiente escritura. El texto para voz se arma solo
+# al responder (para_voz).
+SEGUNDOS_POR_DIA = 86400
+RELOJ_ATTR = "reloj"
+
+MESES = ("enero", "febrero", "marzo", "abril", "mayo", "junio", "julio",
+         "agosto", "septiembre", "octubre", "noviembre", "diciembre")
+
+
+def reloj(handler_input=None):
+    """Segundos epoch del request: la primera llamada fija el reloj en los
+    atributos del request y las demás devuelven el mismo valor"""
+    if handler_input is None:
+        return int(time.time())
+    atributos = handler_input.attributes_manager.request_attributes
+    if RELOJ_ATTR not in atributos:
+        atributos[RELOJ_ATTR] = int(time.time())
+    return atributos[RELOJ_ATTR]
+
+
+def a_epoch(valor):
+    """Segundos epoch de un número o de una cadena ISO 8601; None si no es una fecha"""
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, (int, float)):
+        return int(valor)
+    try:
+        return int(datetime.fromisoformat(valor).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+def fecha_epoch(registro, campo):
+    """registro[campo] como epoch; si estaba en ISO, lo deja convertido"""
+    valor = registro.get(campo)
+    if type(valor) is int:
+        return valor
+    epoch = a_epoch(valor)
+    if epoch is not None:
+        registro[campo] = epoch
+    return epoch
+
+
+def actualizar_fechas(registros, campos):
+    """Convierte en sitio los `campos` ISO de cada registro de la lista"""
+    for registro in registros:
+        if isinstance(registro, dict):
+            for campo in campos:
+                if campo in registro and type(registro[campo]) is not int:
+                    fecha_epoch(registro, campo)
+
+
+def para_voz(epoch):
+    """Fecha para la respuesta, p. ej. 7 de octubre"""
+    fecha = datetime.fromtimestamp(epoch)
+    return f"{fecha.day} de {MESES[fecha.month - 1]}"
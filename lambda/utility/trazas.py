@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from configuration.configurations import ENABLE_TRACING, METRICS_NAMESPACE
+
+# ==============================
+# Trazas por request (CloudWatch EMF)
+# ==============================
+class _Traza:
+    def __init__(self, intent, request_id):
+        self.intent = intent
+        self.request_id = request_id
+        self.inicio = time.perf_counter()
+        self.tramos = {}
+        self.conteos = {}
+        self.marcas = {}
+
+    def sumar(self, tramo, ms):
+        self.tramos[tramo] = self.tramos.get(tramo, 0.0) + ms
+        self.conteos[tramo] = self.conteos.get(tramo, 0) + 1
+
+
+class _TrazadorImpl:
+    """Acumula tramos con nombre (milisegundos y número de veces) durante un
+    request y al final emite una línea JSON en Embedded Metric Format, que
+    CloudWatch convierte en métricas con dimensión `intent`.
+
+    Los tramos pueden anidarse (p. ej. `json` dentro de `s3_escritura`, todo
+    dentro de `handler`): cada uno es un desglose, no una partición del total.
+    Fuera de un request (o con ENABLE_TRACING=false) tramo() no mide nada."""
+
+    def __init__(self, habilitado=ENABLE_TRACING, namespace=METRICS_NAMESPACE, emitir=print):
+        self.habilitado = habilitado
+        self.namespace = namespace
+        self.emitir = emitir
+        self._local = threading.local()
+
+    @property
+    def actual(self):
+        return getattr(self._local, "traza", None)
+
+    def iniciar(self, intent, request_id=None):
+        if self.habilitado:
+            self._local.traza = _Traza(intent, request_id)
+
+    @contextmanager
+    def tramo(self, nombre):
+        traza = self.actual
+        if traza is None:
+            yield
+            return
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            traza.sumar(nombre, (time.perf_counter() - inicio) * 1000)
+
+    def sumar(self, nombre, ms):
+        traza = self.actual
+        if traza is not None:
+            traza.sumar(nombre, ms)
+
+    def marcar(self, nombre):
+        traza = self.actual
+        if traza is not None:
+            traza.marcas[nombre] = time.perf_counter()
+
+    def sumar_desde(self, marca, nombre):
+        """Suma al tramo `nombre` el tiempo transcurrido desde marcar(marca)"""
+        traza = self.actual
+        if traza is not None and marca in traza.marcas:
+            traza.sumar(nombre, (time.perf_counter() - traza.marcas.pop(marca)) * 1000)
+
+    def finalizar(self, resultado="ok"):
+        """Cierra la traza del request y emite su línea EMF; devuelve el documento emitido"""
+        traza = self.actual
+        if traza is None:
+            return None
+        self._local.traza = None
+        traza.sumar("total", (time.perf_counter() - traza.inicio) * 1000)
+        documento = self.documento_emf(traza, resultado)
+        self.emitir(json.dumps(documento, ensure_ascii=False))
+        return documento
+
+    def documento_emf(self, traza, resultado):
+        metricas = [{"Name": f"{tramo}_ms", "Unit": "Milliseconds"} for tramo in traza.tramos]
+        documento = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    "Dimensions": [["intent"]],
+                    "Metrics": metricas,
+                }],
+            },
+            "intent": traza.intent,
+            "request_id": traza.request_id,
+            "resultado": resultado,
+        }
+        for tramo, ms in traza.tramos.items():
+            documento[f"{tramo}_ms"] = round(ms, 3)
+            documento[f"{tramo}_n"] = traza.conteos[tramo]
+        return documento
+
+Trazador = _TrazadorImpl()
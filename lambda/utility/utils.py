@@ -1,6 +1,14 @@
 import uuid
 import random
-from datetime import datetime, timedelta
+from datetime import datetime
+
+import ask_sdk_core.utils as ask_utils
+
+from utility.indice_libros import obtener_indice, obtener_titulos
+from utility.similitud import clave, con_puntaje, mejores_coincidencias
+from utility.contadores import CONTADORES, reconstruir_contadores
+from utility.tiempo import actualizar_fechas
+from configuration.configurations import HISTORIAL_CONVERSACIONES_MAX
 
 # ==============================
 # Helpers
@@ -15,10 +23,19 @@ def sincronizar_estados_libros(user_data):
     prestamos = user_data.get("prestamos_activos", [])
     
     # Primero, asegurar que todos los libros tengan ID
+    ids_nuevos = False
     for libro in libros:
         if not libro.get("id"):
             libro["id"] = generar_id_unico()
+            ids_nuevos = True
+    if ids_nuevos and CONTADORES in user_data.get("estadisticas", {}):
+        # Los contadores se armaron con libros sin id
+        user_data["estadisticas"][CONTADORES] = reconstruir_contadores(user_data)
     
+    # Fechas ISO de documentos anteriores -> epoch, ya que se recorren igual
+    actualizar_fechas(libros, ("fecha_agregado",))
+    actualizar_fechas(prestamos, ("fecha_prestamo", "fecha_limite"))
+
     # Luego, actualizar estados
     ids_prestados = {p.get("libro_id") for p in prestamos if p.get("libro_id")}
     
@@ -31,38 +48,91 @@ def sincronizar_estados_libros(user_data):
     return user_data
 
 def buscar_libro_por_titulo(libros, titulo_busqueda):
-    """Busca libros por título y devuelve una lista de coincidencias"""
-    titulo_busqueda = (titulo_busqueda or "").lower().strip()
-    resultados = []
-    for libro in libros:
-        if isinstance(libro, dict):
-            titulo_libro = (libro.get("titulo") or "").lower()
-            if titulo_busqueda in titulo_libro or titulo_libro in titulo_busqueda:
-                resultados.append(libro)
-    return resultados
+    """Busca libros por título, tolerando acentos, artículos y errores del
+    reconocimiento de voz; devuelve las coincidencias, la mejor primero"""
+    indice = obtener_indice(libros)
+    if indice is not None:
+        return indice.buscar_por_titulo(clave(titulo_busqueda))
+    return mejores_coincidencias(libros, titulo_busqueda)
 
-def buscar_libro_por_titulo_exacto(libros, titulo_busqueda):
-    """Busca un libro por título y devuelve el primero que coincida"""
-    titulo_busqueda = (titulo_busqueda or "").lower().strip()
-    for libro in libros:
-        if isinstance(libro, dict):
-            titulo_libro = (libro.get("titulo") or "").lower()
-            if titulo_busqueda in titulo_libro or titulo_libro in titulo_busqueda:
-                return libro
-    return None
+def buscar_libro_con_puntaje(libros, titulo_busqueda):
+    """El libro que mejor coincide con el título y su puntaje (1.0 solo si el
+    título es el mismo salvo acentos, mayúsculas, espacios y artículos);
+    (None, 0.0) si no hay coincidencias. Con menos de 1.0 se confirma con el
+    usuario antes de actuar"""
+    return con_puntaje(buscar_libro_por_titulo(libros, titulo_busqueda), titulo_busqueda)
+
+# Preguntas de sí o no pendientes ("esperando") y lo que guardan en sesión
+CLAVES_CONFIRMACION = {
+    "confirmar_eliminar": ("eliminar_libro_id", "eliminar_libro_titulo", "eliminando_libro", "titulo_eliminar_temp"),
+    "confirmar_prestar": ("prestar_libro_id", "prestar_libro_titulo", "prestar_persona"),
+    "confirmar_devolver": ("devolver_prestamo_id",),
+}
+
+def respondiendo_confirmacion(handler_input, esperando):
+    """Si el usuario responde sí o no a la pregunta de confirmación `esperando`
+    (p. ej. "confirmar_eliminar")"""
+    session_attrs = handler_input.attributes_manager.session_attributes
+    return (session_attrs.get("esperando") == esperando and
+            (ask_utils.is_intent_name("AMAZON.YesIntent")(handler_input) or
+             ask_utils.is_intent_name("AMAZON.NoIntent")(handler_input)))
+
+def descartar_confirmacion(session_attrs):
+    """Quita de la sesión la pregunta de sí o no pendiente, si la hay, para que
+    un sí posterior no actúe sobre lo que se propuso antes"""
+    claves = CLAVES_CONFIRMACION.get(session_attrs.get("esperando"))
+    if claves is None:
+        return False
+    for nombre in ("esperando",) + claves:
+        session_attrs.pop(nombre, None)
+    return True
+
+def titulo_duplicado(libros, titulo):
+    """Si ya hay un libro con ese título, sin importar acentos, mayúsculas ni espacios"""
+    return obtener_titulos(libros).contiene(titulo)
 
 def buscar_libros_por_autor(libros, autor_busqueda):
-    autor_busqueda = (autor_busqueda or "").lower().strip()
+    autor_busqueda = clave(autor_busqueda)
+    indice = obtener_indice(libros)
+    if indice is not None:
+        return indice.buscar_por_autor(autor_busqueda)
     resultados = []
     for libro in libros:
         if isinstance(libro, dict):
-            autor_libro = (libro.get("autor") or "").lower()
+            autor_libro = clave(libro.get("autor"))
             if autor_busqueda in autor_libro or autor_libro in autor_busqueda:
                 resultados.append(libro)
     return resultados
 
-def generar_id_prestamo():
-    return f"PREST-{datetime.now().strftime('%Y%m%d')}-{generar_id_unico()}"
+def contar_conversaciones(user_data):
+    """Total histórico de conversaciones (las del documento más las archivadas)"""
+    stats = user_data.setdefault("estadisticas", {})
+    if "total_conversaciones" not in stats:
+        # Documentos anteriores al contador: todo su historial sigue en el documento
+        stats["total_conversaciones"] = len(user_data.get("historial_conversaciones", []))
+    return stats["total_conversaciones"]
+
+def registrar_conversacion(user_data, entrada, maximo=HISTORIAL_CONVERSACIONES_MAX):
+    """Agrega una entrada a historial_conversaciones sin pasar de `maximo`
+    entradas. Al llenarse, saca la mitad más antigua de una vez (para archivar
+    en lotes y no un objeto por sesión). Devuelve (numero_de_la_primera,
+    excedentes) para archivarlas."""
+    total = contar_conversaciones(user_data) + 1
+    user_data["estadisticas"]["total_conversaciones"] = total
+    historial = user_data.setdefault("historial_conversaciones", [])
+    historial.append(entrada)
+    primero = total - len(historial)
+    if len(historial) <= maximo:
+        return primero, []
+    # Siempre queda al menos la entrada recién agregada
+    sobrantes = len(historial) - max(maximo // 2, 1)
+    excedentes = historial[:sobrantes]
+    del historial[:sobrantes]
+    return primero, excedentes
+
+def generar_id_prestamo(epoch=None):
+    fecha = datetime.fromtimestamp(epoch) if epoch is not None else datetime.now()
+    return f"PREST-{fecha.strftime('%Y%m%d')}-{generar_id_unico()}"
 
 def get_random_phrase(phrase_list):
     """Selecciona una frase aleatoria de una lista"""
@@ -0,0 +1,126 @@
+import bisect
+import math
+import time
+
+from utility import derivados
+from utility.derivados import EstructuraDeLista
+from utility.tiempo import SEGUNDOS_POR_DIA, fecha_epoch
+
+# ==============================
+# Índice de préstamos activos por fecha límite
+# ==============================
+# Nombre con el que se adjunta al documento en cache, igual que los índices de libros
+INDICE = "indice_vencimientos"
+# Se avisa de los préstamos que vencen dentro de estos días
+DIAS_POR_VENCER = 2
+
+
+def _vencimiento(prestamo):
+    """fecha_limite como epoch (convirtiendo la ISO anterior); sin fecha válida,
+    al final, como si nunca venciera"""
+    epoch = fecha_epoch(prestamo, "fecha_limite")
+    return float("inf") if epoch is None else epoch
+
+
+class IndiceVencimientos(EstructuraDeLista):
+    """Los préstamos de `prestamos_activos` ordenados por fecha límite en una
+    lista de (epoch, seq): vencidos, por vencer y el próximo salen con bisect,
+    en O(log n + k)"""
+    BYTES_POR_ELEMENTO = 250
+
+    def __init__(self, prestamos):
+        self._siguiente_seq = 0
+        self._orden = []                 # (epoch, seq), ordenada
+        self._prestamo_por_seq = {}
+        self._clave_por_prestamo = {}    # id(préstamo) -> (epoch, seq)
+        super().__init__(prestamos)
+
+    def _agregar(self, prestamo):
+        if not isinstance(prestamo, dict):
+            return
+        clave = (_vencimiento(prestamo), self._siguiente_seq)
+        self._siguiente_seq += 1
+        self._prestamo_por_seq[clave[1]] = prestamo
+        self._clave_por_prestamo[id(prestamo)] = clave
+        bisect.insort(self._orden, clave)
+
+    def _eliminar(self, prestamo):
+        clave = self._clave_por_prestamo.pop(id(prestamo), None)
+        if clave is None:
+            return
+        del self._prestamo_por_seq[clave[1]]
+        posicion = bisect.bisect_left(self._orden, clave)
+        del self._orden[posicion]
+
+    def _entre(self, desde, hasta):
+        inicio = bisect.bisect_left(self._orden, (desde, -1))
+        fin = bisect.bisect_left(self._orden, (hasta, -1))
+        return [self._prestamo_por_seq[seq] for _, seq in self._orden[inicio:fin]]
+
+    def vencidos(self, ahora=None):
+        """Los que vencieron antes de `ahora`, el más atrasado primero"""
+        return self._entre(float("-inf"), ahora if ahora is not None else time.time())
+
+    def contar_vencidos(self, ahora=None):
+        return bisect.bisect_left(self._orden, (ahora if ahora is not None else time.time(), -1))
+
+    def por_vencer(self, dias, ahora=None):
+        """Los que vencen entre `ahora` y dentro de `dias` días, el más próximo primero"""
+        ahora = ahora if ahora is not None else time.time()
+        return self._entre(ahora, ahora + dias * SEGUNDOS_POR_DIA)
+
+    def proximo(self, ahora=None):
+        """El siguiente en vencer (sin contar los ya vencidos), o None"""
+        posicion = self.contar_vencidos(ahora)
+        if posicion < len(self._orden) and self._orden[posicion][0] != float("inf"):
+            return self._prestamo_por_seq[self._orden[posicion][1]]
+        return None
+
+    def mas_urgentes(self, cuantos):
+        """Los `cuantos` con la fecha límite más temprana: vencidos primero"""
+        return [self._prestamo_por_seq[seq] for _, seq in self._orden[:cuantos]]
+
+    def vence_en(self, prestamo):
+        """Epoch de la fecha límite de un préstamo del índice"""
+        clave = self._clave_por_prestamo.get(id(prestamo))
+        return clave[0] if clave else _vencimiento(prestamo)
+
+
+def obtener_indice_vencimientos(prestamos):
+    """Índice de la lista de préstamos activos; se construye una vez por
+    documento en cache y se reconstruye si la lista cambió sin avisarle"""
+    return derivados.obtener(INDICE, prestamos, IndiceVencimientos)
+
+
+def indexar_prestamo(prestamos, prestamo):
+    """Actualiza en sitio el índice después de `prestamos.append(prestamo)`"""
+    derivados.avisar_alta((INDICE,), prestamos, prestamo)
+
+
+def desindexar_prestamo(prestamos, prestamo):
+    """Actualiza en sitio el índice después de quitar `prestamo` de la lista"""
+    derivados.avisar_baja((INDICE,), prestamos, prestamo)
+
+
+def dias_restantes(vence_en, ahora):
+    """Días enteros hasta `vence_en` (negativos si ya venció); None sin fecha"""
+    return math.floor((vence_en - ahora) / SEGUNDOS_POR_DIA) if math.isfinite(vence_en) else None
+
+
+def resumen_vencimientos(prestamos, ahora, urgentes=5, dias_por_vencer=DIAS_POR_VENCER, indice=None):
+    """Estado de los préstamos activos a la hora `ahora`: total, cuántos vencieron,
+    cuántos vencen dentro de `dias_por_vencer` días y los `urgentes` más urgentes
+    como (préstamo, días restantes); con urgentes=None, todos los vencidos.
+
+    Solo depende de sus argumentos (a lo sumo deja en epoch las fechas ISO
+    anteriores): lo usan la skill, con el índice en cache, y el reporte nocturno"""
+    if indice is None:
+        indice = IndiceVencimientos(prestamos)
+    vencidos = indice.contar_vencidos(ahora)
+    return {
+        "total": len(prestamos),
+        "vencidos": vencidos,
+        "por_vencer": len(indice.por_vencer(dias_por_vencer + 1, ahora)),
+        "urgentes": [(p, dias_restantes(indice.vence_en(p), ahora))
+                     for p in indice.mas_urgentes(vencidos if urgentes is None else urgentes)],
+    }
@@ -1,8 +1,9 @@
 import logging
 import os
-import boto3
 from botocore.exceptions import ClientError
 
+from database.clientes_aws import cliente_s3_prefirmado
+
 
 def create_presigned_url(object_name):
     """Generate a presigned URL to share an S3 object with a capped expiration of 60 seconds
@@ -10,9 +11,8 @@ def create_presigned_url(object_name):
     :param object_name: string
     :return: Presigned URL as string. If error, returns None.
     """
-    s3_client = boto3.client('s3',
-                             region_name=os.environ.get('S3_PERSISTENCE_REGION'),
-                             config=boto3.session.Config(signature_version='s3v4',s3={'addressing_style': 'path'}))
+    # Cliente compartido: reutiliza el pool de conexiones del contenedor
+    s3_client = cliente_s3_prefirmado()
     try:
         bucket_name = os.environ.get('S3_PERSISTENCE_BUCKET')
         response = s3_client.generate_presigned_url('get_object',
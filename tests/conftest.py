@@ -0,0 +1,49 @@
+import json
+import os
+import sys
+import uuid
+
+import pytest
+
+# Como las herramientas: el código de la skill y las herramientas se importan por nombre
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, "lambda"))
+sys.path.insert(0, os.path.join(RAIZ, "herramientas"))
+os.environ.setdefault("ENABLE_TRACING", "false")
+os.environ.setdefault("USE_FAKE_S3", "true")
+
+
+@pytest.fixture
+def usuario():
+    return f"amzn1.ask.account.PRUEBA-{uuid.uuid4().hex[:12]}"
+
+
+@pytest.fixture
+def entrada():
+    """Arma un HandlerInput como el del SDK para un LaunchRequest o un intent"""
+    from ask_sdk_core.attributes_manager import AttributesManager
+    from ask_sdk_core.handler_input import HandlerInput
+    from ask_sdk_core.serialize import DefaultSerializer
+    from ask_sdk_model import RequestEnvelope
+    import sobres
+
+    def entrada(user_id, intent=None, slots=None, session_attributes=None):
+        sobre = (sobres.intent(intent, user_id, slots, session_attributes) if intent
+                 else sobres.launch(user_id, session_attributes))
+        envelope = DefaultSerializer().deserialize(json.dumps(sobre), RequestEnvelope)
+        return HandlerInput(request_envelope=envelope, attributes_manager=AttributesManager(envelope))
+    return entrada
+
+
+@pytest.fixture
+def contenedor():
+    """Un DatabaseManager con su propio cache, como otro contenedor de la Lambda;
+    todos comparten _FAKE_STORE. El codec binario hace que cada uno lea su copia"""
+    from database.codec import Codec
+    from database.database import FakeS3Adapter, _CacheLRU, _DatabaseManagerImpl
+
+    def contenedor(adaptador=None, **opciones):
+        opciones.setdefault("enable_ddb_cache", False)
+        return _DatabaseManagerImpl(cache=_CacheLRU(), adaptador=adaptador or FakeS3Adapter(Codec("json+zlib")),
+                                    **opciones)
+    return contenedor
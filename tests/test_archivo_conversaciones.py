@@ -0,0 +1,49 @@
+import uuid
+
+from sobres import launch
+
+
+def _documento(conversaciones):
+    from database.database import DatabaseManager
+    documento = DatabaseManager.initial_data()
+    documento["historial_conversaciones"] = [{"tipo": "inicio_sesion", "n": n} for n in range(1, conversaciones + 1)]
+    documento["estadisticas"]["total_conversaciones"] = conversaciones
+    return documento
+
+
+def test_se_archiva_una_vez_lo_del_documento_confirmado(monkeypatch):
+    import lambda_function
+    from database import database
+    from database.archivo import ArchivoConversaciones
+    from configuration.configurations import HISTORIAL_CONVERSACIONES_MAX
+
+    user_id = f"archivo-{uuid.uuid4().hex[:8]}"
+    database._FAKE_STORE[user_id] = _documento(HISTORIAL_CONVERSACIONES_MAX)
+
+    # Otro contenedor registra una conversación justo antes de la primera escritura
+    adaptador = database.DatabaseManager.adaptador
+    original = adaptador.guardar_condicional
+    choques = []
+
+    def guardar_condicional(uid, attributes, etag=None, nuevo=False):
+        if uid == user_id and not choques:
+            choques.append(etag)
+            otro = _documento(HISTORIAL_CONVERSACIONES_MAX + 1)
+            database._FAKE_STORE[uid] = otro
+            database._FAKE_VERSIONES[uid] = database._FAKE_VERSIONES.get(uid, 0) + 1
+        return original(uid, attributes, etag=etag, nuevo=nuevo)
+
+    monkeypatch.setattr(adaptador, "guardar_condicional", guardar_condicional)
+    ArchivoConversaciones.vaciar()
+    escritos = ArchivoConversaciones.metricas["entradas_archivadas"]
+
+    lambda_function.lambda_handler(launch(user_id), None)
+    ArchivoConversaciones.vaciar()
+
+    assert choques
+    guardado = database._FAKE_STORE[user_id]
+    archivadas = list(ArchivoConversaciones.leer(user_id))
+    # Lo archivado más lo que quedó en el documento es la historia completa, sin repetir
+    assert [c.get("n") for c in archivadas] + [c.get("n") for c in guardado["historial_conversaciones"]][:-1] == \
+        list(range(1, HISTORIAL_CONVERSACIONES_MAX + 2))
+    assert ArchivoConversaciones.metricas["entradas_archivadas"] - escritos == len(archivadas)
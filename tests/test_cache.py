@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+from database.database import _CacheLRU, _cache_get, _cache_put
+from utility.derivados import EstructuraDeLista
+
+
+class Estructura(EstructuraDeLista):
+    BYTES_POR_ELEMENTO = 100
+
+    def _agregar(self, elemento):
+        pass
+
+    def _eliminar(self, elemento):
+        pass
+
+
+def poner(cache, user_id, tamano, data=None):
+    _cache_put(user_id, data if data is not None else {"libros_disponibles": []}, cache=cache, tamano=tamano)
+
+
+def test_desaloja_lo_menos_usado_por_bytes():
+    cache = _CacheLRU(max_entradas=100, max_bytes=1000)
+    for user_id in "abc":
+        poner(cache, user_id, 300)
+    assert cache.bytes == 900
+
+    _cache_get("a", cache=cache)
+    poner(cache, "d", 300)
+    assert list(cache) == ["c", "a", "d"]
+    assert (cache.bytes, cache.desalojos) == (900, 1)
+
+
+def test_desaloja_por_cantidad_de_entradas():
+    cache = _CacheLRU(max_entradas=2, max_bytes=10 ** 9)
+    for user_id in "abc":
+        poner(cache, user_id, 1)
+    assert list(cache) == ["b", "c"]
+
+
+def test_nunca_desaloja_la_entrada_recien_puesta():
+    cache = _CacheLRU(max_entradas=100, max_bytes=1000)
+    poner(cache, "a", 300)
+    poner(cache, "grande", 5000)
+    assert list(cache) == ["grande"]
+    assert cache.bytes == 5000
+
+
+def test_reemplazar_una_entrada_descuenta_su_tamano():
+    cache = _CacheLRU(max_entradas=100, max_bytes=1000)
+    poner(cache, "a", 300)
+    poner(cache, "a", 100)
+    del cache["a"]
+    assert cache.bytes == 0
+
+
+def test_indices_cuentan_en_los_bytes_y_se_van_con_su_entrada():
+    cache = _CacheLRU(max_entradas=100, max_bytes=2000)
+    libros = [{"id": str(i)} for i in range(5)]
+    poner(cache, "a", 300, {"libros_disponibles": libros})
+    estructura = Estructura(libros)
+    assert cache.adjuntar(libros, "indice", estructura, estructura.tamano_aproximado())
+    assert cache.derivado(libros, "indice") is estructura
+    assert cache.bytes == 800
+    # Una lista que no es de ningún documento en cache no se adjunta
+    assert not cache.adjuntar([], "indice", estructura, 10)
+
+    poner(cache, "b", 1500)
+    assert "a" not in cache
+    assert cache.derivado(libros, "indice") is None
+    assert cache.bytes == 1500 and not cache._listas
+
+
+def test_recachear_el_mismo_documento_conserva_sus_indices():
+    cache = _CacheLRU()
+    libros = []
+    documento = {"libros_disponibles": libros}
+    poner(cache, "a", 100, documento)
+    estructura = Estructura(libros)
+    cache.adjuntar(libros, "indice", estructura, 50)
+    poner(cache, "a", 120, documento)
+    assert cache.derivado(libros, "indice") is estructura
+    assert cache.bytes == 170
+
+
+def test_barrido_quita_las_vencidas():
+    ahora = [datetime(2026, 1, 1)]
+    cache = _CacheLRU(barrido_cada=1000, now_fn=lambda: ahora[0])
+    _cache_put("a", {}, cache=cache, ttl_seconds=10, now_fn=lambda: ahora[0], tamano=5)
+    _cache_put("b", {}, cache=cache, ttl_seconds=100, now_fn=lambda: ahora[0], tamano=5)
+    ahora[0] += timedelta(seconds=50)
+    assert cache.barrer() == 1
+    assert list(cache) == ["b"] and cache.bytes == 5
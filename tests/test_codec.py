@@ -0,0 +1,79 @@
+import importlib.util
+import json
+
+import pytest
+
+from database.codec import CABECERA, Codec, obtener_codec
+
+DEPENDENCIAS = {"msgpack": "msgpack", "cbor": "cbor2", "zstd": "zstandard"}
+CODECS = ["json", "json+none", "json+zlib", "json+zstd", "msgpack+none", "msgpack+zlib", "cbor+zlib"]
+
+DOCUMENTO = {
+    "libros_disponibles": [{"id": "L1", "titulo": "Cien años de soledad", "autor": "García Márquez",
+                            "total_prestamos": 3, "estado": "disponible"}],
+    "prestamos_activos": [{"id": "P1", "libro_id": "L1", "fecha_limite": 1700000000.5}],
+    "historial_prestamos": [],
+    "estadisticas": {"total_libros": 1, "contadores": {"por_autor": {"García Márquez": 1}}},
+    "ultimo_acceso": None,
+    "bienvenida_mostrada": True,
+}
+
+
+def _faltante(nombre):
+    for parte in nombre.split("+"):
+        modulo = DEPENDENCIAS.get(parte)
+        if modulo and importlib.util.find_spec(modulo) is None:
+            return modulo
+    return None
+
+
+@pytest.fixture(params=CODECS)
+def codec(request):
+    faltante = _faltante(request.param)
+    if faltante:
+        pytest.skip(f"{faltante} no está instalado")
+    return Codec(request.param)
+
+
+def test_ida_y_vuelta(codec):
+    contenido = codec.codificar(DOCUMENTO)
+    assert isinstance(contenido, bytes)
+    assert codec.decodificar(contenido) == DOCUMENTO
+
+
+def test_cabecera_solo_fuera_del_legado(codec):
+    contenido = codec.codificar(DOCUMENTO)
+    if codec.legado:
+        # Los mismos bytes que escribe S3Adapter
+        assert contenido == json.dumps(DOCUMENTO).encode("utf-8")
+    else:
+        assert contenido.startswith(CABECERA)
+
+
+def test_cualquier_codec_lee_json_legado(codec):
+    legado = json.dumps(DOCUMENTO)
+    assert codec.decodificar(legado) == DOCUMENTO
+    assert codec.decodificar(legado.encode("utf-8")) == DOCUMENTO
+
+
+def test_cualquier_codec_lee_lo_de_otro(codec):
+    assert codec.decodificar(Codec("json+zlib").codificar(DOCUMENTO)) == DOCUMENTO
+    assert Codec("json").decodificar(codec.codificar(DOCUMENTO)) == DOCUMENTO
+
+
+def test_version_desconocida():
+    contenido = bytearray(Codec("json+zlib").codificar(DOCUMENTO))
+    contenido[3] = 99
+    with pytest.raises(ValueError):
+        Codec("json+zlib").decodificar(bytes(contenido))
+
+
+def test_codec_desconocido():
+    with pytest.raises(ValueError):
+        Codec("xml+zlib")
+
+
+def test_sin_dependencia_opcional_se_usa_json_zlib():
+    if not _faltante("msgpack+zlib"):
+        pytest.skip("msgpack está instalado")
+    assert obtener_codec("msgpack+zlib").nombre == "json+zlib"
@@ -0,0 +1,55 @@
+import uuid
+
+import pytest
+
+from sobres import intent
+
+
+@pytest.fixture
+def decir():
+    import lambda_function
+
+    def decir(nombre, slots=None, sesion=None, usuario="confirmaciones"):
+        respuesta = lambda_function.lambda_handler(intent(nombre, usuario, slots, sesion), None)
+        return respuesta["response"]["outputSpeech"]["ssml"], respuesta.get("sessionAttributes") or {}
+    return decir
+
+
+@pytest.fixture
+def usuario(decir):
+    usuario = f"confirmaciones-{uuid.uuid4().hex[:8]}"
+    for titulo in ("Hotel California", "Años", "El señor de los anillos"):
+        decir("AgregarLibroIntent", {"titulo": titulo, "autor": "X", "tipo": "novela"}, usuario=usuario)
+    return usuario
+
+
+def test_prestar_un_parecido_pregunta_primero(decir, usuario):
+    voz, sesion = decir("PrestarLibroIntent", {"titulo": "anillos", "nombre_persona": "Ana"}, usuario=usuario)
+    assert "¿Quieres prestar 'El señor de los anillos'?" in voz
+    assert sesion["esperando"] == "confirmar_prestar"
+
+    voz, sesion = decir("AMAZON.YesIntent", sesion=sesion, usuario=usuario)
+    assert "He registrado el préstamo de 'El señor de los anillos' a Ana" in voz
+    assert sesion == {}
+
+
+def test_devolver_un_parecido_y_responder_no(decir, usuario):
+    decir("PrestarLibroIntent", {"titulo": "Hotel California"}, usuario=usuario)
+    voz, sesion = decir("DevolverLibroIntent", {"titulo": "hotel"}, usuario=usuario)
+    assert sesion["esperando"] == "confirmar_devolver"
+
+    voz, _ = decir("AMAZON.NoIntent", sesion=sesion, usuario=usuario)
+    assert "no registré ninguna devolución" in voz
+    voz, _ = decir("DevolverLibroIntent", {"titulo": "Hotel California"}, usuario=usuario)
+    assert "He registrado la devolución de 'Hotel California'" in voz
+
+
+def test_otro_intent_descarta_la_pregunta_pendiente(decir, usuario):
+    _, sesion = decir("EliminarLibroIntent", {"titulo": "hotel"}, usuario=usuario)
+    assert sesion["esperando"] == "confirmar_eliminar"
+
+    _, sesion = decir("ListarLibrosIntent", sesion=sesion, usuario=usuario)
+    assert "esperando" not in sesion and "eliminar_libro_id" not in sesion
+    decir("AMAZON.YesIntent", sesion=sesion, usuario=usuario)
+    voz, _ = decir("ListarLibrosIntent", usuario=usuario)
+    assert "Hotel California" in voz
@@ -0,0 +1,98 @@
+import copy
+
+from database.database import DatabaseManager
+from utility.contadores import (contar_alta, contar_baja, contar_devolucion, contar_prestamo,
+                                obtener_contadores, verificar_contadores)
+
+
+# Las mismas operaciones sobre el documento que hacen los handlers
+def agregar(documento, libro_id, autor="Autor", tipo="novela"):
+    libro = {"id": libro_id, "titulo": f"Libro {libro_id}", "autor": autor, "tipo": tipo, "estado": "disponible"}
+    documento["libros_disponibles"].append(libro)
+    contar_alta(documento, libro)
+    return libro
+
+
+def prestar(documento, libro_id):
+    libro = next(l for l in documento["libros_disponibles"] if l["id"] == libro_id)
+    libro["estado"] = "prestado"
+    documento["prestamos_activos"].append({"id": f"P{libro_id}", "libro_id": libro_id})
+    contar_prestamo(documento, libro_id)
+
+
+def devolver(documento, libro_id):
+    prestamo = next(p for p in documento["prestamos_activos"] if p["libro_id"] == libro_id)
+    documento["prestamos_activos"].remove(prestamo)
+    documento["historial_prestamos"].append(prestamo)
+    for libro in documento["libros_disponibles"]:
+        if libro["id"] == libro_id:
+            libro["estado"] = "disponible"
+    contar_devolucion(documento, libro_id)
+
+
+def eliminar(documento, libro_id):
+    libro = next(l for l in documento["libros_disponibles"] if l["id"] == libro_id)
+    documento["libros_disponibles"].remove(libro)
+    contar_baja(documento, libro)
+
+
+def test_operaciones_sin_deriva():
+    documento = DatabaseManager.initial_data()
+    pasos = [
+        (agregar, "A", "Borges", "cuento"), (agregar, "B", "Borges", "ensayo"), (agregar, "C", "Rulfo"),
+        (prestar, "A"), (prestar, "C"), (devolver, "A"), (eliminar, "B"), (agregar, "D", "Rulfo"),
+        (prestar, "D"), (eliminar, "C"),
+    ]
+    for operacion, *argumentos in pasos:
+        operacion(documento, *argumentos)
+        assert verificar_contadores(documento, corregir=False) == [], operacion.__name__
+
+    contadores = obtener_contadores(documento)
+    assert documento["estadisticas"]["total_libros"] == 2
+    assert (contadores["disponibles"], contadores["prestados"]) == (1, 1)
+    assert contadores["por_autor"] == {"Borges": 1, "Rulfo": 1}
+    assert contadores["por_tipo"] == {"cuento": 1, "novela": 1}
+
+
+def test_devolver_un_libro_eliminado_mientras_estaba_prestado():
+    documento = DatabaseManager.initial_data()
+    agregar(documento, "A")
+    prestar(documento, "A")
+    eliminar(documento, "A")
+    devolver(documento, "A")
+    assert verificar_contadores(documento, corregir=False) == []
+    assert obtener_contadores(documento)["prestados"] == 0
+
+
+def test_documento_anterior_se_cuenta_al_usarlo():
+    documento = DatabaseManager.initial_data()
+    for libro_id in "ABC":
+        agregar(documento, libro_id)
+    prestar(documento, "B")
+    del documento["estadisticas"]["contadores"]
+    documento["estadisticas"]["total_libros"] = 0
+
+    agregar(documento, "D")
+    assert verificar_contadores(documento, corregir=False) == []
+    assert documento["estadisticas"]["total_libros"] == 4
+
+
+def test_deriva_se_detecta_y_corrige():
+    documento = DatabaseManager.initial_data()
+    agregar(documento, "A")
+    agregar(documento, "B")
+    documento["estadisticas"]["contadores"]["disponibles"] += 1
+    documento["estadisticas"]["total_libros"] = 7
+
+    intacto = copy.deepcopy(documento)
+    assert verificar_contadores(intacto, corregir=False) == ["disponibles", "total_libros"]
+    assert intacto == documento
+
+    assert verificar_contadores(documento) == ["disponibles", "total_libros"]
+    assert verificar_contadores(documento, corregir=False) == []
+
+
+def test_simulacion_por_lambda_handler(capsys):
+    from verificar_contadores import simular
+    assert simular(libros=80, operaciones=60, semilla=3) == 0
+    assert "Deriva: ninguna" in capsys.readouterr().out
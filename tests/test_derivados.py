@@ -0,0 +1,50 @@
+from utility.indice_libros import TitulosNormalizados, desindexar_libro, indexar_libro, obtener_titulos
+
+
+def biblioteca(cantidad=5):
+    return [{"id": f"L{i}", "titulo": f"Libro {i}"} for i in range(cantidad)]
+
+
+def test_avisos_mantienen_la_misma_estructura():
+    libros = biblioteca()
+    titulos = obtener_titulos(libros)
+    nuevo = {"id": "N", "titulo": "Nuevo"}
+    libros.append(nuevo)
+    indexar_libro(libros, nuevo)
+    quitado = libros.pop(2)
+    desindexar_libro(libros, quitado)
+
+    assert obtener_titulos(libros) is titulos
+    assert titulos.contiene("nuevo") and not titulos.contiene("Libro 2")
+    assert titulos.conteo == TitulosNormalizados(libros).conteo
+
+
+def test_cambio_sin_aviso_reconstruye():
+    libros = biblioteca()
+    titulos = obtener_titulos(libros)
+    libros.append({"id": "N", "titulo": "Nuevo"})
+    assert obtener_titulos(libros) is not titulos
+    assert obtener_titulos(libros).contiene("Nuevo")
+
+    titulos = obtener_titulos(libros)
+    # Se quitó uno y se agregó otro: mismo largo, distinto último
+    libros.pop(0)
+    libros.append({"id": "M", "titulo": "Otro"})
+    assert obtener_titulos(libros) is not titulos
+    assert not obtener_titulos(libros).contiene("Libro 0")
+
+
+def test_aviso_que_no_cuadra_deja_desfasada():
+    libros = biblioteca()
+    titulos = obtener_titulos(libros)
+    # Aviso de una baja que no ocurrió: la lista sigue con el mismo largo
+    desindexar_libro(libros, {"id": "X", "titulo": "Libro 1"})
+    assert titulos.desfasada
+    assert obtener_titulos(libros) is not titulos
+
+
+def test_lista_reemplazada_reconstruye():
+    libros = biblioteca()
+    titulos = obtener_titulos(libros)
+    copia = list(libros)
+    assert obtener_titulos(copia) is not titulos
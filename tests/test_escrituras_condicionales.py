@@ -0,0 +1,107 @@
+import pytest
+from ask_sdk_model.ui import SimpleCard
+
+from database.database import ConflictoDeEscritura, FakeS3Adapter
+
+
+def _agregar(manager, handler_input, titulo):
+    datos = manager.get_user_data(handler_input)
+    datos["libros_disponibles"].append({"id": titulo, "titulo": titulo})
+    manager.save_user_data(handler_input, datos)
+
+
+def _titulos(manager, usuario):
+    return [l["titulo"] for l in manager.adaptador.leer(usuario)["libros_disponibles"]]
+
+
+def test_escritura_sobre_una_version_vieja_choca(contenedor, entrada, usuario):
+    a = contenedor()
+    b = contenedor(adaptador=a.adaptador)
+    a.get_user_data(entrada(usuario))
+
+    entrada_a, entrada_b = entrada(usuario), entrada(usuario)
+    datos_a = a.get_user_data(entrada_a)
+    _agregar(b, entrada_b, "De B")
+    datos_a["libros_disponibles"].append({"id": "De A", "titulo": "De A"})
+    with pytest.raises(ConflictoDeEscritura):
+        a.save_user_data(entrada_a, datos_a)
+
+    assert a.metricas["conflictos"] == 1
+    assert usuario not in a.cache
+    assert _titulos(a, usuario) == ["De B"]
+
+
+def test_dos_altas_del_mismo_usuario_nuevo(contenedor, entrada, usuario):
+    a = contenedor()
+    b = contenedor(adaptador=a.adaptador)
+    entrada_a, entrada_b = entrada(usuario), entrada(usuario)
+    a.iniciar_unidad(entrada_a)
+    b.iniciar_unidad(entrada_b)
+    _agregar(a, entrada_a, "De A")
+    _agregar(b, entrada_b, "De B")
+    b.finalizar_unidad(entrada_b)
+    with pytest.raises(ConflictoDeEscritura):
+        a.finalizar_unidad(entrada_a)
+    assert _titulos(a, usuario) == ["De B"]
+
+
+def test_reintento_reaplica_el_handler_con_una_respuesta_limpia(contenedor, entrada, usuario):
+    a = contenedor()
+    b = contenedor(adaptador=a.adaptador)
+    a.get_user_data(entrada(usuario))
+    handler_input = entrada(usuario, "AgregarLibroIntent", session_attributes={"paso": 1})
+    intentos = []
+
+    def handle():
+        intentos.append(1)
+        _agregar(a, handler_input, "De A")
+        handler_input.attributes_manager.session_attributes["paso"] += 1
+        if len(intentos) == 1:
+            # Otro contenedor escribe mientras tanto
+            _agregar(b, entrada(usuario), "De B")
+            handler_input.response_builder.set_card(SimpleCard("Intento fallido"))
+        return handler_input.response_builder.speak(f"Intento {len(intentos)}").response
+
+    a.iniciar_unidad(handler_input)
+    respuesta = a.ejecutar_con_reintentos(handler_input, handle)
+
+    assert len(intentos) == 2
+    assert a.metricas["reintentos"] == 1
+    assert respuesta.output_speech.ssml == "<speak>Intento 2</speak>"
+    assert respuesta.card is None
+    assert handler_input.attributes_manager.session_attributes == {"paso": 2}
+    assert _titulos(a, usuario) == ["De B", "De A"]
+
+
+def test_reintentos_agotados(contenedor, entrada, usuario):
+    a = contenedor()
+    b = contenedor(adaptador=a.adaptador)
+    a.get_user_data(entrada(usuario))
+    handler_input = entrada(usuario)
+
+    def handle():
+        _agregar(a, handler_input, "De A")
+        _agregar(b, entrada(usuario), "De B")
+
+    a.iniciar_unidad(handler_input)
+    with pytest.raises(ConflictoDeEscritura):
+        a.ejecutar_con_reintentos(handler_input, handle, reintentos=2)
+    assert a.metricas["conflictos"] == 3
+
+
+class FakeS3AdapterIncondicional(FakeS3Adapter):
+    guardar_condicional = None
+
+
+def test_adaptador_sin_condicion_escribe_siempre(contenedor, entrada, usuario):
+    from database.codec import Codec
+    a = contenedor(adaptador=FakeS3AdapterIncondicional(Codec("json+zlib")))
+    b = contenedor(adaptador=a.adaptador)
+    a.get_user_data(entrada(usuario))
+    entrada_a = entrada(usuario)
+    datos_a = a.get_user_data(entrada_a)
+    _agregar(b, entrada(usuario), "De B")
+    datos_a["libros_disponibles"].append({"id": "De A", "titulo": "De A"})
+    a.save_user_data(entrada_a, datos_a)
+    # La última escritura pisa a la otra
+    assert _titulos(a, usuario) == ["De A"]
@@ -0,0 +1,128 @@
+import pytest
+
+from database.database import FakeS3Adapter
+
+DIFERIBLE = frozenset({"LaunchRequest"})
+
+
+def _agregar(manager, handler_input, titulo):
+    datos = manager.get_user_data(handler_input)
+    datos["libros_disponibles"].append({"id": titulo, "titulo": titulo})
+    manager.save_user_data(handler_input, datos)
+
+
+def _titulos(manager, usuario):
+    return [l["titulo"] for l in manager.adaptador.leer(usuario)["libros_disponibles"]]
+
+
+@pytest.fixture
+def diferido(contenedor):
+    def diferido(modo="siguiente", **opciones):
+        return contenedor(escritura_diferida=DIFERIBLE, escritura_diferida_modo=modo, **opciones)
+    return diferido
+
+
+def test_se_encola_y_se_escribe_al_vaciar(diferido, entrada, usuario):
+    a = diferido()
+    _agregar(a, entrada(usuario), "Uno")
+    # El documento inicial se escribió al leerlo; el alta todavía no
+    assert _titulos(a, usuario) == []
+    # Este contenedor ya lo ve desde el cache
+    assert [l["titulo"] for l in a.get_user_data(entrada(usuario))["libros_disponibles"]] == ["Uno"]
+    assert a.obtener_metricas()["diferidas_pendientes"] == 1
+
+    a.vaciar_diferidas()
+    assert _titulos(a, usuario) == ["Uno"]
+    assert (a.metricas["diferidas_encoladas"], a.metricas["diferidas_escritas"]) == (1, 1)
+    assert a.obtener_metricas()["diferidas_pendientes"] == 0
+
+
+def test_varias_del_mismo_usuario_se_acumulan(diferido, entrada, usuario):
+    a = diferido()
+    for titulo in ("Uno", "Dos", "Tres"):
+        _agregar(a, entrada(usuario), titulo)
+    escrituras = a.metricas["escrituras"]
+    a.vaciar_diferidas()
+    assert _titulos(a, usuario) == ["Uno", "Dos", "Tres"]
+    assert a.metricas["diferidas_acumuladas"] == 2
+    assert a.metricas["escrituras"] == escrituras + 1
+
+
+def test_escritura_no_diferida_absorbe_la_pendiente(diferido, entrada, usuario):
+    a = diferido()
+    _agregar(a, entrada(usuario), "Diferido")
+    _agregar(a, entrada(usuario, "AgregarLibroIntent"), "Inmediato")
+    assert _titulos(a, usuario) == ["Diferido", "Inmediato"]
+    assert a.metricas["diferidas_absorbidas"] == 1
+    assert a.obtener_metricas()["diferidas_pendientes"] == 0
+
+
+def test_conflicto_descarta_sin_pisar_al_otro(diferido, contenedor, entrada, usuario):
+    a = diferido()
+    b = contenedor(adaptador=a.adaptador)
+    a.get_user_data(entrada(usuario))
+    b.get_user_data(entrada(usuario))
+    _agregar(a, entrada(usuario), "De A")
+    _agregar(b, entrada(usuario, "AgregarLibroIntent"), "De B")
+
+    a.vaciar_diferidas()
+    assert _titulos(a, usuario) == ["De B"]
+    assert a.metricas["diferidas_perdidas_conflicto"] == 1
+    assert usuario not in a.cache
+
+
+def test_fallos_se_reintentan_y_despues_se_descartan(diferido, entrada, usuario, monkeypatch):
+    a = diferido()
+    _agregar(a, entrada(usuario), "Uno")
+
+    def falla(*args, **kwargs):
+        raise RuntimeError("S3 no responde")
+    monkeypatch.setattr(a.adaptador, "guardar_condicional", falla)
+
+    for intento in range(1, a.MAX_INTENTOS_DIFERIDA):
+        a.vaciar_diferidas()
+        assert a.metricas["diferidas_fallos"] == intento
+        assert a.obtener_metricas()["diferidas_pendientes"] == 1
+    a.vaciar_diferidas()
+    assert a.metricas["diferidas_perdidas_fallos"] == 1
+    assert a.obtener_metricas()["diferidas_pendientes"] == 0
+    # Lo cacheado nunca llegó a la persistencia
+    assert usuario not in a.cache
+
+
+def test_modo_siguiente_conserva_la_del_mismo_usuario(diferido, entrada, usuario):
+    a = diferido("siguiente")
+    _agregar(a, entrada(usuario), "Uno")
+
+    a.vaciar_diferidas(entrada(usuario))
+    assert _titulos(a, usuario) == []
+    a.vaciar_diferidas(entrada(usuario, "AgregarLibroIntent"))
+    assert _titulos(a, usuario) == ["Uno"]
+
+
+def test_modo_siguiente_vacia_la_de_otro_usuario(diferido, entrada, usuario):
+    a = diferido("siguiente")
+    _agregar(a, entrada(usuario), "Uno")
+    a.vaciar_diferidas(entrada(usuario + "-otro"))
+    assert _titulos(a, usuario) == ["Uno"]
+
+
+def test_modo_hilo_vacia_en_segundo_plano(diferido, entrada, usuario):
+    a = diferido("hilo")
+    _agregar(a, entrada(usuario), "Uno")
+    a.vaciar_diferidas_en_segundo_plano()
+    a._hilo_diferidas.join(5)
+    assert _titulos(a, usuario) == ["Uno"]
+    assert a.metricas["diferidas_escritas"] == 1
+
+
+class _SoloPorRequest(FakeS3Adapter):
+    """Un adaptador que solo sabe escribir a partir del request"""
+    guardar_condicional = None
+
+
+def test_adaptador_sin_escritura_por_usuario_escribe_en_el_momento(diferido, entrada, usuario):
+    a = diferido(adaptador=_SoloPorRequest())
+    _agregar(a, entrada(usuario), "Uno")
+    assert _titulos(a, usuario) == ["Uno"]
+    assert a.metricas["diferidas_encoladas"] == 0
@@ -0,0 +1,91 @@
+import base64
+import json
+
+import pytest
+
+from utility.paginacion import (codificar_cursor, decodificar_cursor, nuevo_cursor, posicion_inicial,
+                                siguiente_pagina)
+
+TAMANO = 10
+
+
+def biblioteca(cantidad=25):
+    return [{"id": f"L{i:02d}", "titulo": f"Libro {i}", "estado": "prestado" if i % 3 == 0 else "disponible"}
+            for i in range(cantidad)]
+
+
+def todos(libro):
+    return True
+
+
+def avanzar(libros, token, incluir=todos):
+    """Una página como la sirve ListarLibros: el cursor viaja codificado en la sesión"""
+    cursor = decodificar_cursor(token)
+    pagina, posicion = siguiente_pagina(libros, cursor, incluir, TAMANO)
+    if not pagina:
+        return pagina, None
+    cursor = dict(cursor, u=pagina[-1]["id"], p=posicion, n=cursor["n"] + len(pagina))
+    return pagina, codificar_cursor(cursor)
+
+
+def test_codificar_y_decodificar():
+    cursor = dict(nuevo_cursor("autor", "García Márquez"), u="L07", p=8, n=8, t=30, v="abc")
+    token = codificar_cursor(cursor)
+    assert "=" not in token
+    assert decodificar_cursor(token) == cursor
+
+
+@pytest.mark.parametrize("token", [None, "", "no es base64!", base64.urlsafe_b64encode(b"[1, 2]").decode(),
+                                   codificar_cursor({"o": "por_titulo", "n": 0})])
+def test_token_invalido(token):
+    assert decodificar_cursor(token) is None
+
+
+def test_recorre_todo_sin_repetir():
+    libros = biblioteca()
+    token, vistos = codificar_cursor(nuevo_cursor()), []
+    while token:
+        pagina, token = avanzar(libros, token)
+        vistos += [l["id"] for l in pagina]
+    assert vistos == [l["id"] for l in libros]
+
+
+def test_filtro_salta_los_que_no_pasan():
+    libros = biblioteca()
+    disponibles = lambda libro: libro["estado"] == "disponible"
+    pagina, token = avanzar(libros, codificar_cursor(nuevo_cursor("disponibles")), disponibles)
+    assert len(pagina) == TAMANO and all(disponibles(l) for l in pagina)
+    # El cursor queda justo después del último mostrado, no del último revisado
+    assert posicion_inicial(libros, decodificar_cursor(token)) == libros.index(pagina[-1]) + 1
+
+
+def test_reanuda_tras_borrar_un_libro_anterior():
+    libros = biblioteca()
+    primera, token = avanzar(libros, codificar_cursor(nuevo_cursor()))
+    libros.pop(2)
+    segunda, _ = avanzar(libros, token)
+    assert segunda[0]["id"] == "L10"
+
+
+def test_reanuda_tras_borrar_el_ultimo_mostrado():
+    libros = biblioteca()
+    primera, token = avanzar(libros, codificar_cursor(nuevo_cursor()))
+    assert primera[-1]["id"] == "L09"
+    libros.remove(primera[-1])
+    segunda, _ = avanzar(libros, token)
+    assert segunda[0]["id"] == "L10"
+
+
+def test_reanuda_tras_borrar_uno_pendiente():
+    libros = biblioteca()
+    _, token = avanzar(libros, codificar_cursor(nuevo_cursor()))
+    libros.pop(11)
+    segunda, _ = avanzar(libros, token)
+    assert [l["id"] for l in segunda] == ["L10"] + [f"L{i}" for i in range(12, 21)]
+
+
+def test_cursor_de_sesion_es_json_compacto():
+    token = codificar_cursor(nuevo_cursor())
+    contenido = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    assert json.loads(contenido) == nuevo_cursor()
+    assert b" " not in contenido
@@ -0,0 +1,47 @@
+import json
+
+from database.almacen import AlmacenDirectorio
+from reporte_vencidos import Bitacora, correr, sembrar, totales
+
+AHORA = 1_700_000_000
+
+
+def _lineas(ruta):
+    with open(ruta, encoding="utf-8") as archivo:
+        return archivo.read().splitlines()
+
+
+def test_bitacora_reanuda_tras_un_corte(tmp_path):
+    almacen = AlmacenDirectorio(str(tmp_path / "bucket"))
+    sembrar(almacen, 9, "json")
+    ruta = str(tmp_path / "vencidos.jsonl")
+
+    bitacora = Bitacora(ruta, AHORA)
+    metricas = correr(almacen, bitacora, "json", hilos=2, procesos=0, en_vuelo=4)
+    bitacora.cerrar()
+    assert metricas["analizados"] == 9
+    completo = totales(ruta)
+
+    # Corte a mitad de camino: cabecera, cuatro usuarios y una línea a medio escribir
+    lineas = _lineas(ruta)
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        archivo.write("\n".join(lineas[:5]) + "\n" + lineas[5][:20])
+
+    bitacora = Bitacora(ruta, AHORA + 3600)
+    assert len(bitacora.hechos) == 4
+    # La hora de corte es la de la primera corrida
+    assert bitacora.ahora == AHORA
+    metricas = correr(almacen, bitacora, "json", hilos=2, procesos=0, en_vuelo=4)
+    bitacora.cerrar()
+
+    assert metricas["saltados"] == 4
+    assert metricas["analizados"] == 5
+    assert totales(ruta) == completo
+    # Todas las líneas salvo la cortada siguen siendo JSON válido
+    invalidas = 0
+    for linea in _lineas(ruta):
+        try:
+            json.loads(linea)
+        except ValueError:
+            invalidas += 1
+    assert invalidas == 1
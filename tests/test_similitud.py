@@ -0,0 +1,64 @@
+from utility.similitud import clave, con_puntaje, mejores_coincidencias, puntaje
+from utility.utils import buscar_libro_con_puntaje
+
+
+def libros(*titulos):
+    return [{"id": f"L{i}", "titulo": titulo} for i, titulo in enumerate(titulos)]
+
+
+def test_igual_salvo_acentos_y_articulos_vale_uno():
+    assert puntaje(clave("el senor de los anillos"), clave("El Señor de los Anillos")) == 1.0
+
+
+def test_titulo_corto_tolera_una_sola_letra():
+    assert puntaje(clave("cata"), clave("casa")) > 0
+    assert puntaje(clave("anillos"), clave("Años")) == 0.0
+    assert mejores_coincidencias(libros("Años"), "anillos") == []
+
+
+def test_con_puntaje():
+    lista = libros("Rayuela", "Casa")
+    assert con_puntaje(mejores_coincidencias(lista, "rayela"), "rayela")[0] is lista[0]
+    assert con_puntaje([], "rayela") == (None, 0.0)
+    libro, valor = buscar_libro_con_puntaje(lista, "La Rayuela")
+    assert (libro, valor) == (lista[0], 1.0)
+    assert buscar_libro_con_puntaje(lista, "rayela")[1] < 1.0
+
+
+# ==============================
+# Índice y recorrido lineal dan lo mismo
+# ==============================
+PALABRAS = ["casa", "rio", "sombra", "viento", "noche", "mar", "luz", "olvido", "ciudad", "amor",
+            "guerra", "paz", "tiempo", "isla", "fuego", "niebla", "años", "anillos", "lobo", "cielo"]
+
+
+def _biblioteca(rnd, cantidad):
+    return libros(*(" ".join(rnd.sample(PALABRAS, rnd.randint(1, 3))).capitalize() for _ in range(cantidad)))
+
+
+def _con_errores(rnd, texto):
+    letras = list(texto)
+    for _ in range(rnd.randint(0, 2)):
+        letras[rnd.randrange(len(letras))] = rnd.choice("abcdefghijklmnopqrstuvwxyz ")
+    return "".join(letras)
+
+
+def test_indice_igual_que_recorrido_lineal():
+    import random
+    from utility.indice_libros import obtener_indice
+    from utility.utils import buscar_libro_por_titulo
+
+    rnd = random.Random(7)
+    lista = _biblioteca(rnd, 250)
+    assert obtener_indice(lista) is not None
+    busquedas = ["cata", "rio", "lus", "anillos"] + [
+        _con_errores(rnd, rnd.choice(lista)["titulo"] if rnd.random() < 0.7 else rnd.choice(PALABRAS))
+        for _ in range(120)]
+    for busqueda in busquedas:
+        assert buscar_libro_por_titulo(lista, busqueda) == mejores_coincidencias(lista, busqueda), busqueda
+
+
+def test_busqueda_corta_tolera_errores_en_biblioteca_grande():
+    from utility.indice_libros import IndiceLibros
+    lista = libros(*[f"Libro numero {i}" for i in range(100)], "Casa")
+    assert IndiceLibros(lista).buscar_por_titulo(clave("cata")) == [lista[-1]]
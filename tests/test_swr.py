@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+SOLO_LECTURA = "ConsultarPrestamosIntent"
+
+
+def _titulos(datos):
+    return [l["titulo"] for l in datos["libros_disponibles"]]
+
+
+def _preparar(contenedor, entrada, usuario, modo, vencida_hace=10):
+    """`a` tiene en cache una versión que `b` ya cambió y a la que le tocaba
+    revalidarse hace `vencida_hace` segundos"""
+    a = contenedor(cache_swr_modo=modo)
+    b = contenedor(adaptador=a.adaptador)
+    datos = a.get_user_data(entrada(usuario))
+    datos["libros_disponibles"].append({"id": "1", "titulo": "Viejo"})
+    a.save_user_data(entrada(usuario), datos)
+
+    nuevos = b.get_user_data(entrada(usuario))
+    nuevos["libros_disponibles"][0]["titulo"] = "Nuevo"
+    b.save_user_data(entrada(usuario), nuevos)
+    a.cache.get(usuario)["revalidar_en"] = time.time() - vencida_hace
+    return a
+
+
+@pytest.mark.parametrize("modo", ["hilo", "siguiente"])
+def test_sirve_lo_cacheado_y_refresca_despues(contenedor, entrada, usuario, modo):
+    a = _preparar(contenedor, entrada, usuario, modo)
+    revalidaciones = []
+    revalidar = a.adaptador.revalidar
+    a.adaptador.revalidar = lambda *args: revalidaciones.append(args) or revalidar(*args)
+
+    assert _titulos(a.get_user_data(entrada(usuario, SOLO_LECTURA))) == ["Viejo"]
+    assert a.metricas["swr_servidos"] == 1
+    assert revalidaciones == []
+
+    a.refrescar_pendientes()
+    if modo == "hilo":
+        a._hilo_refresco.join(5)
+    else:
+        # En "siguiente" el refresco espera al inicio de la próxima invocación
+        assert _titulos(a.cache.get(usuario)["data"]) == ["Viejo"]
+        a.refrescar_pendientes(al_iniciar=True)
+
+    assert len(revalidaciones) == 1
+    assert a.metricas["swr_refrescos"] == 1
+    assert _titulos(a.get_user_data(entrada(usuario, SOLO_LECTURA))) == ["Nuevo"]
+    assert a.metricas["swr_servidos"] == 1
+
+
+def test_refresco_no_pisa_una_entrada_mas_nueva(contenedor, entrada, usuario):
+    a = _preparar(contenedor, entrada, usuario, "siguiente")
+    a.get_user_data(entrada(usuario, SOLO_LECTURA))
+    # Mientras tanto la entrada cambió (p. ej. la escribió este mismo contenedor)
+    a.cache.get(usuario)["etag"] = "otra-version"
+    a.refrescar_pendientes(al_iniciar=True)
+    assert _titulos(a.cache.get(usuario)["data"]) == ["Viejo"]
+
+
+def test_intent_que_escribe_no_sirve_obsoleto(contenedor, entrada, usuario):
+    a = _preparar(contenedor, entrada, usuario, "hilo")
+    assert _titulos(a.get_user_data(entrada(usuario, "PrestarLibroIntent"))) == ["Nuevo"]
+    assert a.metricas["swr_servidos"] == 0
+
+
+def test_demasiado_viejo_no_se_sirve(contenedor, entrada, usuario):
+    a = _preparar(contenedor, entrada, usuario, "hilo", vencida_hace=10_000)
+    assert _titulos(a.get_user_data(entrada(usuario, SOLO_LECTURA))) == ["Nuevo"]
+    assert a.metricas["swr_servidos"] == 0
@@ -0,0 +1,109 @@
+import pytest
+
+from database.database import _FAKE_STORE
+
+
+class Contador:
+    """Envuelve get_attributes del adaptador para contar lecturas"""
+    def __init__(self, adaptador):
+        self.lecturas = 0
+        original = adaptador.get_attributes
+
+        def get_attributes(envelope):
+            self.lecturas += 1
+            return original(envelope)
+        adaptador.get_attributes = get_attributes
+
+
+def _sembrar(manager, usuario, titulos=("Rayuela",)):
+    datos = manager.initial_data()
+    datos["libros_disponibles"] = [{"id": t, "titulo": t} for t in titulos]
+    manager.adaptador.guardar_condicional(usuario, datos, nuevo=True)
+
+
+def test_una_lectura_y_una_escritura_por_unidad(contenedor, entrada, usuario):
+    manager = contenedor()
+    _sembrar(manager, usuario)
+    lecturas = Contador(manager.adaptador)
+    handler_input = entrada(usuario, "AgregarLibroIntent")
+
+    manager.iniciar_unidad(handler_input)
+    for titulo in ("Ficciones", "Aura"):
+        datos = manager.get_user_data(handler_input)
+        datos["libros_disponibles"].append({"id": titulo, "titulo": titulo})
+        manager.save_user_data(handler_input, datos)
+    assert manager.get_user_data(handler_input) is datos
+    assert manager.metricas["escrituras"] == 0
+    manager.finalizar_unidad(handler_input)
+
+    assert lecturas.lecturas == 1
+    assert manager.metricas["escrituras"] == 1
+    guardado = manager.adaptador.leer(usuario)
+    assert [l["titulo"] for l in guardado["libros_disponibles"]] == ["Rayuela", "Ficciones", "Aura"]
+
+
+def test_unidad_sin_cambios_no_escribe(contenedor, entrada, usuario):
+    manager = contenedor()
+    _sembrar(manager, usuario)
+    handler_input = entrada(usuario, "ListarLibrosIntent")
+    manager.iniciar_unidad(handler_input)
+    manager.get_user_data(handler_input)
+    manager.finalizar_unidad(handler_input)
+    assert manager.metricas["escrituras"] == 0
+
+
+def test_usuario_nuevo_se_escribe_al_confirmar(contenedor, entrada, usuario):
+    manager = contenedor()
+    handler_input = entrada(usuario)
+    manager.iniciar_unidad(handler_input)
+    manager.get_user_data(handler_input)
+    assert usuario not in _FAKE_STORE
+    manager.finalizar_unidad(handler_input)
+    assert manager.adaptador.leer(usuario)["libros_disponibles"] == []
+
+
+def test_guardar_sin_cambios_se_omite(contenedor, entrada, usuario):
+    manager = contenedor()
+    _sembrar(manager, usuario)
+    handler_input = entrada(usuario)
+    datos = manager.get_user_data(handler_input)
+    manager.save_user_data(handler_input, datos)
+    assert (manager.metricas["escrituras"], manager.metricas["escrituras_omitidas"]) == (0, 1)
+
+    datos["libros_disponibles"][0]["estado"] = "prestado"
+    manager.save_user_data(handler_input, datos)
+    # La huella es la del contenido: volver a guardar lo mismo tampoco escribe
+    manager.save_user_data(handler_input, datos)
+    assert (manager.metricas["escrituras"], manager.metricas["escrituras_omitidas"]) == (1, 2)
+
+
+def test_transaccion_que_falla_no_escribe(contenedor, entrada, usuario):
+    manager = contenedor()
+    _sembrar(manager, usuario)
+    handler_input = entrada(usuario)
+    with pytest.raises(RuntimeError):
+        with manager.transaction(handler_input):
+            manager.get_user_data(handler_input)["libros_disponibles"].clear()
+            raise RuntimeError("falla el handler")
+
+    assert manager.metricas["escrituras"] == 0
+    # El documento modificado a medias no queda en cache
+    assert [l["titulo"] for l in manager.get_user_data(handler_input)["libros_disponibles"]] == ["Rayuela"]
+
+
+def test_unidad_queda_abierta_si_la_escritura_falla(contenedor, entrada, usuario, monkeypatch):
+    manager = contenedor()
+    _sembrar(manager, usuario)
+    handler_input = entrada(usuario)
+    unidad = manager.iniciar_unidad(handler_input)
+    datos = manager.get_user_data(handler_input)
+    datos["libros_disponibles"].append({"id": "Aura", "titulo": "Aura"})
+    manager.save_user_data(handler_input, datos)
+
+    def caido(*args, **kwargs):
+        raise OSError("S3 no responde")
+    monkeypatch.setattr(manager.adaptador, "guardar_condicional", caido)
+    with pytest.raises(OSError):
+        manager.finalizar_unidad(handler_input)
+    assert not unidad.cerrada
+    assert usuario not in manager.cache
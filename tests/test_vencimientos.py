@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from utility.tiempo import SEGUNDOS_POR_DIA
+from utility.vencimientos import IndiceVencimientos, resumen_vencimientos
+
+AHORA = 1_700_000_000
+DIA = SEGUNDOS_POR_DIA
+
+
+def _prestamo(n, dias):
+    return {"id": f"P{n}", "titulo": f"Libro {n}", "persona": "Ana", "fecha_limite": AHORA + dias * DIA}
+
+
+def prestamos():
+    return [
+        _prestamo(1, 10),
+        _prestamo(2, -1),
+        _prestamo(3, 1),
+        # Fecha ISO de documentos anteriores
+        {"id": "P4", "titulo": "Libro 4", "fecha_limite": datetime.fromtimestamp(AHORA - 5 * DIA).isoformat()},
+        _prestamo(5, 2.5),
+        {"id": "P6", "titulo": "Sin fecha"},
+        _prestamo(7, -3),
+    ]
+
+
+def test_resumen_cuenta_vencidos_y_por_vencer():
+    resumen = resumen_vencimientos(prestamos(), AHORA)
+    assert resumen["total"] == 7
+    assert resumen["vencidos"] == 3
+    # Dentro de DIAS_POR_VENCER (2) días enteros: 1 y 2.5 días
+    assert resumen["por_vencer"] == 2
+
+
+def test_urgentes_en_orden_con_dias_restantes():
+    resumen = resumen_vencimientos(prestamos(), AHORA, urgentes=5)
+    assert [(p["id"], dias) for p, dias in resumen["urgentes"]] == [
+        ("P4", -5), ("P7", -3), ("P2", -1), ("P3", 1), ("P5", 2)]
+
+
+def test_urgentes_none_devuelve_todos_los_vencidos():
+    resumen = resumen_vencimientos(prestamos(), AHORA, urgentes=None)
+    assert [p["id"] for p, _ in resumen["urgentes"]] == ["P4", "P7", "P2"]
+
+
+def test_resumen_con_indice_igual_que_sin_indice():
+    lista = prestamos()
+    indice = IndiceVencimientos(lista)
+    nuevo = _prestamo(8, -10)
+    lista.append(nuevo)
+    indice.agregar(nuevo)
+    assert resumen_vencimientos(lista, AHORA, indice=indice) == resumen_vencimientos(lista, AHORA)
+
+
+def test_sin_prestamos():
+    assert resumen_vencimientos([], AHORA) == {"total": 0, "vencidos": 0, "por_vencer": 0, "urgentes": []}
+